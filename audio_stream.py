@@ -0,0 +1,64 @@
+"""
+진행 중인 작업의 점진적 오디오 스트림
+
+워커가 stage2 세그먼트 오디오를 내보낼 때마다 작업별 버퍼에 덧붙이고,
+/music/stream/{job_id} 에 연결된 청취자들이 작업이 끝나기 전부터 이어서 받아 가도록 합니다.
+MP3 는 프레임 단위로 독립적이므로 세그먼트 파일을 순서대로 이어 붙이면 그대로 재생됩니다.
+"""
+import asyncio
+import statistics
+from typing import Dict, List, Optional
+
+
+class AudioStream:
+    """작업 하나의 세그먼트 오디오 버퍼 (작업이 끝나고 청취자가 모두 나가면 버린다)"""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.segments: List[bytes] = []
+        self.total_segments: Optional[int] = None
+        self.finished = False
+        self.listeners = 0
+        self._changed = asyncio.Event()
+
+    @property
+    def buffered_bytes(self) -> int:
+        return sum(len(segment) for segment in self.segments)
+
+    def append(self, data: bytes, total_segments: Optional[int] = None):
+        self.segments.append(data)
+        if total_segments is not None:
+            self.total_segments = total_segments
+        self._notify()
+
+    def finish(self):
+        self.finished = True
+        self._notify()
+
+    def _notify(self):
+        # 기다리던 청취자를 모두 깨우고 다음 변경을 위해 새 이벤트로 교체한다
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_for_more(self, sent_segments: int, timeout: float):
+        """sent_segments 이후 세그먼트가 추가되거나 스트림이 끝날 때까지(최대 timeout 초) 기다립니다."""
+        if self.finished or len(self.segments) > sent_segments:
+            return
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+def summarize_seconds(values: List[float]) -> Dict:
+    """초 단위 측정값 목록을 요약합니다."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "mean": round(statistics.mean(ordered), 3),
+        "p50": round(ordered[len(ordered) // 2], 3),
+        "p90": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))], 3),
+        "max": round(ordered[-1], 3)
+    }
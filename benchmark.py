@@ -0,0 +1,826 @@
+"""
+Memoria Music API 벤치마크
+
+실행 중인 API 서버(main.py 또는 stub_server.py)를 대상으로 시나리오별 지연 시간과
+전송량을 측정하고 결과를 JSON 으로 저장합니다.
+
+    python benchmark.py download <job_id> --seeks 200 --output download-bench.json
+    python benchmark.py overload --requests 300 --rate 20 --clients 5 --output overload-bench.json
+    python benchmark.py batch --songs 20 --output batch-bench.json
+    python benchmark.py takes --max-takes 3 --output takes-bench.json
+    python benchmark.py pipeline --songs 20 --output pipeline-split.json
+    python benchmark.py --start-stub load --clients 16 --subscribers 300 --output load-bench.json
+    python benchmark.py compare load-before.json load-after.json
+
+--start-stub 를 주면 stub_server.py 를 짧은 모의 처리 시간으로 직접 띄우고 그 서버를 대상으로 측정합니다.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional
+
+import requests
+
+BASE_URL = "http://localhost:8000"
+WORKING_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def summarize_latencies(latencies: List[float]) -> Dict:
+    """지연 시간 목록(초)을 밀리초 단위 통계로 요약합니다."""
+    if not latencies:
+        return {"count": 0}
+    ordered = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return round(ordered[index] * 1000, 2)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.mean(ordered) * 1000, 2),
+        "p50_ms": percentile(50),
+        "p90_ms": percentile(90),
+        "p99_ms": percentile(99),
+        "max_ms": round(ordered[-1] * 1000, 2)
+    }
+
+
+def timed_get(session: requests.Session, url: str, headers: Dict = None):
+    started = time.perf_counter()
+    response = session.get(url, headers=headers or {})
+    body = response.content
+    return response, len(body), time.perf_counter() - started
+
+
+def bench_download(args) -> Dict:
+    """
+    탐색 위주 재생 시나리오:
+    1) 전체 다운로드 1회 (기준)
+    2) 임의 위치로 --seeks 번 탐색 (Range 요청, --chunk 바이트씩)
+    3) 같은 곡 재다운로드 --revalidations 번 (If-None-Match)
+    """
+    url = f"{args.base_url}/music/download/{args.job_id}"
+    session = requests.Session()
+    rng = random.Random(args.seed)
+
+    response, full_bytes, full_latency = timed_get(session, url)
+    if response.status_code != 200:
+        raise SystemExit(f"다운로드 실패: HTTP {response.status_code} {response.text}")
+    file_size = int(response.headers["content-length"])
+    etag = response.headers.get("etag")
+
+    seek_latencies = []
+    seek_bytes = 0
+    seek_statuses: Dict[int, int] = {}
+    for _ in range(args.seeks):
+        start = rng.randrange(0, max(1, file_size - 1))
+        end = min(file_size - 1, start + args.chunk - 1)
+        response, received, latency = timed_get(
+            session, url, {"Range": f"bytes={start}-{end}"})
+        seek_statuses[response.status_code] = seek_statuses.get(response.status_code, 0) + 1
+        seek_latencies.append(latency)
+        seek_bytes += received
+
+    revalidation_latencies = []
+    revalidation_bytes = 0
+    revalidation_statuses: Dict[int, int] = {}
+    for _ in range(args.revalidations):
+        headers = {"If-None-Match": etag} if etag else {}
+        response, received, latency = timed_get(session, url, headers)
+        revalidation_statuses[response.status_code] = \
+            revalidation_statuses.get(response.status_code, 0) + 1
+        revalidation_latencies.append(latency)
+        revalidation_bytes += received
+
+    # Range/ETag 를 지원하지 않았다면 같은 시나리오에 필요했을 전송량
+    naive_bytes = file_size * (args.seeks + args.revalidations)
+    transferred = seek_bytes + revalidation_bytes
+    return {
+        "scenario": "download",
+        "job_id": args.job_id,
+        "file_size": file_size,
+        "etag": etag,
+        "full_download": {
+            "bytes": full_bytes,
+            "latency_ms": round(full_latency * 1000, 2)
+        },
+        "seeks": {
+            "chunk_bytes": args.chunk,
+            "bytes": seek_bytes,
+            "statuses": seek_statuses,
+            "latency": summarize_latencies(seek_latencies)
+        },
+        "revalidations": {
+            "bytes": revalidation_bytes,
+            "statuses": revalidation_statuses,
+            "latency": summarize_latencies(revalidation_latencies)
+        },
+        "bytes_transferred": transferred,
+        "bytes_without_range_or_etag": naive_bytes,
+        "bytes_saved_ratio": round(1 - transferred / naive_bytes, 4) if naive_bytes else None
+    }
+
+
+def bench_overload(args) -> Dict:
+    """
+    과부하 시나리오: --clients 개 클라이언트가 합쳐서 초당 --rate 건씩 --requests 건을 요청합니다.
+    --deadline-ratio 비율의 요청에는 --deadline-seconds 뒤의 마감 시각을 붙입니다.
+    수용/거절 건수와 Retry-After, 수용된 작업의 최종 결과(완료/마감 초과)를 집계합니다.
+    서버는 MEMORIA_WORKER_BACKEND=simulate 로 띄우는 것을 권장합니다.
+    """
+    rng = random.Random(args.seed)
+    session = requests.Session()
+
+    def submit(index: int, with_deadline: bool) -> Dict:
+        body = {
+            "genre_txt": "benchmark",
+            "lyrics_txt": f"[verse]\noverload {args.seed} {index}",
+            "client_id": f"client-{index % args.clients}"
+        }
+        if with_deadline:
+            body["deadline"] = (datetime.now().astimezone()
+                                + timedelta(seconds=args.deadline_seconds)).isoformat()
+        started = time.perf_counter()
+        response = session.post(f"{args.base_url}/generate-music-async/", json=body)
+        return {
+            "status_code": response.status_code,
+            "latency": time.perf_counter() - started,
+            "retry_after": response.headers.get("retry-after"),
+            "job_id": response.json().get("job_id") if response.status_code == 200 else None
+        }
+
+    results = []
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        futures = []
+        for index in range(args.requests):
+            futures.append(executor.submit(
+                submit, index, rng.random() < args.deadline_ratio))
+            time.sleep(1 / args.rate)
+        results = [future.result() for future in futures]
+
+    accepted = [result for result in results if result["status_code"] == 200]
+    statuses: Dict[int, int] = {}
+    for result in results:
+        statuses[result["status_code"]] = statuses.get(result["status_code"], 0) + 1
+    retry_afters = [int(result["retry_after"]) for result in results if result["retry_after"]]
+
+    # 수용된 작업이 모두 끝날 때까지 기다린다
+    outcomes: Dict[str, int] = {}
+    deadline_dropped = 0
+    wait_until = time.monotonic() + args.drain_timeout
+    pending = [result["job_id"] for result in accepted]
+    while pending and time.monotonic() < wait_until:
+        still_pending = []
+        for job_id in pending:
+            job = session.get(f"{args.base_url}/job-status/{job_id}").json()
+            if job["status"] in ("queued", "processing"):
+                still_pending.append(job_id)
+                continue
+            outcomes[job["status"]] = outcomes.get(job["status"], 0) + 1
+            if job["status"] == "failed" and "마감" in (job.get("error") or ""):
+                deadline_dropped += 1
+        pending = still_pending
+        if pending:
+            time.sleep(1.0)
+
+    server_status = session.get(f"{args.base_url}/status").json()
+    return {
+        "scenario": "overload",
+        "requests": args.requests,
+        "rate_per_second": args.rate,
+        "clients": args.clients,
+        "statuses": statuses,
+        "accepted": len(accepted),
+        "rejected": len(results) - len(accepted),
+        "admission_latency": summarize_latencies([result["latency"] for result in results]),
+        "retry_after_seconds": {
+            "count": len(retry_afters),
+            "min": min(retry_afters) if retry_afters else None,
+            "max": max(retry_afters) if retry_afters else None,
+            "mean": round(statistics.mean(retry_afters), 1) if retry_afters else None
+        },
+        "outcomes": outcomes,
+        "deadline_dropped": deadline_dropped,
+        "still_pending": len(pending),
+        "server_admission": server_status.get("admission"),
+        "server_queue": server_status.get("queue")
+    }
+
+
+def wait_for_jobs(session: requests.Session, base_url: str, job_ids: List[str],
+                  timeout: float) -> Dict[str, int]:
+    """작업들이 모두 끝날 때까지 기다리고 최종 상태별 개수를 반환합니다."""
+    outcomes: Dict[str, int] = {}
+    pending = list(job_ids)
+    wait_until = time.monotonic() + timeout
+    while pending and time.monotonic() < wait_until:
+        still_pending = []
+        for job_id in pending:
+            status = session.get(f"{base_url}/job-status/{job_id}").json()["status"]
+            if status in ("queued", "processing"):
+                still_pending.append(job_id)
+            else:
+                outcomes[status] = outcomes.get(status, 0) + 1
+        pending = still_pending
+        if pending:
+            time.sleep(0.5)
+    if pending:
+        outcomes["timeout"] = len(pending)
+    return outcomes
+
+
+def bench_batch(args) -> Dict:
+    """
+    배치 처리량 시나리오: --songs 곡을 단건 요청으로 하나씩 넣었을 때와
+    /generate-music-batch/ 한 번으로 넣었을 때의 전체 소요 시간과 GPU 시간당 곡 수를 비교합니다.
+    캐시 적중을 피하려고 매 실행마다 다른 가사를 사용하며, GPU 수는 /status 의 워커 수로 계산합니다.
+    """
+    session = requests.Session()
+    gpus = len(session.get(f"{args.base_url}/status").json().get("workers", [])) or 1
+    run_id = f"{args.seed}-{time.time_ns()}"
+
+    def item(mode: str, index: int) -> Dict:
+        return {"genre_txt": "benchmark", "lyrics_txt": f"[verse]\nbatch {run_id} {mode} {index}"}
+
+    def summarize(mode: str, submit_seconds: float, job_ids: List[str], started: float) -> Dict:
+        outcomes = wait_for_jobs(session, args.base_url, job_ids, args.drain_timeout)
+        elapsed = time.perf_counter() - started
+        completed = outcomes.get("completed", 0)
+        return {
+            "mode": mode,
+            "songs": len(job_ids),
+            "submit_ms": round(submit_seconds * 1000, 2),
+            "wall_seconds": round(elapsed, 2),
+            "outcomes": outcomes,
+            "songs_per_hour": round(completed / elapsed * 3600, 1),
+            "songs_per_gpu_hour": round(completed / (elapsed * gpus / 3600), 1)
+        }
+
+    started = time.perf_counter()
+    job_ids = []
+    for index in range(args.songs):
+        response = session.post(f"{args.base_url}/generate-music-async/",
+                                json={**item("single", index), "client_id": "bench-single"})
+        response.raise_for_status()
+        job_ids.append(response.json()["job_id"])
+    single = summarize("single", time.perf_counter() - started, job_ids, started)
+
+    started = time.perf_counter()
+    response = session.post(f"{args.base_url}/generate-music-batch/", json={
+        "items": [item("batch", index) for index in range(args.songs)],
+        "client_id": "bench-batch"
+    })
+    response.raise_for_status()
+    batch_id = response.json()["batch_id"]
+    batch = summarize("batch", time.perf_counter() - started, response.json()["job_ids"], started)
+    batch["batch_status"] = {
+        key: value
+        for key, value in session.get(f"{args.base_url}/batches/{batch_id}").json().items()
+        if key != "jobs"
+    }
+
+    return {
+        "scenario": "batch",
+        "gpus": gpus,
+        "single": single,
+        "batch": batch,
+        "speedup": round(single["wall_seconds"] / batch["wall_seconds"], 3)
+        if batch["wall_seconds"] else None
+    }
+
+
+def bench_takes(args) -> Dict:
+    """
+    테이크 비용 시나리오: 같은 가사를 num_takes=1..--max-takes 로 하나씩 생성해
+    작업 처리 시간(started_at -> completed_at)과 추가 테이크 하나의 한계 비용을 측정합니다.
+    --repeats 번 반복한 평균을 사용하며, 캐시 적중을 피하려고 매 실행마다 다른 가사를 사용합니다.
+    """
+    session = requests.Session()
+    run_id = f"{args.seed}-{time.time_ns()}"
+
+    def job_seconds(num_takes: int, repeat: int) -> Dict:
+        response = session.post(f"{args.base_url}/generate-music-async/", json={
+            "genre_txt": "benchmark",
+            "lyrics_txt": f"[verse]\ntakes {run_id} {num_takes} {repeat}",
+            "num_takes": num_takes,
+            "client_id": "bench-takes"
+        })
+        response.raise_for_status()
+        job_id = response.json()["job_id"]
+        outcomes = wait_for_jobs(session, args.base_url, [job_id], args.drain_timeout)
+        if outcomes.get("completed") != 1:
+            raise SystemExit(f"작업 실패: {job_id} {outcomes}")
+        job = session.get(f"{args.base_url}/job-status/{job_id}").json()
+        return {
+            "seconds": (datetime.fromisoformat(job["completed_at"])
+                        - datetime.fromisoformat(job["started_at"])).total_seconds(),
+            "take_seconds": job.get("take_seconds")
+        }
+
+    results = []
+    for num_takes in range(1, args.max_takes + 1):
+        runs = [job_seconds(num_takes, repeat) for repeat in range(args.repeats)]
+        results.append({
+            "num_takes": num_takes,
+            "job_seconds": round(statistics.mean(run["seconds"] for run in runs), 3),
+            "take_seconds": [run["take_seconds"] for run in runs]
+        })
+
+    single = results[0]["job_seconds"]
+    for result in results[1:]:
+        # 첫 테이크 이후 테이크 하나가 더하는 시간 (단독 작업 대비 비율)
+        extra = (result["job_seconds"] - single) / (result["num_takes"] - 1)
+        result["extra_take_seconds"] = round(extra, 3)
+        result["extra_take_cost_ratio"] = round(extra / single, 3) if single else None
+
+    return {
+        "scenario": "takes",
+        "repeats": args.repeats,
+        "results": results,
+        "server_takes": session.get(f"{args.base_url}/status").json().get("takes")
+    }
+
+def bench_pipeline(args) -> Dict:
+    """
+    파이프라인 처리량 시나리오: 서로 다른 곡 --songs 개를 한꺼번에 넣고, 모두 끝날 때까지
+    /status 의 단계별 대기 작업 수를 표본 조사하며 정상 상태 처리량을 측정합니다.
+    정상 상태 처리량은 첫 완료부터 마지막 완료까지의 완료 간격으로 계산해 첫 작업의 지연을 뺍니다.
+    MEMORIA_PIPELINE_MODE=full 과 split 서버(simulate 백엔드)에서 각각 실행해 compare 로 비교합니다.
+    """
+    session = requests.Session()
+    status = session.get(f"{args.base_url}/status").json()
+    workers = len(status.get("workers", [])) or 1
+    run_id = f"{args.seed}-{time.time_ns()}"
+
+    started = time.perf_counter()
+    job_ids = []
+    for index in range(args.songs):
+        response = session.post(f"{args.base_url}/generate-music-async/", json={
+            "genre_txt": "benchmark",
+            "lyrics_txt": f"[verse]\npipeline {run_id} {index}",
+            "client_id": "bench-pipeline"
+        })
+        response.raise_for_status()
+        job_ids.append(response.json()["job_id"])
+
+    # 대기열 깊이 표본 (작업이 끝나기를 기다리는 동안 별도 스레드에서 조사)
+    max_queued: Dict[str, int] = {}
+    stop = threading.Event()
+
+    def sample_queues():
+        while not stop.is_set():
+            stages = session.get(f"{args.base_url}/status").json().get("pipeline", {}).get("stages", {})
+            for stage, stats in stages.items():
+                max_queued[stage] = max(max_queued.get(stage, 0), stats.get("queued", 0))
+            stop.wait(args.sample_interval)
+
+    sampler = threading.Thread(target=sample_queues, daemon=True)
+    sampler.start()
+    try:
+        outcomes = wait_for_jobs(session, args.base_url, job_ids, args.drain_timeout)
+    finally:
+        stop.set()
+        sampler.join()
+    wall_seconds = time.perf_counter() - started
+
+    completed_at = sorted(
+        datetime.fromisoformat(job["completed_at"])
+        for job in (session.get(f"{args.base_url}/job-status/{job_id}").json() for job_id in job_ids)
+        if job["status"] == "completed")
+    steady = None
+    if len(completed_at) > 1:
+        span = (completed_at[-1] - completed_at[0]).total_seconds()
+        steady = round((len(completed_at) - 1) / span * 3600, 1) if span else None
+
+    return {
+        "scenario": "pipeline",
+        "pipeline": status.get("pipeline", {}).get("mode"),
+        "workers": workers,
+        "songs": args.songs,
+        "outcomes": outcomes,
+        "wall_seconds": round(wall_seconds, 2),
+        "songs_per_hour": round(len(completed_at) / wall_seconds * 3600, 1),
+        "steady_songs_per_hour": steady,
+        "steady_songs_per_worker_hour": round(steady / workers, 1) if steady else None,
+        "max_queued": max_queued
+    }
+
+
+@contextmanager
+def stub_server(args) -> Iterator[str]:
+    """stub_server.py 를 모의 처리 시간을 줄여 띄우고, 준비되면 base URL 을 넘겨줍니다."""
+    env = {
+        **os.environ,
+        "MEMORIA_STUB_ASYNC_SECONDS": str(args.stub_job_seconds),
+        "MEMORIA_STUB_SYNC_SECONDS": str(args.stub_sync_seconds),
+        "MEMORIA_STUB_FILE_BYTES": str(args.stub_file_bytes)
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "stub_server:app", "--host", "127.0.0.1",
+         "--port", str(args.stub_port), "--log-level", "warning"],
+        cwd=WORKING_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{args.stub_port}"
+    try:
+        wait_until = time.monotonic() + 30
+        while True:
+            if process.poll() is not None:
+                raise SystemExit(f"스텁 서버가 시작하지 못했습니다 (종료 코드 {process.returncode})")
+            try:
+                requests.get(f"{base_url}/status", timeout=1).raise_for_status()
+                break
+            except requests.RequestException:
+                if time.monotonic() > wait_until:
+                    raise SystemExit("스텁 서버가 30초 안에 준비되지 않았습니다.")
+                time.sleep(0.2)
+        yield base_url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=WORKING_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_concurrent(clients: int, duration: float,
+                   request: Callable[[requests.Session, random.Random], requests.Response]) -> Dict:
+    """--clients 개 스레드가 --duration 초 동안 쉬지 않고 요청을 보낸 처리량과 지연 시간"""
+    deadline = time.monotonic() + duration
+
+    def client(index: int):
+        session = requests.Session()
+        rng = random.Random(index)
+        latencies = []
+        statuses: Dict[int, int] = {}
+        received = 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            response = request(session, rng)
+            received += len(response.content)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        return latencies, statuses, received
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        results = list(executor.map(client, range(clients)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for result in results for latency in result[0]]
+    statuses: Dict[int, int] = {}
+    for _, client_statuses, _ in results:
+        for status_code, count in client_statuses.items():
+            statuses[status_code] = statuses.get(status_code, 0) + count
+    received = sum(result[2] for result in results)
+    return {
+        "clients": clients,
+        "seconds": round(elapsed, 2),
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "statuses": statuses,
+        "bytes": received,
+        "megabytes_per_second": round(received / elapsed / 1_000_000, 2),
+        "latency": summarize_latencies(latencies)
+    }
+
+
+def measure_sse_fanout(base_url: str, subscribers: int, submit: Callable[[int], Optional[str]],
+                       events: int, timeout: float) -> Dict:
+    """
+    /events 구독자 --subscribers 개를 연결해 둔 채로 작업을 하나씩 제출하고,
+    제출 시점부터 각 구독자가 그 작업이 담긴 이벤트를 받기까지의 지연 시간을 잽니다.
+    """
+    targets: List[str] = []
+    seen: List[Dict[str, float]] = [{} for _ in range(subscribers)]
+    responses: List[requests.Response] = []
+    connected = threading.Semaphore(0)
+    stopping = threading.Event()
+
+    def subscribe(index: int):
+        try:
+            response = requests.get(f"{base_url}/events", stream=True, timeout=(10, None))
+        except requests.RequestException:
+            connected.release()
+            return
+        responses.append(response)
+        connected.release()
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if stopping.is_set():
+                    break
+                if not line or not line.startswith("data:"):
+                    continue
+                received_at = time.perf_counter()
+                for job_id in list(targets):
+                    if job_id not in seen[index] and job_id in line:
+                        seen[index][job_id] = received_at
+        except Exception:
+            # 측정이 끝나 연결을 닫으면 읽던 스트림에서 예외가 난다
+            pass
+
+    threads = [threading.Thread(target=subscribe, args=(index,), daemon=True)
+               for index in range(subscribers)]
+    connect_started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for _ in threads:
+        connected.acquire()
+    connect_seconds = time.perf_counter() - connect_started
+
+    latencies = []
+    delivered_all = []
+    missed = 0
+    rejected = 0
+    for index in range(events):
+        submitted_at = time.perf_counter()
+        job_id = submit(index)
+        if job_id is None:
+            rejected += 1
+            continue
+        targets.append(job_id)
+        wait_until = time.monotonic() + timeout
+        while time.monotonic() < wait_until:
+            if sum(job_id in subscriber_seen for subscriber_seen in seen) >= len(responses):
+                break
+            time.sleep(0.01)
+        arrivals = [subscriber_seen[job_id] - submitted_at
+                    for subscriber_seen in seen if job_id in subscriber_seen]
+        latencies.extend(arrivals)
+        missed += len(responses) - len(arrivals)
+        if len(arrivals) == len(responses) and arrivals:
+            delivered_all.append(max(arrivals))
+
+    stopping.set()
+    for response in responses:
+        response.close()
+    return {
+        "subscribers": subscribers,
+        "connected": len(responses),
+        "connect_seconds": round(connect_seconds, 2),
+        "events": events,
+        "rejected_submits": rejected,
+        "missed_deliveries": missed,
+        "delivery_latency": summarize_latencies(latencies),
+        "all_subscribers_latency": summarize_latencies(delivered_all)
+    }
+
+
+def bench_load(args) -> Dict:
+    """
+    API 서버 부하 시나리오 (스텁 서버 권장: --start-stub):
+    1) 제출 지연: --clients 개 클라이언트가 동시에 --submits 건씩 비동기 생성 요청
+    2) /job-status 와 /jobs 조회 처리량 (각 --duration 초)
+    3) SSE 팬아웃: 구독자 --subscribers 개에게 작업 이벤트 --events 개가 전달되는 지연
+    4) 다운로드 처리량: 완료된 곡 하나를 --clients 개 클라이언트가 --duration 초 동안 반복 다운로드
+    """
+    run_id = f"{args.seed}-{time.time_ns()}"
+    session = requests.Session()
+
+    def submit_body(name: str, index: int) -> Dict:
+        return {
+            "genre_txt": "benchmark",
+            "lyrics_txt": f"[verse]\nload {run_id} {name} {index}",
+            "client_id": f"bench-load-{index % args.clients}"
+        }
+
+    def submit_client(client: int):
+        client_session = requests.Session()
+        results = []
+        for index in range(args.submits):
+            started = time.perf_counter()
+            response = client_session.post(
+                f"{args.base_url}/generate-music-async/",
+                json=submit_body("submit", client * args.submits + index))
+            results.append((response.status_code, time.perf_counter() - started,
+                            response.json().get("job_id") if response.status_code == 200 else None))
+        return results
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as executor:
+        submitted = [result for results in executor.map(submit_client, range(args.clients))
+                     for result in results]
+    submit_seconds = time.perf_counter() - started
+    submit_statuses: Dict[int, int] = {}
+    for status_code, _, _ in submitted:
+        submit_statuses[status_code] = submit_statuses.get(status_code, 0) + 1
+    job_ids = [job_id for _, _, job_id in submitted if job_id]
+    if not job_ids:
+        raise SystemExit(f"제출된 작업이 없습니다: {submit_statuses}")
+
+    job_status = run_concurrent(
+        args.clients, args.duration,
+        lambda client_session, rng: client_session.get(
+            f"{args.base_url}/job-status/{rng.choice(job_ids)}"))
+    job_list = run_concurrent(
+        args.clients, args.duration,
+        lambda client_session, _: client_session.get(f"{args.base_url}/jobs"))
+
+    def submit_event(index: int) -> Optional[str]:
+        response = session.post(f"{args.base_url}/generate-music-async/",
+                                json=submit_body("sse", index))
+        return response.json()["job_id"] if response.status_code == 200 else None
+
+    sse = measure_sse_fanout(args.base_url, args.subscribers, submit_event,
+                             args.events, args.event_timeout)
+
+    # 첫 번째로 제출한 작업이 끝나면 그 파일로 다운로드 처리량을 잰다
+    outcomes = wait_for_jobs(session, args.base_url, job_ids[:1], args.drain_timeout)
+    if outcomes.get("completed") == 1:
+        download = run_concurrent(
+            args.clients, args.duration,
+            lambda client_session, _: client_session.get(
+                f"{args.base_url}/music/download/{job_ids[0]}"))
+    else:
+        download = {"skipped": f"다운로드할 완료 작업이 없습니다: {outcomes}"}
+
+    server_status = session.get(f"{args.base_url}/status").json()
+    return {
+        "scenario": "load",
+        "meta": {
+            "git_revision": git_revision(),
+            "started_at": datetime.now().astimezone().isoformat(),
+            "base_url": args.base_url,
+            "server_type": server_status.get("server_type", "main"),
+            "stub": {
+                "job_seconds": args.stub_job_seconds,
+                "sync_seconds": args.stub_sync_seconds,
+                "file_bytes": args.stub_file_bytes
+            } if args.start_stub else None
+        },
+        "submit": {
+            "clients": args.clients,
+            "requests": len(submitted),
+            "seconds": round(submit_seconds, 2),
+            "requests_per_second": round(len(submitted) / submit_seconds, 1),
+            "statuses": submit_statuses,
+            "latency": summarize_latencies([latency for _, latency, _ in submitted])
+        },
+        "job_status": job_status,
+        "jobs": job_list,
+        "sse": sse,
+        "download": download
+    }
+
+
+def flatten_numbers(value, prefix: str = "") -> Dict[str, float]:
+    """중첩된 결과 JSON 에서 숫자 값만 "a.b.c" 키로 모읍니다."""
+    if isinstance(value, bool):
+        return {}
+    if isinstance(value, (int, float)):
+        return {prefix: value}
+    if isinstance(value, dict):
+        numbers = {}
+        for key, item in value.items():
+            numbers.update(flatten_numbers(item, f"{prefix}.{key}" if prefix else str(key)))
+        return numbers
+    return {}
+
+
+def compare_results(args) -> Dict:
+    """
+    같은 시나리오의 결과 JSON 두 개(이전/이후 버전)를 비교합니다.
+    숫자 값마다 이전 값, 이후 값, 변화율을 보여주며 --threshold 보다 크게 바뀐 항목을 따로 모읍니다.
+    (지연 시간은 커지면, 처리량은 작아지면 나빠진 것이므로 방향은 항목 이름을 보고 판단합니다.)
+    """
+    with open(args.before, encoding="utf-8") as f:
+        before = flatten_numbers(json.load(f))
+    with open(args.after, encoding="utf-8") as f:
+        after = flatten_numbers(json.load(f))
+
+    changes = {}
+    for key in sorted(set(before) & set(after)):
+        old, new = before[key], after[key]
+        changes[key] = {
+            "before": old,
+            "after": new,
+            "change_ratio": round((new - old) / old, 4) if old else None
+        }
+    return {
+        "before": args.before,
+        "after": args.after,
+        "changes": changes,
+        "significant": {
+            key: change for key, change in changes.items()
+            if change["change_ratio"] is not None and abs(change["change_ratio"]) >= args.threshold
+        },
+        "only_before": sorted(set(before) - set(after)),
+        "only_after": sorted(set(after) - set(before))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria Music API 벤치마크")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--output", help="결과를 저장할 JSON 파일 경로")
+    # 시나리오 이름 뒤에 --output 을 써도 받아들인다
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--output", default=argparse.SUPPRESS, help="결과를 저장할 JSON 파일 경로")
+    parser.add_argument("--start-stub", action="store_true",
+                        help="stub_server.py 를 직접 띄워 그 서버를 대상으로 측정 (--base-url 무시)")
+    parser.add_argument("--stub-port", type=int, default=8041)
+    parser.add_argument("--stub-job-seconds", type=float, default=0.05,
+                        help="스텁의 비동기 작업 하나의 모의 처리 시간(초)")
+    parser.add_argument("--stub-sync-seconds", type=float, default=0.05,
+                        help="스텁의 동기 생성 요청 모의 처리 시간(초)")
+    parser.add_argument("--stub-file-bytes", type=int, default=1_000_000,
+                        help="스텁이 만드는 MP3 파일의 무음 데이터 크기(바이트)")
+    subparsers = parser.add_subparsers(dest="scenario", required=True)
+
+    download = subparsers.add_parser("download", parents=[common], help="탐색 위주 재생 + 재다운로드")
+    download.add_argument("job_id", help="완료된 작업 ID")
+    download.add_argument("--seeks", type=int, default=200)
+    download.add_argument("--chunk", type=int, default=64 * 1024,
+                          help="탐색 한 번에 요청할 바이트 수")
+    download.add_argument("--revalidations", type=int, default=50)
+    download.add_argument("--seed", type=int, default=0)
+    download.set_defaults(func=bench_download)
+
+    overload = subparsers.add_parser("overload", parents=[common], help="수용 제어/마감 시각 과부하 테스트")
+    overload.add_argument("--requests", type=int, default=300)
+    overload.add_argument("--rate", type=float, default=20.0, help="초당 요청 수")
+    overload.add_argument("--clients", type=int, default=5)
+    overload.add_argument("--deadline-ratio", type=float, default=0.3)
+    overload.add_argument("--deadline-seconds", type=float, default=30.0)
+    overload.add_argument("--drain-timeout", type=float, default=600.0,
+                          help="수용된 작업이 끝나기를 기다리는 최대 시간(초)")
+    overload.add_argument("--seed", type=int, default=0)
+    overload.set_defaults(func=bench_overload)
+
+    batch = subparsers.add_parser("batch", parents=[common], help="배치 요청 vs 단건 요청 처리량 비교")
+    batch.add_argument("--songs", type=int, default=20)
+    batch.add_argument("--drain-timeout", type=float, default=3600.0,
+                       help="작업이 끝나기를 기다리는 최대 시간(초)")
+    batch.add_argument("--seed", type=int, default=0)
+    batch.set_defaults(func=bench_batch)
+
+    takes = subparsers.add_parser("takes", parents=[common], help="추가 테이크 비용 측정")
+    takes.add_argument("--max-takes", type=int, default=3)
+    takes.add_argument("--repeats", type=int, default=3)
+    takes.add_argument("--drain-timeout", type=float, default=3600.0,
+                       help="작업 하나가 끝나기를 기다리는 최대 시간(초)")
+    takes.add_argument("--seed", type=int, default=0)
+    takes.set_defaults(func=bench_takes)
+
+    pipeline = subparsers.add_parser("pipeline", parents=[common], help="단계별 파이프라인 정상 상태 처리량 측정")
+    pipeline.add_argument("--songs", type=int, default=20)
+    pipeline.add_argument("--sample-interval", type=float, default=0.2,
+                          help="/status 대기열 깊이 표본 간격(초)")
+    pipeline.add_argument("--drain-timeout", type=float, default=3600.0,
+                          help="작업이 끝나기를 기다리는 최대 시간(초)")
+    pipeline.add_argument("--seed", type=int, default=0)
+    pipeline.set_defaults(func=bench_pipeline)
+
+    load = subparsers.add_parser("load", parents=[common], help="제출/조회/SSE 팬아웃/다운로드 부하 측정")
+    load.add_argument("--clients", type=int, default=16, help="동시 클라이언트 수")
+    load.add_argument("--submits", type=int, default=10, help="클라이언트당 제출 요청 수")
+    load.add_argument("--duration", type=float, default=10.0,
+                      help="조회/다운로드 처리량 측정 시간(초)")
+    load.add_argument("--subscribers", type=int, default=200, help="SSE 구독자 수")
+    load.add_argument("--events", type=int, default=5, help="SSE 팬아웃을 잴 작업 수")
+    load.add_argument("--event-timeout", type=float, default=30.0,
+                      help="모든 구독자가 이벤트를 받기를 기다리는 최대 시간(초)")
+    load.add_argument("--drain-timeout", type=float, default=600.0,
+                      help="다운로드할 작업이 끝나기를 기다리는 최대 시간(초)")
+    load.add_argument("--seed", type=int, default=0)
+    load.set_defaults(func=bench_load)
+
+    compare = subparsers.add_parser("compare", parents=[common], help="두 결과 JSON 비교 (회귀 확인)")
+    compare.add_argument("before", help="이전 버전 결과 JSON")
+    compare.add_argument("after", help="이후 버전 결과 JSON")
+    compare.add_argument("--threshold", type=float, default=0.1,
+                         help="따로 모아 보여줄 변화율 기준 (0.1 = 10%%)")
+    compare.set_defaults(func=compare_results)
+
+    args = parser.parse_args()
+    if args.start_stub and args.scenario != "compare":
+        with stub_server(args) as base_url:
+            args.base_url = base_url
+            result = args.func(args)
+    else:
+        result = args.func(args)
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+SSE 이벤트 브로커
+
+작업 상태가 바뀔 때마다 모든 작업을 직렬화해 모든 클라이언트에 보내는 대신,
+변경된 작업만 담은 이벤트를 단조 증가하는 ID 와 함께 발행하고 구독자별 큐로 나눠 줍니다.
+
+- 짧은 시간(debounce) 안에 몰린 변경은 하나의 이벤트로 합칩니다.
+- 이벤트 데이터는 발행 시 한 번만 직렬화하고 모든 구독자가 같은 문자열을 공유합니다.
+- 최근 이벤트를 보관하므로 클라이언트가 Last-Event-ID 로 끊긴 지점부터 이어 받을 수 있습니다.
+- 특정 작업만 구독하는 구독자는 그 작업이 포함된 이벤트만 받습니다.
+"""
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Set
+
+
+class BrokerEvent:
+    """발행된 이벤트 하나. 직렬화 결과는 캐시해 구독자끼리 공유합니다."""
+
+    def __init__(self, event_id: int, jobs: Dict[str, Optional[Dict]], extra: Dict,
+                 kind: str = "job_update"):
+        self.id = event_id
+        self.kind = kind
+        self.jobs = jobs
+        self.extra = extra
+        self._data: Optional[str] = None
+        self._job_data: Dict[str, str] = {}
+
+    @property
+    def data(self) -> str:
+        if self._data is None:
+            self._data = json.dumps({**self.extra, "jobs": self.jobs})
+        return self._data
+
+    def data_for(self, job_id: Optional[str]) -> str:
+        """구독 대상에 맞는 이벤트 데이터 (작업별 구독은 해당 작업만 담음)"""
+        if job_id is None:
+            return self.data
+        if job_id not in self._job_data:
+            self._job_data[job_id] = json.dumps(
+                {**self.extra, "jobs": {job_id: self.jobs[job_id]}})
+        return self._job_data[job_id]
+
+
+class Subscriber:
+    """SSE 연결 하나. 큐가 가득 차면(느린 클라이언트) 연결을 끊고 재접속으로 이어 받게 합니다."""
+
+    def __init__(self, job_id: Optional[str], queue_size: int):
+        self.job_id = job_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+
+    def push(self, event: Optional[BrokerEvent]):
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # 연결 종료 신호(None)를 넣을 자리를 만들고 더 이상 이벤트를 받지 않는다
+            self.closed = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class EventBroker:
+    """변경분 기반 SSE 팬아웃 브로커"""
+
+    def __init__(self, get_job: Callable[[str], Optional[Dict]],
+                 get_all_jobs: Callable[[], Dict[str, Dict]],
+                 get_extra: Callable[[], Dict],
+                 debounce_seconds: float = 0.1,
+                 history_size: int = 1000,
+                 subscriber_queue_size: int = 256):
+        self.get_job = get_job
+        self.get_all_jobs = get_all_jobs
+        self.get_extra = get_extra
+        self.debounce_seconds = debounce_seconds
+        self.subscriber_queue_size = subscriber_queue_size
+        self.last_event_id = 0
+        self.history: Deque[BrokerEvent] = deque(maxlen=history_size)
+        self.events_published = 0
+        self._subscribers: Set[Subscriber] = set()
+        self._job_subscribers: Dict[str, Set[Subscriber]] = {}
+        self._pending: Set[str] = set()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers) + sum(
+            len(subscribers) for subscribers in self._job_subscribers.values())
+
+    def mark_changed(self, *job_ids: str):
+        """작업이 바뀌었음을 알립니다. debounce 시간 뒤에 한 이벤트로 묶어 발행합니다."""
+        self._pending.update(job_ids)
+        if self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(self.debounce_seconds, self.flush)
+
+    def flush(self):
+        """보류 중인 변경을 즉시 하나의 이벤트로 발행합니다."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+
+        job_ids, self._pending = self._pending, set()
+        # 발행 시점의 상태를 복사해 둔다 (이후 변경이 과거 이벤트에 섞이지 않도록)
+        jobs = {}
+        for job_id in job_ids:
+            job = self.get_job(job_id)
+            jobs[job_id] = dict(job) if job is not None else None
+
+        self.last_event_id += 1
+        event = BrokerEvent(self.last_event_id, jobs, self.get_extra())
+        self.history.append(event)
+        self.events_published += 1
+
+        for subscriber in self._subscribers:
+            subscriber.push(event)
+        for job_id in jobs:
+            for subscriber in self._job_subscribers.get(job_id, ()):
+                subscriber.push(event)
+
+    def subscribe(self, job_id: Optional[str] = None,
+                  last_event_id: Optional[int] = None) -> Subscriber:
+        """
+        구독자를 등록합니다. last_event_id 가 주어지면 그 이후의 이벤트를 먼저 채워 넣고,
+        보관 기간이 지나 이어 받을 수 없거나 놓친 이벤트가 구독자 큐에 다 들어가지 않으면
+        현재 전체 상태(스냅샷) 이벤트를 넣습니다.
+        """
+        subscriber = Subscriber(job_id, self.subscriber_queue_size)
+
+        if last_event_id is not None and last_event_id < self.last_event_id:
+            oldest_id = self.history[0].id if self.history else self.last_event_id + 1
+            missed = [event for event in self.history
+                      if event.id > last_event_id and (job_id is None or job_id in event.jobs)]
+            # 놓친 이벤트로 큐를 절반 넘게 채우면 이어서 오는 이벤트에 큐가 넘쳐 바로 끊기므로
+            # 오래 끊겼던 클라이언트에는 스냅샷 하나로 대신한다
+            if last_event_id + 1 < oldest_id or len(missed) > self.subscriber_queue_size // 2:
+                subscriber.push(self.snapshot(job_id))
+            else:
+                for event in missed:
+                    subscriber.push(event)
+        elif last_event_id is None and job_id is not None:
+            # 작업별 구독은 현재 상태부터 바로 받는다
+            subscriber.push(self.snapshot(job_id))
+
+        if job_id is None:
+            self._subscribers.add(subscriber)
+        else:
+            self._job_subscribers.setdefault(job_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscriber.closed = True
+        if subscriber.job_id is None:
+            self._subscribers.discard(subscriber)
+            return
+        subscribers = self._job_subscribers.get(subscriber.job_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._job_subscribers[subscriber.job_id]
+
+    def snapshot(self, job_id: Optional[str] = None) -> BrokerEvent:
+        """현재 이벤트 ID 기준의 전체(또는 단일 작업) 상태 이벤트를 만듭니다."""
+        if job_id is not None:
+            job = self.get_job(job_id)
+            jobs = {job_id: dict(job) if job is not None else None}
+        else:
+            jobs = {job_id: dict(job) for job_id, job in self.get_all_jobs().items()}
+        return BrokerEvent(self.last_event_id, jobs, self.get_extra(), kind="snapshot")
+
+    def stats(self) -> Dict:
+        return {
+            "subscribers": self.subscriber_count,
+            "last_event_id": self.last_event_id,
+            "events_published": self.events_published
+        }
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    """Last-Event-ID 헤더 값을 정수로 변환합니다. 잘못된 값은 무시합니다."""
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        logging.warning(f"잘못된 Last-Event-ID 무시: {value!r}")
+        return None
@@ -0,0 +1,130 @@
+"""
+우선순위 + 클라이언트별 공정 작업 큐
+
+단순 FIFO 큐에서는 한 클라이언트가 곡 50개를 한꺼번에 넣으면 다른 클라이언트가 몇 시간씩 기다립니다.
+이 큐는 우선순위가 높은 작업을 먼저 내보내고, 같은 우선순위 안에서는 클라이언트 키별로
+가중치만큼씩 번갈아 꺼내는 가중 라운드 로빈(weighted round-robin)으로 공정하게 배분합니다.
+
+스케줄러가 쓰던 asyncio.Queue 와 같은 get/put_nowait/qsize 인터페이스를 제공하며,
+꺼내는 순서가 결정적이므로 대기 순번(queue position)을 미리 계산할 수 있습니다.
+"""
+import asyncio
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# 낮은 숫자가 먼저 처리된다
+PRIORITY_LEVELS = {"high": 0, "normal": 1, "low": 2}
+DEFAULT_PRIORITY = "normal"
+
+# 우선순위 -> (클라이언트 키 -> 대기 작업). OrderedDict 의 순서가 라운드 로빈 차례다.
+Levels = Dict[int, "OrderedDict[str, Deque[Tuple[str, Any]]]"]
+
+
+def parse_client_weights(value: str) -> Dict[str, int]:
+    """"app=3,web=1" 형식의 클라이언트 가중치 설정을 읽습니다."""
+    weights = {}
+    for entry in value.split(","):
+        client_key, _, weight = entry.strip().partition("=")
+        if client_key and weight.strip().isdigit():
+            weights[client_key] = max(1, int(weight))
+    return weights
+
+
+class FairJobQueue:
+    """우선순위 + 가중 라운드 로빈 작업 큐"""
+
+    def __init__(self, client_weights: Optional[Dict[str, int]] = None):
+        self.client_weights = client_weights or {}
+        self._levels: Levels = {}
+        # (우선순위, 클라이언트 키) -> 이번 차례에 더 꺼낼 수 있는 작업 수
+        self._credits: Dict[Tuple[int, str], int] = {}
+        self._size = 0
+        self._available = asyncio.Event()
+
+    def qsize(self) -> int:
+        return self._size
+
+    def empty(self) -> bool:
+        return self._size == 0
+
+    def weight(self, client_key: str) -> int:
+        return self.client_weights.get(client_key, 1)
+
+    def put_nowait(self, job_id: str, item: Any, client_key: str,
+                   priority: str = DEFAULT_PRIORITY):
+        level = PRIORITY_LEVELS.get(priority, PRIORITY_LEVELS[DEFAULT_PRIORITY])
+        clients = self._levels.setdefault(level, OrderedDict())
+        if client_key not in clients:
+            # 새로 온 클라이언트는 라운드 로빈의 맨 뒤에 선다
+            clients[client_key] = deque()
+        clients[client_key].append((job_id, item))
+        self._size += 1
+        self._available.set()
+
+    async def get(self) -> Any:
+        """다음 차례의 작업을 꺼냅니다. 큐가 비어 있으면 작업이 들어올 때까지 기다립니다."""
+        while self._size == 0:
+            self._available.clear()
+            await self._available.wait()
+        self._size -= 1
+        _, item = self._pop(self._levels, self._credits)
+        return item
+
+    def _pop(self, levels: Levels, credits: Dict[Tuple[int, str], int]) -> Tuple[str, Any]:
+        level = min(level for level, clients in levels.items() if clients)
+        clients = levels[level]
+        client_key, jobs = next(iter(clients.items()))
+
+        entry = jobs.popleft()
+        remaining = credits.get((level, client_key), self.weight(client_key)) - 1
+        if not jobs:
+            del clients[client_key]
+            credits.pop((level, client_key), None)
+        elif remaining <= 0:
+            # 가중치만큼 꺼냈으면 다음 클라이언트에게 차례를 넘긴다
+            clients.move_to_end(client_key)
+            credits[(level, client_key)] = self.weight(client_key)
+        else:
+            credits[(level, client_key)] = remaining
+        if not clients:
+            del levels[level]
+        return entry
+
+    def remove(self, job_id: str) -> Optional[Any]:
+        """대기 중인 작업을 큐에서 빼고 그 항목을 반환합니다 (취소용). 없으면 None."""
+        for level, clients in self._levels.items():
+            for client_key, jobs in clients.items():
+                for entry in jobs:
+                    if entry[0] != job_id:
+                        continue
+                    jobs.remove(entry)
+                    if not jobs:
+                        del clients[client_key]
+                        self._credits.pop((level, client_key), None)
+                        if not clients:
+                            del self._levels[level]
+                    self._size -= 1
+                    return entry[1]
+        return None
+
+    def ordered_job_ids(self) -> List[str]:
+        """지금 상태에서 작업이 꺼내질 순서대로 job_id 목록을 반환합니다 (큐는 바뀌지 않음)."""
+        levels: Levels = {
+            level: OrderedDict((client_key, deque(jobs)) for client_key, jobs in clients.items())
+            for level, clients in self._levels.items()
+        }
+        credits = dict(self._credits)
+        return [self._pop(levels, credits)[0] for _ in range(self._size)]
+
+    def stats(self) -> Dict:
+        by_priority = {name: 0 for name in PRIORITY_LEVELS}
+        clients: Dict[str, int] = {}
+        for name, level in PRIORITY_LEVELS.items():
+            for client_key, jobs in self._levels.get(level, {}).items():
+                by_priority[name] += len(jobs)
+                clients[client_key] = clients.get(client_key, 0) + len(jobs)
+        return {
+            "size": self._size,
+            "by_priority": by_priority,
+            "clients": clients
+        }
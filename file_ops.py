@@ -0,0 +1,123 @@
+"""
+결과 파일의 원자적 게시와 안전한 쓰기
+
+다운로드 중인 클라이언트나 서버가 비정상 종료된 뒤의 재시작이 반쯤 쓰인 파일을 보지 않도록,
+파일은 같은 디렉토리의 임시 파일에 쓰고 fsync 한 뒤 rename 으로 한 번에 바꿔 넣습니다.
+작업 공간의 결과 MP3 는 복사하지 않고 rename 으로 옮기며, 다른 파일 시스템이라
+rename 할 수 없을 때만 임시 파일로 복사한 뒤 rename 합니다.
+
+모두 블로킹 함수이므로 이벤트 루프에서는 asyncio.to_thread 로 호출합니다.
+"""
+import errno
+import logging
+import os
+import shutil
+import tempfile
+
+# 임시 파일 접미사 (재시작 시 남은 임시 파일 정리용)
+TEMP_SUFFIX = ".tmp"
+
+
+def fsync_directory(path: str):
+    """디렉토리 항목(rename 결과)을 디스크에 기록합니다. 지원하지 않는 플랫폼에서는 무시합니다."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def fsync_file(path: str):
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+
+def _temp_path(destination: str) -> str:
+    directory, name = os.path.split(destination)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=TEMP_SUFFIX, dir=directory or ".")
+    os.close(fd)
+    return temp_path
+
+
+def atomic_write_bytes(destination: str, data: bytes):
+    """임시 파일에 쓰고 fsync 한 뒤 rename 으로 destination 을 교체합니다."""
+    temp_path = _temp_path(destination)
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, destination)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    fsync_directory(os.path.dirname(destination) or ".")
+
+
+def atomic_write_text(destination: str, text: str, encoding: str = "utf-8"):
+    atomic_write_bytes(destination, text.encode(encoding))
+
+
+def publish_file(source: str, destination: str) -> str:
+    """
+    source 파일을 destination 으로 원자적으로 옮기고 사용한 방법("rename" / "copy")을 반환합니다.
+    source 는 옮긴 뒤 더 이상 쓰지 않는 파일(작업 공간의 결과물)이어야 합니다.
+    """
+    # 데이터가 디스크에 기록된 뒤에 이름이 바뀌어야 재시작 후 빈 파일이 남지 않는다
+    fsync_file(source)
+    try:
+        os.replace(source, destination)
+        method = "rename"
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # 다른 파일 시스템: 대상 디렉토리의 임시 파일로 복사한 뒤 rename
+        temp_path = _temp_path(destination)
+        try:
+            shutil.copyfile(source, temp_path)
+            shutil.copystat(source, temp_path)
+            fsync_file(temp_path)
+            os.replace(temp_path, destination)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        method = "copy"
+    fsync_directory(os.path.dirname(destination) or ".")
+    return method
+
+
+def link_or_copy(source: str, destination: str) -> str:
+    """
+    source 를 destination 에 하드링크하고, 안 되면(다른 파일 시스템 등) 복사합니다.
+    캐시의 읽기 전용 산출물을 작업 공간에 넣을 때 쓰며, 캐시 항목이 지워져도 링크는 남습니다.
+    """
+    try:
+        os.link(source, destination)
+        return "link"
+    except OSError:
+        shutil.copyfile(source, destination)
+        return "copy"
+
+
+def remove_stale_temp_files(directory: str) -> int:
+    """비정상 종료로 남은 임시 파일을 지우고 지운 개수를 반환합니다."""
+    removed = 0
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name.startswith(".") and entry.name.endswith(TEMP_SUFFIX):
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError as e:
+                logging.warning(f"임시 파일을 지울 수 없습니다: {entry.path} - {e}")
+    return removed
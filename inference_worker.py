@@ -0,0 +1,504 @@
+"""
+YuE 추론 워커 프로세스
+
+Stage1/Stage2 모델을 시작 시 한 번만 로드한 뒤, 표준 입출력 파이프를 통해
+작업을 받아 처리하는 장기 실행 프로세스입니다. main.py 가 이 프로세스를 띄우고
+작업마다 infer.py 를 새로 실행하는 대신 이 워커에 작업을 전달합니다.
+
+프로토콜: 한 줄에 JSON 객체 하나 (JSON Lines)
+
+    워커 -> 서버  {"type": "ready", "backend": "yue", "role": "full", "load_seconds": 41.2,
+                   "segment_audio": false}   (segment 메시지를 보내는 백엔드인지)
+    서버 -> 워커  {"type": "job", "job_id": "...", "genre_txt": "<경로>",
+                   "lyrics_txt": "<경로>", "output_dir": "<경로>", "num_takes": 1,
+                   "stage1_files": {"1": ["<경로>", ...]}}   (선택, 캐시된 테이크별 Stage1 산출물)
+    워커 -> 서버  {"type": "stage1", "job_id": "...", "take": 1, "files": ["<경로>", ...],
+                   "seconds": 95.2}   (Stage1 을 새로 실행해 산출물을 저장했을 때)
+    워커 -> 서버  {"type": "segment", "job_id": "...", "index": 1, "total": 8,
+                   "file": "<경로>"}   (재생 가능한 세그먼트 오디오가 준비될 때마다)
+    워커 -> 서버  {"type": "result", "job_id": "...", "ok": true,
+                   "output_file": "<경로>", "elapsed": 183.4,
+                   "takes": [{"file": "<경로>", "seed": 42, "elapsed": 183.4}, ...]}
+    워커 -> 서버  {"type": "result", "job_id": "...", "ok": false, "error": "..."}
+    서버 -> 워커  {"type": "shutdown"}
+
+모델 코드가 출력하는 print/tqdm 메시지가 프로토콜을 깨뜨리지 않도록,
+프로토콜 전용 채널은 원래의 stdout 을 복제해서 사용하고 fd 1 은 stderr 로 돌립니다.
+진행 단계는 stderr 에 "[progress] ..." 마커 줄로 출력하며 서버가 이를 파싱합니다.
+
+    [progress] stage1 start / [progress] stage1 done / [progress] stage1 cached
+    [progress] stage2 start / [progress] stage2 segment 3/8 / [progress] stage2 done
+    [progress] mixing
+    [progress] take 2/3   (num_takes 가 2 이상일 때 각 테이크 시작 시)
+
+num_takes 가 N 이면 로드된 모델과 읽어 둔 프롬프트로 시드만 바꿔 N 번 생성합니다.
+첫 테이크는 output_dir 에, 나머지는 output_dir/take_<n>/ 에 기록하며
+세그먼트 오디오(스트리밍)는 첫 테이크만 내보냅니다. yue 백엔드는 세그먼트 오디오를 내보내지 않습니다
+(YuEBackend.run 참고).
+stage1_files 에 테이크의 Stage1 산출물이 있으면 Stage1 을 건너뛰고 stage2 부터 실행합니다.
+
+`--role` 로 워커가 맡을 단계를 나눌 수 있습니다 (서버의 MEMORIA_PIPELINE_MODE=split).
+"stage1" 워커는 Stage1 모델만 로드해 Stage1 산출물을 만들고("stage1" 메시지) 결과 파일 없이
+끝나며, "stage2" 워커는 Stage2 모델만 로드해 stage1_files 로 받은 산출물에서 stage2 와 믹싱을
+실행합니다. 기본값 "full" 은 한 워커가 모든 단계를 실행합니다.
+
+`--backend simulate` 로 실행하면 GPU 없이 동일한 프로토콜을 구현하는
+가짜 워커로 동작하므로 큐 처리량을 CPU 만으로 테스트할 수 있습니다.
+infer.py 인자(--run_n_segments, --stage1_cache_size 등)를 그대로 받으며, 처리 시간 분포,
+가사 길이에 따른 시간 변화, 실패/워커 비정상 종료 주입은 --sim-* 옵션으로 조정합니다.
+
+    python inference_worker.py --backend simulate --sim-job-seconds 30 --sim-jitter 0.3 \
+        --sim-scale-lyrics --sim-failure-rate 0.05 --run_n_segments 4
+"""
+import argparse
+import json
+import math
+import os
+import random
+import re
+import sys
+import time
+import traceback
+from typing import Optional
+
+# 설정값 및 상수
+WORKING_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(WORKING_DIR)
+YUE_SRC_DIR = os.path.join(ROOT_DIR, "src", "yue")
+DEFAULT_OUTPUT_FILENAME = "mixed.mp3"
+SEGMENT_DIRNAME = "segments"
+# 시드가 주어지지 않았을 때의 기본값 (infer.py 와 동일), 테이크마다 1씩 더한다
+DEFAULT_SEED = 42
+# 워커가 맡는 파이프라인 단계
+WORKER_ROLES = ("full", "stage1", "stage2")
+# simulate 백엔드가 만드는 곡 길이(초)
+SIM_SONG_SECONDS = 5
+
+# 128kbps / 44.1kHz / joint stereo MPEG-1 Layer III 무음 프레임
+# (헤더 4바이트 + 0으로 채운 사이드 정보/메인 데이터 = 417바이트, 약 26ms)
+SILENT_MP3_FRAME = bytes([0xFF, 0xFB, 0x90, 0x64]) + b"\x00" * 413
+SILENT_MP3_FRAME_SECONDS = 1152 / 44100
+# infer.py 가 가사를 세그먼트로 나누는 기준과 같은 섹션 레이블 ([verse], [chorus] 등)
+LYRICS_SECTION_PATTERN = re.compile(r"\[(\w+)\](.*?)(?=\[|\Z)", re.DOTALL)
+
+
+def write_silent_mp3(file_path: str, seconds: float):
+    """지정한 길이의 무음 MP3 파일을 생성합니다."""
+    frame_count = max(1, int(seconds / SILENT_MP3_FRAME_SECONDS))
+    with open(file_path, "wb") as f:
+        f.write(SILENT_MP3_FRAME * frame_count)
+
+
+def take_output_dir(output_dir: str, take: int) -> str:
+    """테이크별 출력 디렉토리 (첫 테이크는 작업 출력 디렉토리 그대로)"""
+    return output_dir if take == 1 else os.path.join(output_dir, f"take_{take}")
+
+
+def run_takes(job: dict, run_take) -> list:
+    """
+    작업의 num_takes 만큼 시드를 바꿔 run_take(take, seed, output_dir) 를 호출하고
+    테이크별 결과 파일/시드/소요 시간 목록을 반환합니다.
+    """
+    num_takes = max(1, int(job.get("num_takes", 1)))
+    base_seed = int(job.get("seed", DEFAULT_SEED))
+    takes = []
+    for take in range(1, num_takes + 1):
+        if num_takes > 1:
+            print(f"[progress] take {take}/{num_takes}", flush=True)
+        started = time.monotonic()
+        seed = base_seed + take - 1
+        output_dir = take_output_dir(job["output_dir"], take)
+        os.makedirs(output_dir, exist_ok=True)
+        takes.append({
+            "file": run_take(take, seed, output_dir),
+            "seed": seed,
+            "elapsed": round(time.monotonic() - started, 3),
+        })
+    return takes
+
+
+def check_stage1_input(role: str, stage1_files):
+    """stage2 워커는 Stage1 을 실행할 수 없으므로 테이크마다 Stage1 산출물을 받아야 합니다."""
+    if role == "stage2" and not stage1_files:
+        raise RuntimeError("stage2 워커에 Stage1 산출물(stage1_files)이 전달되지 않았습니다.")
+
+
+def stage1_reporter(on_stage1, take: int):
+    """테이크 하나의 Stage1 산출물(files, seconds)을 on_stage1(take, files, seconds) 로 전달하는 콜백"""
+    def report(files: list, seconds: float):
+        if on_stage1 is not None:
+            on_stage1(take, files, seconds)
+    return report
+
+
+class YuEBackend:
+    """YuE-exllamav2 의 Stage1/Stage2 파이프라인을 한 번만 로드해 재사용하는 백엔드"""
+
+    name = "yue"
+    # 세그먼트 단위 오디오를 내보내지 않는다 (run 참고)
+    segment_audio = False
+
+    def __init__(self, infer_args, role: str = "full"):
+        sys.path.insert(0, YUE_SRC_DIR)
+        import torch
+        from common import parser
+        from infer_stage1 import Stage1Pipeline_EXL2, Stage1Pipeline_HF
+        from infer_stage2 import Stage2Pipeline_EXL2, Stage2Pipeline_HF
+        from infer_postprocess import post_process
+
+        # infer.py 와 동일한 인자 파서를 사용해 기본 설정을 만든다.
+        # 작업별로 달라지는 입력/출력 경로는 run() 에서 덮어쓴다.
+        self.args = parser.parse_args(infer_args + [
+            "--genre_txt", os.devnull,
+            "--lyrics_txt", os.devnull,
+        ])
+        self.post_process = post_process
+        self.role = role
+
+        device = torch.device(
+            f"cuda:{self.args.cuda_idx}" if torch.cuda.is_available() else "cpu")
+        self.device = device
+
+        # 단계를 나눈 워커는 맡은 단계의 모델만 로드한다
+        if role == "stage2":
+            self.stage1 = None
+        elif self.args.stage1_use_exl2:
+            self.stage1 = Stage1Pipeline_EXL2(
+                model_path=self.args.stage1_model,
+                device=device,
+                cache_size=self.args.stage1_cache_size,
+                cache_mode=self.args.stage1_cache_mode,
+            )
+        else:
+            self.stage1 = Stage1Pipeline_HF(
+                model_path=self.args.stage1_model,
+                device=device,
+                cache_size=self.args.stage1_cache_size,
+            )
+
+        if role == "stage1":
+            self.stage2 = None
+        elif self.args.stage2_use_exl2:
+            self.stage2 = Stage2Pipeline_EXL2(
+                model_path=self.args.stage2_model,
+                device=device,
+                cache_size=self.args.stage2_cache_size,
+                cache_mode=self.args.stage2_cache_mode,
+            )
+        else:
+            self.stage2 = Stage2Pipeline_HF(
+                model_path=self.args.stage2_model,
+                device=device,
+                batch_size=self.args.stage2_batch_size,
+            )
+
+    def seed_everything(self, seed: int):
+        """테이크마다 다른 결과가 나오도록 난수 시드를 설정합니다."""
+        import random
+        import numpy as np
+        import torch
+        random.seed(seed)
+        np.random.seed(seed)
+        torch.manual_seed(seed)
+        torch.cuda.manual_seed_all(seed)
+
+    def run(self, job: dict, on_segment=None, on_stage1=None) -> list:
+        """
+        하나의 작업을 처리하고 테이크별 결과 목록을 반환합니다 (run_takes 참고).
+        on_segment 는 호출하지 않습니다: Stage2Pipeline.generate 는 전체 트랙의 stage2 토큰을
+        한 번에 만들고, 재생 가능한 오디오는 post_process 가 트랙 전체를 코덱/보코더로 디코딩하고
+        믹싱한 뒤에야 생기므로 세그먼트가 끝날 때마다 오디오를 꺼낼 지점이 없습니다.
+        그래서 ready 메시지에 segment_audio=false 를 알리고, 스트리밍 요청은 완료 후 최종 파일로 대체됩니다.
+        """
+        with open(job["genre_txt"], encoding="utf-8") as f:
+            genres = f.read().strip()
+        with open(job["lyrics_txt"], encoding="utf-8") as f:
+            lyrics = f.read()
+
+        job = {"seed": getattr(self.args, "seed", DEFAULT_SEED), **job}
+        cached = job.get("stage1_files") or {}
+        return run_takes(job, lambda take, seed, output_dir: self.run_take(
+            genres, lyrics, seed, output_dir, cached.get(str(take)),
+            stage1_reporter(on_stage1, take)))
+
+    def run_take(self, genres: str, lyrics: str, seed: int, output_dir: str,
+                 stage1_files=None, on_stage1=None) -> Optional[str]:
+        """
+        시드 하나로 stage1 -> stage2 -> 믹싱을 실행하고 최종 MP3 경로를 반환합니다.
+        stage1_files 가 있으면 캐시된 Stage1 산출물로 stage2 부터 실행합니다.
+        stage1 워커는 Stage1 까지만 실행하고 None 을 반환합니다.
+        """
+        args = self.args
+        self.seed_everything(seed)
+        check_stage1_input(self.role, stage1_files)
+
+        if stage1_files:
+            print("[progress] stage1 cached", flush=True)
+            stage1_output_set = list(stage1_files)
+        else:
+            print("[progress] stage1 start", flush=True)
+            started = time.monotonic()
+            raw_output = self.stage1.generate(
+                use_dual_tracks_prompt=args.use_dual_tracks_prompt,
+                vocal_track_prompt_path=args.vocal_track_prompt_path,
+                instrumental_track_prompt_path=args.instrumental_track_prompt_path,
+                use_audio_prompt=args.use_audio_prompt,
+                audio_prompt_path=args.audio_prompt_path,
+                genres=genres,
+                lyrics=lyrics,
+                run_n_segments=args.run_n_segments,
+                max_new_tokens=args.max_new_tokens,
+                prompt_start_time=args.prompt_start_time,
+                prompt_end_time=args.prompt_end_time,
+            )
+            stage1_output_set = self.stage1.save(
+                raw_output, output_dir, args.use_audio_prompt, args.use_dual_tracks_prompt)
+            print("[progress] stage1 done", flush=True)
+            on_stage1(list(stage1_output_set), time.monotonic() - started)
+        if self.role == "stage1":
+            return None
+
+        print("[progress] stage2 start", flush=True)
+        self.stage2.generate(output_dir, stage1_output_set,
+                             batch_size=args.stage2_batch_size)
+        print("[progress] stage2 done", flush=True)
+
+        print("[progress] mixing", flush=True)
+        self.post_process(self.device, output_dir, args.config_path,
+                          args.vocal_decoder_path, args.inst_decoder_path,
+                          args.rescale)
+
+        return os.path.join(output_dir, DEFAULT_OUTPUT_FILENAME)
+
+
+class SimulatedBackend:
+    """
+    GPU 없이 동일한 프로토콜로 동작하는 가짜 백엔드 (처리량/성능 테스트용)
+
+    테이크 하나의 처리 시간은 평균 job_seconds 에 변동 계수 jitter 인 로그정규 분포에서 뽑습니다.
+    scale_lyrics 이면 가사 섹션 수(--run_n_segments 가 있으면 그 수까지)만큼 세그먼트를 만들고
+    처리 시간과 곡 길이를 기준 세그먼트 수(segments)에 비례해 늘리거나 줄입니다.
+    """
+
+    name = "simulate"
+    segment_audio = True
+
+    def __init__(self, load_seconds: float, job_seconds: float, segments: int,
+                 infer_args=(), jitter: float = 0.0, scale_lyrics: bool = False,
+                 failure_rate: float = 0.0, crash_rate: float = 0.0,
+                 seed=None, role: str = "full"):
+        # 실제 워커와 같은 인자를 받되, 시뮬레이션에 영향을 주는 것만 읽는다
+        infer_parser = argparse.ArgumentParser(add_help=False)
+        infer_parser.add_argument("--run_n_segments", type=int, default=None)
+        infer_parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+        self.infer_args, _ = infer_parser.parse_known_args(list(infer_args))
+
+        self.job_seconds = job_seconds
+        self.segments = max(1, segments)
+        self.jitter = max(0.0, jitter)
+        self.scale_lyrics = scale_lyrics
+        self.failure_rate = failure_rate
+        self.crash_rate = crash_rate
+        self.role = role
+        self.rng = random.Random(seed)
+        time.sleep(load_seconds)
+
+    def lyrics_segments(self, lyrics_file: str) -> int:
+        """가사 파일에서 생성할 세그먼트 수를 구합니다 (scale_lyrics 가 아니면 고정값)."""
+        if not self.scale_lyrics:
+            return self.segments
+        with open(lyrics_file, encoding="utf-8") as f:
+            sections = len(LYRICS_SECTION_PATTERN.findall(f.read())) or 1
+        if self.infer_args.run_n_segments:
+            sections = min(sections, self.infer_args.run_n_segments)
+        return sections
+
+    def draw_seconds(self, segments: int) -> float:
+        """테이크 하나의 처리 시간 (평균 job_seconds 를 세그먼트 수에 비례해 조정한 로그정규 분포)"""
+        mean = self.job_seconds * segments / self.segments
+        if self.jitter <= 0 or mean <= 0:
+            return mean
+        sigma = math.sqrt(math.log(1 + self.jitter ** 2))
+        return self.rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+
+    def run(self, job: dict, on_segment=None, on_stage1=None) -> list:
+        segments = self.lyrics_segments(job["lyrics_txt"])
+        job = {"seed": self.infer_args.seed, **job}
+        cached = job.get("stage1_files") or {}
+        return run_takes(job, lambda take, seed, output_dir: self.run_take(
+            take, output_dir, segments, on_segment if take == 1 else None,
+            cached.get(str(take)), stage1_reporter(on_stage1, take)))
+
+    def run_take(self, take: int, output_dir: str, segments: int, on_segment=None,
+                 stage1_files=None, on_stage1=None) -> Optional[str]:
+        check_stage1_input(self.role, stage1_files)
+        segment_dir = os.path.join(output_dir, SEGMENT_DIRNAME)
+        os.makedirs(segment_dir, exist_ok=True)
+        seconds = self.draw_seconds(segments)
+        song_seconds = SIM_SONG_SECONDS * segments / self.segments
+        # 실패는 stage1 뒤에, 비정상 종료는 stage2 중간에 일어나도록 미리 정해 둔다
+        fail = self.rng.random() < self.failure_rate
+        crash_segment = (self.rng.randint(1, segments)
+                         if self.rng.random() < self.crash_rate else None)
+
+        # 실제 파이프라인과 비슷하게 stage1 에 절반, stage2 세그먼트에 나머지 시간을 쓴다.
+        # Stage1 산출물은 세그먼트당 16KB 의 가짜 토큰 파일로 흉내 낸다 (캐시 적중이면 건너뜀)
+        if stage1_files:
+            print("[progress] stage1 cached", flush=True)
+        else:
+            print("[progress] stage1 start", flush=True)
+            time.sleep(seconds / 2)
+            stage1_dir = os.path.join(output_dir, "stage1")
+            os.makedirs(stage1_dir, exist_ok=True)
+            stage1_file = os.path.join(stage1_dir, "sim_tokens.npy")
+            with open(stage1_file, "wb") as f:
+                f.write(os.urandom(16 * 1024 * segments))
+            print("[progress] stage1 done", flush=True)
+            if on_stage1 is not None:
+                on_stage1([stage1_file], seconds / 2)
+        if self.role == "stage1":
+            return None
+        if fail:
+            raise RuntimeError("시뮬레이션된 추론 실패 (--sim-failure-rate)")
+
+        print("[progress] stage2 start", flush=True)
+        for segment in range(1, segments + 1):
+            time.sleep(seconds / 2 / segments)
+            if segment == crash_segment:
+                print("시뮬레이션된 워커 비정상 종료 (--sim-crash-rate)", file=sys.stderr, flush=True)
+                os._exit(1)
+            # 세그먼트마다 재생 가능한 오디오를 바로 내보낸다 (스트리밍 테스트용)
+            segment_file = os.path.join(segment_dir, f"segment_{segment:03d}.mp3")
+            write_silent_mp3(segment_file, seconds=song_seconds / segments)
+            if on_segment is not None:
+                on_segment(segment, segments, segment_file)
+            print(f"[progress] stage2 segment {segment}/{segments}", flush=True)
+        print("[progress] stage2 done", flush=True)
+
+        print("[progress] mixing", flush=True)
+        output_file = os.path.join(output_dir, DEFAULT_OUTPUT_FILENAME)
+        # 테이크마다 길이를 조금씩 달리해 서로 다른 결과물이 되도록 한다
+        write_silent_mp3(output_file,
+                         seconds=song_seconds + (take - 1) * SILENT_MP3_FRAME_SECONDS)
+        return output_file
+
+
+def open_protocol_channel():
+    """원래 stdout 을 프로토콜 전용으로 복제하고 fd 1 은 stderr 로 돌립니다."""
+    protocol_fd = os.dup(sys.stdout.fileno())
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    return os.fdopen(protocol_fd, "w", encoding="utf-8", buffering=1)
+
+
+def send(channel, message: dict):
+    channel.write(json.dumps(message, ensure_ascii=False) + "\n")
+    channel.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YuE 추론 워커 프로세스")
+    parser.add_argument("--backend", choices=["yue", "simulate"], default="yue")
+    parser.add_argument("--role", choices=WORKER_ROLES, default="full",
+                        help="워커가 맡을 파이프라인 단계 (stage1: Stage1 모델만, stage2: Stage2 모델과 믹싱만)")
+    parser.add_argument("--sim-load-seconds", type=float, default=1.0,
+                        help="simulate 백엔드의 모델 로드 시간(초)")
+    parser.add_argument("--sim-job-seconds", type=float, default=2.0,
+                        help="simulate 백엔드의 작업당 처리 시간(초)")
+    parser.add_argument("--sim-segments", type=int, default=4,
+                        help="simulate 백엔드의 stage2 세그먼트 수 (--sim-scale-lyrics 이면 기준 세그먼트 수)")
+    parser.add_argument("--sim-jitter", type=float, default=0.0,
+                        help="simulate 백엔드 처리 시간의 변동 계수 (0 이면 항상 평균값)")
+    parser.add_argument("--sim-scale-lyrics", action="store_true",
+                        help="가사 섹션 수에 비례해 세그먼트 수와 처리 시간을 조정")
+    parser.add_argument("--sim-failure-rate", type=float, default=0.0,
+                        help="테이크가 추론 오류로 실패할 확률")
+    parser.add_argument("--sim-crash-rate", type=float, default=0.0,
+                        help="테이크 도중 워커 프로세스가 비정상 종료할 확률")
+    parser.add_argument("--sim-seed", type=int, default=None,
+                        help="처리 시간/실패 주입 난수 시드 (재현용)")
+    args, infer_args = parser.parse_known_args()
+
+    channel = open_protocol_channel()
+
+    load_started = time.monotonic()
+    try:
+        if args.backend == "simulate":
+            backend = SimulatedBackend(
+                args.sim_load_seconds, args.sim_job_seconds, args.sim_segments,
+                infer_args, jitter=args.sim_jitter, scale_lyrics=args.sim_scale_lyrics,
+                failure_rate=args.sim_failure_rate, crash_rate=args.sim_crash_rate,
+                seed=args.sim_seed, role=args.role)
+        else:
+            backend = YuEBackend(infer_args, role=args.role)
+    except Exception as e:
+        traceback.print_exc()
+        send(channel, {"type": "fatal", "error": f"모델 로드 실패: {e}"})
+        sys.exit(1)
+
+    send(channel, {
+        "type": "ready",
+        "backend": backend.name,
+        "role": args.role,
+        "pid": os.getpid(),
+        "load_seconds": round(time.monotonic() - load_started, 3),
+        "segment_audio": backend.segment_audio,
+    })
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        message = json.loads(line)
+
+        if message["type"] == "shutdown":
+            break
+        if message["type"] != "job":
+            continue
+
+        job_id = message["job_id"]
+        started = time.monotonic()
+
+        def on_segment(index: int, total: int, segment_file: str):
+            send(channel, {
+                "type": "segment",
+                "job_id": job_id,
+                "index": index,
+                "total": total,
+                "file": segment_file,
+            })
+
+        def on_stage1(take: int, files: list, seconds: float):
+            send(channel, {
+                "type": "stage1",
+                "job_id": job_id,
+                "take": take,
+                "files": files,
+                "seconds": round(seconds, 3),
+            })
+
+        try:
+            takes = backend.run(message, on_segment, on_stage1)
+            # stage1 워커는 결과 파일 없이 Stage1 산출물("stage1" 메시지)만 남긴다
+            if args.role != "stage1" and not all(os.path.exists(take["file"]) for take in takes):
+                raise FileNotFoundError("생성된 음악 파일을 찾을 수 없습니다.")
+            send(channel, {
+                "type": "result",
+                "job_id": job_id,
+                "ok": True,
+                "output_file": takes[0]["file"],
+                "takes": takes,
+                "elapsed": round(time.monotonic() - started, 3),
+            })
+        except Exception as e:
+            traceback.print_exc()
+            send(channel, {
+                "type": "result",
+                "job_id": job_id,
+                "ok": False,
+                "error": f"음악 생성 실패: {e}",
+                "elapsed": round(time.monotonic() - started, 3),
+            })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+영속 작업 저장소
+
+작업 상태를 SQLite(WAL 모드)에 저장해 서버를 재시작해도 대기 중인 작업과
+job_id -> MP3 파일 매핑이 사라지지 않도록 합니다.
+
+쓰기는 요청 처리 경로에서 바로 하지 않고, 변경된 작업을 모아 두었다가
+백그라운드 스레드가 일정 간격으로 한 트랜잭션에 기록합니다.
+"""
+import json
+import logging
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    completed_at TEXT,
+    data TEXT NOT NULL,
+    request TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at);
+"""
+
+UPSERT_SQL = """
+INSERT INTO jobs (job_id, status, created_at, completed_at, data, request)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(job_id) DO UPDATE SET
+    status = excluded.status,
+    completed_at = excluded.completed_at,
+    data = excluded.data,
+    request = COALESCE(excluded.request, jobs.request)
+"""
+
+
+class JobStore:
+    """SQLite 기반 작업 저장소 (배치 쓰기)"""
+
+    def __init__(self, db_path: str, flush_interval: float = 0.5):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.writes = 0
+        self.flushes = 0
+        self._pending: Dict[str, Tuple[Dict, Optional[Dict]]] = {}
+        self._pending_lock = threading.Lock()
+        # 대기열 교체부터 기록까지를 한 번에 한 flush 만 하도록 잡는 잠금.
+        # 기록 스레드와 query() 가 동시에 flush 하면 먼저 꺼낸 오래된 스냅샷이
+        # 나중에 꺼낸 새 스냅샷을 덮어쓸 수 있다. 순서: _flush_lock -> _pending_lock -> _conn_lock
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._conn_lock = threading.Lock()
+
+    def start(self):
+        """배치 쓰기 스레드를 시작합니다."""
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name="job-store-writer", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """남은 변경을 모두 기록하고 스레드와 연결을 정리합니다."""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10.0)
+        self.flush()
+        with self._conn_lock:
+            self._conn.close()
+
+    def save(self, job_id: str, job: Dict, request: Optional[Dict] = None):
+        """
+        작업 상태를 저장 대기열에 넣습니다 (즉시 반환).
+        request 는 재시작 시 작업을 다시 큐에 넣는 데 필요한 원본 요청으로, 처음 한 번만 넘기면 됩니다.
+        """
+        with self._pending_lock:
+            previous = self._pending.get(job_id)
+            if request is None and previous is not None:
+                request = previous[1]
+            self._pending[job_id] = (dict(job), request)
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logging.error(f"작업 저장소 기록 실패: {e}")
+
+    def flush(self):
+        """저장 대기 중인 변경을 한 트랜잭션으로 기록합니다."""
+        with self._flush_lock:
+            with self._pending_lock:
+                if not self._pending:
+                    return
+                pending, self._pending = self._pending, {}
+
+            rows = []
+            for job_id, (job, request) in pending.items():
+                rows.append((
+                    job_id,
+                    job["status"],
+                    job["created_at"],
+                    job.get("completed_at"),
+                    json.dumps(job, ensure_ascii=False),
+                    json.dumps(request, ensure_ascii=False) if request is not None else None
+                ))
+
+            with self._conn_lock:
+                with self._conn:
+                    self._conn.executemany(UPSERT_SQL, rows)
+            self.writes += len(rows)
+            self.flushes += 1
+
+    def delete(self, job_ids: List[str]):
+        """작업 기록을 삭제합니다 (보존 기간 정리용, 이벤트 루프 밖에서 호출)."""
+        if not job_ids:
+            return
+        # 진행 중인 flush 가 이미 꺼내 간 스냅샷이 삭제 뒤에 기록되어 되살아나지 않도록 함께 잠근다
+        with self._flush_lock:
+            with self._pending_lock:
+                for job_id in job_ids:
+                    self._pending.pop(job_id, None)
+            with self._conn_lock:
+                with self._conn:
+                    self._conn.executemany(
+                        "DELETE FROM jobs WHERE job_id = ?", [(job_id,) for job_id in job_ids])
+
+    def query(self, statuses: Optional[List[str]] = None,
+              created_after: Optional[str] = None,
+              created_before: Optional[str] = None,
+              cursor: Optional[Tuple[str, str]] = None,
+              limit: int = 50) -> List[Tuple[str, Dict]]:
+        """
+        상태/생성 시각으로 거른 작업을 최신순으로 limit 개 반환합니다.
+        cursor 는 직전 페이지 마지막 항목의 (created_at, job_id) 입니다.
+        기록 대기 중인 변경을 먼저 반영하므로 방금 만든 작업도 조회됩니다.
+        """
+        self.flush()
+
+        conditions = []
+        params: List = []
+        if statuses:
+            conditions.append(
+                f"status IN ({', '.join('?' for _ in statuses)})")
+            params.extend(statuses)
+        if created_after is not None:
+            conditions.append("created_at >= ?")
+            params.append(created_after)
+        if created_before is not None:
+            conditions.append("created_at < ?")
+            params.append(created_before)
+        if cursor is not None:
+            conditions.append("(created_at, job_id) < (?, ?)")
+            params.extend(cursor)
+
+        sql = "SELECT job_id, data FROM jobs"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY created_at DESC, job_id DESC LIMIT ?"
+        params.append(limit)
+
+        with self._conn_lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [(job_id, json.loads(data)) for job_id, data in rows]
+
+    def load_all(self) -> List[Tuple[str, Dict, Optional[Dict]]]:
+        """저장된 모든 작업을 생성 시각 순으로 읽어 옵니다 (서버 시작 시 복구용)."""
+        with self._conn_lock:
+            rows = self._conn.execute(
+                "SELECT job_id, data, request FROM jobs ORDER BY created_at").fetchall()
+        return [
+            (job_id, json.loads(data), json.loads(request) if request else None)
+            for job_id, data, request in rows
+        ]
+
+    def stats(self) -> Dict:
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {
+            "pending_writes": pending,
+            "rows_written": self.writes,
+            "flushes": self.flushes
+        }
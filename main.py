@@ -1,19 +1,39 @@
 import os
-import subprocess
 import tempfile
 import uuid
 import shutil
-import threading
+import time
 import asyncio
+import base64
+import heapq
+import math
+import re
+import shlex
+import signal
+import statistics
+from collections import deque
 from pathlib import Path
-from typing import Dict, List, Optional
-from datetime import datetime
+from typing import Deque, Dict, List, Literal, Optional, Tuple
+from datetime import datetime, timedelta
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
 from sse_starlette.sse import EventSourceResponse
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from audio_stream import AudioStream, summarize_seconds
+from event_broker import EventBroker, parse_last_event_id
+from fair_queue import DEFAULT_PRIORITY, FairJobQueue, parse_client_weights
+from file_ops import link_or_copy, publish_file, remove_stale_temp_files
+from job_store import JobStore
+from mp3_index import Mp3IndexCache
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, DURATION_BUCKETS, MetricsRegistry
+from music_response import MusicFileResponse
+from result_cache import ResultCache, compute_cache_key
+from stage1_cache import Stage1Cache, compute_stage1_key
+from tracing import WORKER_TRACK, TraceStore
 
 import logging
 import json
@@ -25,35 +45,215 @@ logging.basicConfig(level=logging.INFO,
 # 설정값 및 상수
 # 상위 디렉토리의 경로를 사용하도록 수정
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-YUE_INFER_SCRIPT = os.path.join(ROOT_DIR, "src", "yue", "infer.py")
 # 메인 파일 기준 상위 디렉토리
 WORKING_DIR = os.path.dirname(os.path.abspath(__file__))
 PARENT_DIR = os.path.dirname(WORKING_DIR)
 STAGE1_MODEL = "m-a-p/YuE-s1-7B-anneal-en-cot"
 STAGE2_MODEL = "m-a-p/YuE-s2-1B-general"
-DEFAULT_OUTPUT_DIR = os.path.join(ROOT_DIR, "output")
 DEFAULT_OUTPUT_FILENAME = "mixed.mp3"
 FINAL_MUSIC_DIR = os.path.join(ROOT_DIR, "generated_music")
 
-# 로컬 프롬프트 파일 경로
-GENRE_FILE_PATH = os.path.join(ROOT_DIR, "input", "genre.txt")
-LYRICS_FILE_PATH = os.path.join(ROOT_DIR, "input", "lyrics.txt")
-
-# 음악 생성 처리 상태를 추적하는 변수와 락
-is_generating_music = False
-generation_lock = threading.Lock()
+# 생성 결과 캐시 (같은 요청은 이미 생성된 MP3 를 바로 반환).
+# 용량 한도는 재사용 대상으로 인덱스에 남길 결과의 총 크기이며, 파일은 지우지 않는다
+# (디스크 사용량은 보존 정책의 MUSIC_DIR_MAX_BYTES 가 캐시 사용 순서를 반영해 제한)
+RESULT_CACHE_INDEX_PATH = os.path.join(FINAL_MUSIC_DIR, "result_cache.json")
+RESULT_CACHE_MAX_BYTES = int(os.environ.get(
+    "MEMORIA_RESULT_CACHE_MAX_BYTES", str(10 * 1024 ** 3)))
+# Stage1 산출물 캐시 (같은 장르/가사/Stage1 설정의 재실행은 stage2 부터 시작)
+STAGE1_CACHE_DIR = os.environ.get(
+    "MEMORIA_STAGE1_CACHE_DIR", os.path.join(ROOT_DIR, "stage1_cache"))
+STAGE1_CACHE_MAX_BYTES = int(os.environ.get(
+    "MEMORIA_STAGE1_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+# 미리듣기/구간 다운로드용 MP3 프레임 인덱스를 메모리에 보관할 파일 수 (5분 곡 하나에 약 46KB)
+MP3_INDEX_CACHE_SIZE = int(os.environ.get("MEMORIA_MP3_INDEX_CACHE_SIZE", "512"))
+
+# 영속 작업 저장소 (SQLite, 재시작 시 대기 작업 복구)
+JOB_DB_PATH = os.environ.get(
+    "MEMORIA_JOB_DB_PATH", os.path.join(ROOT_DIR, "jobs.db"))
+JOB_STORE_FLUSH_SECONDS = 0.5
+# 재시작으로 중단된 처리 중 작업을 다시 시도하는 최대 횟수
+JOB_MAX_RETRIES = 2
+
+# 보존 정책: 끝난 작업 기록과 MP3 를 주기적으로 정리 (시간 기준 + 전체 디스크 용량 기준)
+JOB_RETENTION_SECONDS = int(os.environ.get(
+    "MEMORIA_JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+MUSIC_DIR_MAX_BYTES = int(os.environ.get(
+    "MEMORIA_MUSIC_DIR_MAX_BYTES", str(20 * 1024 ** 3)))
+RETENTION_SWEEP_INTERVAL_SECONDS = int(os.environ.get(
+    "MEMORIA_RETENTION_SWEEP_INTERVAL_SECONDS", "600"))
+
+# /jobs 페이지 크기
+JOBS_PAGE_DEFAULT_LIMIT = 50
+JOBS_PAGE_MAX_LIMIT = 500
+
+# 작업별 격리 작업 공간 (입력 프롬프트, 중간 산출물, 출력 파일)
+WORKSPACE_ROOT_DIR = os.path.join(ROOT_DIR, "workspaces")
+
+# 상주 추론 워커 설정 (모델을 한 번만 로드하고 작업을 파이프로 전달받음)
+INFERENCE_WORKER_SCRIPT = os.path.join(WORKING_DIR, "inference_worker.py")
+# "yue": 실제 모델 로드, "simulate": GPU 없이 동작하는 가짜 워커
+WORKER_BACKEND = os.environ.get("MEMORIA_WORKER_BACKEND", "yue")
+WORKER_INFER_ARGS = [
+    "--stage1_use_exl2",
+    "--stage2_use_exl2",
+    "--stage1_cache_size", "16384",
+    "--stage2_cache_size", "32768",
+    "--stage1_model", STAGE1_MODEL,
+    "--stage2_model", STAGE2_MODEL
+]
+# 워커 명령줄에 덧붙일 인자 (예: simulate 백엔드의 "--sim-job-seconds 30 --sim-jitter 0.3")
+WORKER_EXTRA_ARGS = shlex.split(os.environ.get("MEMORIA_WORKER_EXTRA_ARGS", ""))
+# SSE: 짧은 시간 안에 몰린 변경을 하나의 이벤트로 묶는 간격과 Last-Event-ID 재개용 보관 이벤트 수
+SSE_DEBOUNCE_SECONDS = 0.1
+SSE_HISTORY_SIZE = 1000
+SSE_KEEP_ALIVE_SECONDS = 20.0
+# 워커 풀 크기와 워커별 GPU 배정 (예: "0,1" -> 워커 0은 GPU 0, 워커 1은 GPU 1)
+WORKER_COUNT = int(os.environ.get("MEMORIA_WORKER_COUNT", "1"))
+WORKER_DEVICES = [device.strip() for device in os.environ.get(
+    "MEMORIA_WORKER_DEVICES", "").split(",") if device.strip()]
+# 파이프라인 모드: "full" 은 워커 하나가 작업 전체를 실행하고, "split" 은 Stage1 워커와 Stage2 워커를
+# 따로 띄워 대기열로 연결한다 (작업 N 의 stage2/믹싱 동안 작업 N+1 의 stage1 을 실행).
+# split 에서는 MEMORIA_WORKER_COUNT 대신 단계별 워커 수를 쓰며, 장치는 Stage1 워커부터 차례로 배정한다
+PIPELINE_MODE = os.environ.get("MEMORIA_PIPELINE_MODE", "full")
+STAGE1_WORKER_COUNT = int(os.environ.get("MEMORIA_STAGE1_WORKER_COUNT", "1"))
+STAGE2_WORKER_COUNT = int(os.environ.get("MEMORIA_STAGE2_WORKER_COUNT", "1"))
+# stage1 을 마치고 stage2 워커를 기다릴 수 있는 작업 수. 가득 차면 Stage1 워커가 다음 작업을 받지 않는다 (0 이면 제한 없음)
+STAGE2_QUEUE_MAX_DEPTH = int(os.environ.get("MEMORIA_STAGE2_QUEUE_MAX_DEPTH", "2"))
+# 공정 큐: 클라이언트별 가중치("app=3,web=1", 기본 1)와 클라이언트 키 최대 길이
+CLIENT_WEIGHTS = parse_client_weights(os.environ.get("MEMORIA_CLIENT_WEIGHTS", ""))
+CLIENT_KEY_MAX_LENGTH = 64
+# 예상 대기 시간: 최근 작업 처리 시간의 이동 평균 (기록이 없을 때의 기본값)
+JOB_DURATION_WINDOW = 20
+JOB_DURATION_DEFAULT_SECONDS = float(os.environ.get(
+    "MEMORIA_JOB_DURATION_ESTIMATE_SECONDS", "300"))
+
+# 수용 제어: 대기 작업 수 / 새 작업의 예상 대기 시간 / 클라이언트별 대기 작업 수 상한 (0 이면 제한 없음)
+MAX_QUEUE_DEPTH = int(os.environ.get("MEMORIA_MAX_QUEUE_DEPTH", "100"))
+MAX_ESTIMATED_WAIT_SECONDS = int(os.environ.get(
+    "MEMORIA_MAX_ESTIMATED_WAIT_SECONDS", str(4 * 60 * 60)))
+MAX_QUEUED_PER_CLIENT = int(os.environ.get("MEMORIA_MAX_QUEUED_PER_CLIENT", "20"))
+# 배치 요청 한 번에 넣을 수 있는 최대 곡 수
+MAX_BATCH_SIZE = int(os.environ.get("MEMORIA_MAX_BATCH_SIZE", "50"))
+
+# 점진적 스트리밍: 새 세그먼트를 기다리는 동안 연결 종료를 확인하는 간격, TTFA 통계 보관 개수
+STREAM_POLL_SECONDS = 1.0
+FIRST_AUDIO_HISTORY_SIZE = 100
+
+# 요청 하나로 생성할 수 있는 최대 테이크 수, 테이크 비용 통계 보관 개수
+MAX_TAKES = int(os.environ.get("MEMORIA_MAX_TAKES", "4"))
+TAKE_COST_HISTORY_SIZE = 100
+
+# 작업별 실행 구간 추적: 끝난 작업 중 최근 N개와 가장 오래 걸린 K개를 보관
+TRACE_HISTORY_SIZE = int(os.environ.get("MEMORIA_TRACE_HISTORY_SIZE", "500"))
+TRACE_SLOWEST_SIZE = int(os.environ.get("MEMORIA_TRACE_SLOWEST_SIZE", "20"))
+
+# 작업당 최대 실행 시간과, 워커 출력이 이 시간 동안 없으면 멈춘 것으로 보고 재시작하는 감시 간격 (0 이면 사용 안 함)
+JOB_TIMEOUT_SECONDS = int(os.environ.get("MEMORIA_JOB_TIMEOUT_SECONDS", str(60 * 60)))
+WORKER_STALL_SECONDS = int(os.environ.get("MEMORIA_WORKER_STALL_SECONDS", str(15 * 60)))
+WATCHDOG_INTERVAL_SECONDS = 5.0
+
+# 모델 로드 중에 워커가 종료되면 다시 띄우기 전에 기다리는 시간 (연속 실패마다 두 배, 최대값까지)
+WORKER_RESTART_BACKOFF_SECONDS = float(os.environ.get("MEMORIA_WORKER_RESTART_BACKOFF_SECONDS", "5"))
+WORKER_RESTART_BACKOFF_MAX_SECONDS = 300.0
+# 모델 로드 실패 오류 메시지에 붙일 워커 출력 줄 수
+WORKER_LOAD_OUTPUT_LINES = 5
+
+# 더 이상 상태가 바뀌지 않는 작업 상태
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+# 워커 프로토콜 한 줄의 최대 길이 (asyncio StreamReader 기본값 64KB 대신)
+WORKER_STREAM_LIMIT = 1024 * 1024
+
+# 작업별 로그 링 버퍼 크기 (모델 출력이 아무리 많아도 작업당 메모리를 제한)
+JOB_LOG_MAX_LINES = 200
+JOB_LOG_MAX_LINE_LENGTH = 500
+# 작업 상태의 error 필드에 담는 최대 길이 (전체 출력은 /jobs/{job_id}/logs 로 확인)
+JOB_ERROR_MAX_LENGTH = 500
+
+# 모델 출력에서 진행 단계를 알아내기 위한 마커 (inference_worker.py 의 "[progress]" 줄과 YuE 기본 출력)
+PROGRESS_MARKERS = [
+    (re.compile(r"\[progress\] stage1 start|Stage ?1 inference", re.IGNORECASE),
+     {"stage": "stage1", "state": "started"}),
+    (re.compile(r"\[progress\] stage1 done", re.IGNORECASE),
+     {"stage": "stage1", "state": "finished"}),
+    (re.compile(r"\[progress\] stage1 cached", re.IGNORECASE),
+     {"stage": "stage1", "state": "cached"}),
+    (re.compile(r"\[progress\] stage2 start|Stage ?2 inference", re.IGNORECASE),
+     {"stage": "stage2", "state": "started"}),
+    (re.compile(r"\[progress\] stage2 done", re.IGNORECASE),
+     {"stage": "stage2", "state": "finished"}),
+    (re.compile(r"\[progress\] mixing|Post ?process", re.IGNORECASE),
+     {"stage": "mixing", "state": "started"}),
+]
+# stage2 세그먼트 진행 ("[progress] stage2 segment 3/8" 또는 tqdm 의 " 3/8 [")
+STAGE2_SEGMENT_PATTERN = re.compile(
+    r"\[progress\] stage2 segment (\d+)/(\d+)|\b(\d+)/(\d+) \[")
+# 여러 테이크 작업의 테이크 시작 ("[progress] take 2/3")
+TAKE_PATTERN = re.compile(r"\[progress\] take (\d+)/(\d+)")
 
 # 디렉토리 생성
-os.makedirs(DEFAULT_OUTPUT_DIR, exist_ok=True)
 os.makedirs(FINAL_MUSIC_DIR, exist_ok=True)
-os.makedirs(os.path.join(ROOT_DIR, "input"), exist_ok=True)  # 입력 디렉토리 생성
+os.makedirs(WORKSPACE_ROOT_DIR, exist_ok=True)  # 작업 공간 루트 생성
 
 # 요청 큐 및 상태 관리
-job_queue = asyncio.Queue()
-active_job: Optional[str] = None
+job_queue = FairJobQueue(CLIENT_WEIGHTS)
+idle_workers: asyncio.Queue = asyncio.Queue()
+# split 파이프라인: 유휴 Stage2 워커, stage1 을 마친 작업의 (작업 ID, 워커 배정 Future) 대기열
+idle_stage2_workers: asyncio.Queue = asyncio.Queue()
+stage2_queue: asyncio.Queue = asyncio.Queue(maxsize=STAGE2_QUEUE_MAX_DEPTH)
+# 작업 ID -> stage2 워커 배정을 기다리는 Future (취소 시 예외로 끝낸다)
+stage2_handoffs: Dict[str, asyncio.Future] = {}
 job_statuses: Dict[str, Dict] = {}
 job_lock = asyncio.Lock()
-job_update_event = asyncio.Event()
+# 진행 중(queued/processing)인 생성: 캐시 키 -> 대표 작업 ID
+inflight_jobs: Dict[str, str] = {}
+# 대표 작업 ID -> 같은 생성에 합쳐진(coalesced) 작업 ID 목록
+job_followers: Dict[str, List[str]] = {}
+# 작업 ID -> 최근 모델 출력 (크기가 제한된 링 버퍼)
+job_logs: Dict[str, Deque[str]] = {}
+# 작업 ID -> 완료(completed/failed)를 기다리는 동기 요청들
+job_waiters: Dict[str, List[asyncio.Future]] = {}
+# 최근 작업들의 테이크당 처리 시간(초, processing -> completed). 예상 대기 시간 계산에 사용
+job_durations: Deque[float] = deque(maxlen=JOB_DURATION_WINDOW)
+# 최근 테이크당 단계별 실행 시간(초). split 파이프라인의 예상 대기 시간은 단계별 워커를 따로 계산한다.
+# stage1 은 워커의 "stage1" 메시지, stage2 는 Stage2 워커의 실행 시간(stage2 + 믹싱)으로 기록
+stage_durations: Dict[str, Deque[float]] = {
+    "stage1": deque(maxlen=JOB_DURATION_WINDOW),
+    "stage2": deque(maxlen=JOB_DURATION_WINDOW)
+}
+# 수용 제어 결과 통계
+admission_stats = {
+    "accepted": 0,
+    "rejected_queue_full": 0,
+    "rejected_wait": 0,
+    "rejected_client_limit": 0,
+    "rejected_deadline": 0,
+    "deadline_expired": 0
+}
+# 배치 ID -> 항목 순서대로의 작업 ID 목록
+batches: Dict[str, List[str]] = {}
+# 대표 작업 ID -> 스트리밍 중인 세그먼트 오디오
+audio_streams: Dict[str, AudioStream] = {}
+# 최근 작업들의 첫 오디오까지 걸린 시간(초, 요청 접수 기준)
+first_audio_latencies: Deque[float] = deque(maxlen=FIRST_AUDIO_HISTORY_SIZE)
+# 최근 여러 테이크 작업들의 (첫 테이크 시간, 추가 테이크 평균 시간) 초
+take_costs: Deque[Tuple[float, float]] = deque(maxlen=TAKE_COST_HISTORY_SIZE)
+# 작업 ID -> 테이크 -> 워커가 새로 만든 Stage1 산출물 (파일 목록, Stage1 소요 초). 작업이 끝나면 캐시에 등록
+job_stage1_outputs: Dict[str, Dict[int, Tuple[List[str], float]]] = {}
+
+result_cache = ResultCache(RESULT_CACHE_INDEX_PATH, RESULT_CACHE_MAX_BYTES)
+mp3_index_cache = Mp3IndexCache(MP3_INDEX_CACHE_SIZE)
+stage1_cache = Stage1Cache(STAGE1_CACHE_DIR, STAGE1_CACHE_MAX_BYTES)
+job_store = JobStore(JOB_DB_PATH, flush_interval=JOB_STORE_FLUSH_SECONDS)
+
+# 보존 정책 정리 결과 통계
+retention_stats = {
+    "sweeps": 0,
+    "last_sweep_at": None,
+    "jobs_expired": 0,
+    "files_deleted": 0,
+    "bytes_reclaimed": 0
+}
 
 app = FastAPI(
     title="Yue 음악 생성 API",
@@ -74,6 +274,16 @@ app.add_middleware(
 class MusicGenerationRequest(BaseModel):
     genre_txt: str
     lyrics_txt: str
+    # True 이면 캐시된 결과가 있어도 새로 생성합니다
+    force_regenerate: bool = False
+    # 같은 우선순위 안에서는 클라이언트별로 번갈아 처리합니다
+    priority: Literal["high", "normal", "low"] = DEFAULT_PRIORITY
+    # 공정 큐의 클라이언트 키 (없으면 X-Client-Id 헤더, 그것도 없으면 접속 IP)
+    client_id: Optional[str] = None
+    # 이 시각까지 완료할 수 없으면 생성하지 않습니다 (ISO 8601)
+    deadline: Optional[datetime] = None
+    # 시드만 바꿔 한 번의 실행에서 생성할 결과 수 (/music/download/{job_id}?take=N)
+    num_takes: int = Field(1, ge=1, le=MAX_TAKES)
 
 
 class MusicGenerationResponse(BaseModel):
@@ -81,298 +291,2038 @@ class MusicGenerationResponse(BaseModel):
     status: str
 
 
-async def process_music_generation_queue():
-    """백그라운드에서 음악 생성 요청 큐를 처리하는 함수"""
-    global active_job
+class MusicBatchItem(BaseModel):
+    genre_txt: str
+    lyrics_txt: str
 
-    while True:
-        # 큐에서 작업 가져오기
-        logging.info("음악 생성 큐에서 다음 작업을 기다리는 중...")
-        job_id, genre_txt, lyrics_txt = await job_queue.get()
-        logging.info(f"작업 시작: {job_id}")
 
-        async with job_lock:
-            active_job = job_id
-            job_statuses[job_id]["status"] = "processing"
-            job_update_event.set()
-            logging.info(f"작업 상태 업데이트: {job_id} -> processing")
+class MusicBatchRequest(BaseModel):
+    items: List[MusicBatchItem] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+    # 아래 옵션은 배치의 모든 항목에 적용됩니다
+    force_regenerate: bool = False
+    priority: Literal["high", "normal", "low"] = DEFAULT_PRIORITY
+    client_id: Optional[str] = None
+    deadline: Optional[datetime] = None
+    num_takes: int = Field(1, ge=1, le=MAX_TAKES)
+
+
+class MusicBatchResponse(BaseModel):
+    batch_id: str
+    job_ids: List[str]
+    statuses: List[str]
+
 
-        success = False
-        result_file = None
-        error_message = None
+class JobWorkspace:
+    """
+    작업 하나가 독점적으로 사용하는 임시 디렉토리.
+    입력 프롬프트, 중간 산출물, 최종 출력이 모두 이 안에 생성되므로
+    동시에 실행되는 작업끼리 파일을 덮어쓰지 않습니다.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.path = os.path.join(WORKSPACE_ROOT_DIR, job_id)
+        self.genre_file_path = os.path.join(self.path, "input", "genre.txt")
+        self.lyrics_file_path = os.path.join(self.path, "input", "lyrics.txt")
+        self.output_dir = os.path.join(self.path, "output")
+        self.output_file_path = os.path.join(
+            self.output_dir, DEFAULT_OUTPUT_FILENAME)
+
+    def prepare(self, genre_txt: str, lyrics_txt: str):
+        """작업 공간을 만들고 장르와 가사를 입력 파일로 저장합니다."""
+        os.makedirs(os.path.join(self.path, "input"), exist_ok=True)
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(self.genre_file_path, "w", encoding="utf-8") as f:
+            f.write(genre_txt)
+        with open(self.lyrics_file_path, "w", encoding="utf-8") as f:
+            f.write(lyrics_txt)
+
+    def restore_stage1(self, take: int, files: List[str]) -> List[str]:
+        """캐시된 Stage1 산출물을 input/stage1/take_<n>/ 에 링크(또는 복사)하고 그 경로들을 반환합니다."""
+        stage1_dir = os.path.join(self.path, "input", "stage1", f"take_{take}")
+        os.makedirs(stage1_dir, exist_ok=True)
+        restored = []
+        for path in files:
+            destination = os.path.join(stage1_dir, os.path.basename(path))
+            link_or_copy(path, destination)
+            restored.append(destination)
+        return restored
+
+    def cleanup(self):
+        """작업 공간을 통째로 삭제합니다."""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def cleanup_stale_workspaces():
+    """이전 실행에서 남은 작업 공간을 정리합니다 (비정상 종료 대비)."""
+    for name in os.listdir(WORKSPACE_ROOT_DIR):
+        stale_path = os.path.join(WORKSPACE_ROOT_DIR, name)
+        if os.path.isdir(stale_path):
+            logging.info(f"남아 있는 작업 공간 정리: {stale_path}")
+            shutil.rmtree(stale_path, ignore_errors=True)
+
+
+class WorkerAbortedError(Exception):
+    """워커 프로세스가 작업 도중 종료됨 (error_class: timeout, stall, cancelled, worker_exit)"""
+
+    def __init__(self, message: str, error_class: str):
+        super().__init__(message)
+        self.error_class = error_class
+
+
+class InferenceWorker:
+    """
+    상주 추론 워커 프로세스(inference_worker.py)를 관리하는 클래스.
+    워커는 시작 시 모델을 한 번만 로드하고, stdin/stdout 파이프로
+    JSON Lines 프로토콜을 주고받으며 작업을 하나씩 처리합니다.
+    """
+
+    def __init__(self, worker_id: int, backend: str = WORKER_BACKEND,
+                 device: Optional[str] = None, role: str = "full"):
+        self.worker_id = worker_id
+        self.backend = backend
+        self.device = device
+        # "full": 전체 파이프라인, "stage1"/"stage2": split 파이프라인의 한 단계만 실행
+        self.role = role
+        self.current_job: Optional[str] = None
+        self.jobs_processed = 0
+        # 실행 중인 run_job 의 시작 시각 (monotonic, 단계별 남은 시간 추정용)
+        self.job_started_at: Optional[float] = None
+
+        self.state = "stopped"  # stopped, starting, ready, busy, dead
+        self.pid: Optional[int] = None
+        self.load_seconds: Optional[float] = None
+        # 백엔드가 stage2 세그먼트 오디오를 내보내는지 (ready 메시지로 알게 됨, yue 는 false)
+        self.segment_audio: Optional[bool] = None
+        self.started_at: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.last_output_at = time.monotonic()
+        # 취소/시간 초과/멈춤으로 워커를 강제 종료한 이유(와 분류), 횟수
+        self.abort_reason: Optional[str] = None
+        self.abort_class: Optional[str] = None
+        self.recycles = 0
+        # 모델 로드 중 연속 종료 횟수와 다음 재시작 가능 시각 (monotonic)
+        self.start_failures = 0
+        self._restart_at = 0.0
+        # 모델 로드 중의 fatal 메시지와 최근 출력 (로드 실패 오류 메시지용)
+        self._fatal_error: Optional[str] = None
+        self.load_output: Deque[str] = deque(maxlen=WORKER_LOAD_OUTPUT_LINES)
+        self._spawned_at = time.monotonic()
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._ready = asyncio.Event()
+        # 모델 로드 전에 프로세스가 종료되었음 (재시작하지 않는 경우에만 설정)
+        self._exited = asyncio.Event()
+        self._pending: Optional[asyncio.Future] = None
+        self._pending_job_id: Optional[str] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        """워커 프로세스를 실행하고 모델 로드가 끝날 때까지 기다리지 않고 반환합니다."""
+        cmd = [
+            "python",
+            INFERENCE_WORKER_SCRIPT,
+            "--backend", self.backend,
+            "--role", self.role,
+            *WORKER_INFER_ARGS,
+            *WORKER_EXTRA_ARGS
+        ]
+        logging.info(
+            f"추론 워커 {self.worker_id} 시작 - 명령어: {' '.join(cmd)}")
+
+        env = dict(os.environ)
+        if self.device is not None:
+            env["CUDA_VISIBLE_DEVICES"] = self.device
+
+        self._ready.clear()
+        self._exited.clear()
+        self._fatal_error = None
+        self.load_output.clear()
+        self.state = "starting"
+        self.abort_reason = None
+        self.abort_class = None
+        self.started_at = datetime.now().isoformat()
+        self._spawned_at = time.monotonic()
+        self.last_output_at = time.monotonic()
+        # 별도 프로세스 그룹으로 띄워, 강제 종료 시 모델 코드가 만든 자식 프로세스까지 함께 정리한다
+        self.process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=PARENT_DIR,
+            env=env,
+            limit=WORKER_STREAM_LIMIT,
+            start_new_session=os.name == "posix"
+        )
+        self.pid = self.process.pid
+        self._tasks = [
+            asyncio.create_task(self._read_messages(self.process)),
+            asyncio.create_task(self._read_output(self.process)),
+        ]
+
+    async def _read_messages(self, process: asyncio.subprocess.Process):
+        """워커의 프로토콜 채널(stdout)을 읽어 메시지를 처리합니다."""
+        while True:
+            try:
+                line = await process.stdout.readline()
+            except ValueError:
+                logging.warning("추론 워커: 너무 긴 프로토콜 메시지를 무시합니다.")
+                continue
+            if not line:
+                break
+            self.last_output_at = time.monotonic()
 
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                logging.warning(f"추론 워커: 잘못된 메시지 - {line[:200]!r}")
+                continue
+
+            message_type = message.get("type")
+            if message_type == "ready":
+                self.state = "ready"
+                self.load_seconds = message.get("load_seconds")
+                self.segment_audio = message.get("segment_audio")
+                self.start_failures = 0
+                self._ready.set()
+                metric_worker_spawn.observe(time.monotonic() - self._spawned_at)
+                logging.info(
+                    f"추론 워커 {self.worker_id} 준비 완료 (backend={message.get('backend')}, "
+                    f"모델 로드 {self.load_seconds}초)")
+            elif message_type == "fatal":
+                self.last_error = self._fatal_error = message.get("error")
+                logging.error(
+                    f"추론 워커 {self.worker_id} 치명적 오류: {self.last_error}")
+            elif message_type == "segment":
+                await handle_worker_segment(self, message)
+            elif message_type == "stage1":
+                handle_worker_stage1(self, message)
+            elif message_type == "result":
+                if (self._pending is not None and not self._pending.done()
+                        and message.get("job_id") == self._pending_job_id):
+                    self._pending.set_result(message)
+
+        # 프로세스 종료 처리
+        returncode = await process.wait()
+        if self.process is process:
+            was_ready = self._ready.is_set()
+            self.state = "dead"
+            self._ready.clear()
+            abort_reason = self.abort_reason
+            logging.error(
+                f"추론 워커 {self.worker_id} 종료됨 (returncode={returncode})")
+            if self._pending is not None and not self._pending.done():
+                self._pending.set_exception(WorkerAbortedError(
+                    abort_reason or f"추론 워커가 비정상 종료되었습니다. (returncode={returncode})",
+                    self.abort_class or "worker_exit"))
+            if abort_reason is not None:
+                # 일부러 종료한 경우 다음 작업이 모델 로드를 덜 기다리도록 바로 다시 띄운다
+                logging.info(f"추론 워커 {self.worker_id} 재시작 ({abort_reason})")
+                await self.start()
+            elif not was_ready:
+                # 모델 로드 중 종료: 기다리는 ensure_running 을 오류로 깨우고, 다음 재시작은 잠시 미룬다
+                self.start_failures += 1
+                backoff = min(WORKER_RESTART_BACKOFF_SECONDS * 2 ** (self.start_failures - 1),
+                              WORKER_RESTART_BACKOFF_MAX_SECONDS)
+                self._restart_at = time.monotonic() + backoff
+                self.last_error = self._fatal_error or "\n".join([
+                    f"추론 워커가 모델 로드 중 종료되었습니다. (returncode={returncode})",
+                    *self.load_output])
+                logging.error(
+                    f"추론 워커 {self.worker_id} 모델 로드 실패 ({self.start_failures}회 연속), "
+                    f"{backoff:.0f}초 후 재시작 가능: {self.last_error}")
+                self._exited.set()
+
+    async def _read_output(self, process: asyncio.subprocess.Process):
+        """
+        워커의 모델 출력(stderr)을 줄 단위로 읽어 현재 작업의 로그로 넘깁니다.
+        tqdm 의 \\r 갱신도 한 줄로 취급하고, 줄바꿈 없이 긴 출력은 잘라서 버퍼 크기를 제한합니다.
+        파이프가 가득 차지 않도록 항상 읽어야 합니다.
+        """
+        partial = b""
+        while True:
+            chunk = await process.stderr.read(65536)
+            if not chunk:
+                break
+
+            lines = re.split(rb"[\r\n]", partial + chunk)
+            partial = lines.pop()
+            if len(partial) > JOB_LOG_MAX_LINE_LENGTH:
+                lines.append(partial)
+                partial = b""
+
+            self.last_output_at = time.monotonic()
+            for raw_line in lines:
+                line = raw_line.decode("utf-8", "replace").strip()
+                if line:
+                    await handle_worker_output(self, self._pending_job_id, line)
+
+        if partial.strip():
+            await handle_worker_output(
+                self, self._pending_job_id, partial.decode("utf-8", "replace").strip())
+
+    async def ensure_running(self):
+        """
+        워커가 죽어 있으면 다시 시작하고, 모델 로드가 끝날 때까지 기다립니다.
+        모델 로드 중에 워커가 종료되면 그 오류로 WorkerAbortedError(worker_start)를 일으키며,
+        로드에 연달아 실패한 워커는 다시 띄우기 전에 점점 길게 기다립니다.
+        """
+        if self.state in ("stopped", "dead"):
+            delay = self._restart_at - time.monotonic()
+            if delay > 0:
+                logging.info(f"추론 워커 {self.worker_id}: 모델 로드 실패가 이어져 {delay:.1f}초 후 재시작")
+                await asyncio.sleep(delay)
+            # 기다리는 동안 다른 작업이 이미 다시 띄웠을 수 있다
+            if self.state in ("stopped", "dead"):
+                await self.start()
+        if self._ready.is_set():
+            return
+
+        waiters = [asyncio.ensure_future(self._ready.wait()),
+                   asyncio.ensure_future(self._exited.wait())]
         try:
-            # 로컬 파일에 장르와 가사 저장
-            logging.info(f"작업 {job_id}: 장르 및 가사 파일 저장")
-            with open(GENRE_FILE_PATH, "w", encoding="utf-8") as f:
-                f.write(genre_txt)
-            with open(LYRICS_FILE_PATH, "w", encoding="utf-8") as f:
-                f.write(lyrics_txt)
-            logging.info(f"작업 {job_id}: 장르 및 가사 파일 저장 완료")
-
-            # infer.py 스크립트 실행
-            cmd = [
-                "python",
-                YUE_INFER_SCRIPT,
-                "--stage1_use_exl2",
-                "--stage2_use_exl2",
-                "--stage1_cache_size", "16384",
-                "--stage2_cache_size", "32768",
-                "--genre_txt", GENRE_FILE_PATH,
-                "--lyrics_txt", LYRICS_FILE_PATH,
-                "--stage1_model", STAGE1_MODEL,
-                "--stage2_model", STAGE2_MODEL
-            ]
+            await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+        if not self._ready.is_set():
+            raise WorkerAbortedError(
+                self.last_error or "추론 워커가 모델 로드 중 종료되었습니다.", "worker_start")
+
+    async def run_job(self, job_id: str, payload: Dict) -> Dict:
+        """작업 하나를 워커에 전달하고 결과 메시지를 반환합니다."""
+        await self.ensure_running()
+
+        loop = asyncio.get_running_loop()
+        self._pending = loop.create_future()
+        self._pending_job_id = job_id
+        self.job_started_at = time.monotonic()
+        self.state = "busy"
+        self.last_output_at = time.monotonic()
+        watchdog = asyncio.create_task(self._watch_job(job_id))
+        try:
+            message = {"type": "job", "job_id": job_id, **payload}
+            self.process.stdin.write(
+                (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+            await self.process.stdin.drain()
+            return await self._pending
+        finally:
+            watchdog.cancel()
+            self._pending = None
+            self._pending_job_id = None
+            if self.state == "busy":
+                self.state = "ready"
+
+    async def _watch_job(self, job_id: str):
+        """작업 시간 제한과 출력 없음(멈춤)을 감시하고, 넘으면 워커를 강제로 재시작합니다."""
+        started = time.monotonic()
+        while True:
+            await asyncio.sleep(WATCHDOG_INTERVAL_SECONDS)
+            now = time.monotonic()
+            if JOB_TIMEOUT_SECONDS and now - started > JOB_TIMEOUT_SECONDS:
+                self.kill(f"작업 시간 제한({JOB_TIMEOUT_SECONDS}초)을 넘었습니다.", "timeout")
+                return
+            if WORKER_STALL_SECONDS and now - self.last_output_at > WORKER_STALL_SECONDS:
+                self.kill(f"추론 워커가 {WORKER_STALL_SECONDS}초 동안 응답이 없습니다.", "stall")
+                return
+
+    def kill(self, reason: str, error_class: str):
+        """
+        실행 중인 작업을 버리고 워커 프로세스 그룹 전체를 강제 종료합니다 (GPU 메모리 즉시 반환).
+        진행 중인 run_job 은 reason 을 오류로(WorkerAbortedError) 끝나고, 워커는 곧바로 다시 시작됩니다.
+        """
+        process = self.process
+        if process is None or process.returncode is not None:
+            return
+        logging.warning(f"추론 워커 {self.worker_id} 강제 종료: {reason}")
+        self.abort_reason = reason
+        self.abort_class = error_class
+        self.last_error = reason
+        self.recycles += 1
+        kill_process_group(process)
+
+    async def stop(self):
+        """워커에 종료를 요청하고, 응답이 없으면 강제로 종료합니다."""
+        process = self.process
+        if process is None or process.returncode is not None:
+            return
+        self.process = None
+        self.state = "stopped"
+        try:
+            process.stdin.write(b'{"type": "shutdown"}\n')
+            await process.stdin.drain()
+            await asyncio.wait_for(process.wait(), timeout=10.0)
+        except (asyncio.TimeoutError, ConnectionError):
+            kill_process_group(process)
+            await process.wait()
+        for task in self._tasks:
+            task.cancel()
+
+    def describe(self) -> Dict:
+        """/status 에 노출할 워커 상태 정보"""
+        return {
+            "worker_id": self.worker_id,
+            "state": self.state,
+            "ready": self.state in ("ready", "busy"),
+            "backend": self.backend,
+            "role": self.role,
+            "device": self.device,
+            "current_job": self.current_job,
+            "jobs_processed": self.jobs_processed,
+            "pid": self.pid,
+            "started_at": self.started_at,
+            "load_seconds": self.load_seconds,
+            "segment_audio": self.segment_audio,
+            "start_failures": self.start_failures,
+            "last_error": self.last_error,
+            "recycles": self.recycles
+        }
+
 
+def kill_process_group(process: asyncio.subprocess.Process):
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except ProcessLookupError:
+        pass
+
+
+def worker_roles() -> List[str]:
+    """파이프라인 모드에 따른 워커별 역할 목록 (split 이면 Stage1 워커 다음에 Stage2 워커)"""
+    if PIPELINE_MODE == "split":
+        return ["stage1"] * STAGE1_WORKER_COUNT + ["stage2"] * STAGE2_WORKER_COUNT
+    return ["full"] * WORKER_COUNT
+
+
+inference_workers: List[InferenceWorker] = [
+    InferenceWorker(
+        worker_id,
+        device=WORKER_DEVICES[worker_id % len(WORKER_DEVICES)] if WORKER_DEVICES else None,
+        role=role
+    )
+    for worker_id, role in enumerate(worker_roles())
+]
+
+event_broker = EventBroker(
+    get_job=job_statuses.get,
+    get_all_jobs=lambda: job_statuses,
+    get_extra=lambda: {"active_jobs": get_active_jobs()},
+    debounce_seconds=SSE_DEBOUNCE_SECONDS,
+    history_size=SSE_HISTORY_SIZE
+)
+
+# /metrics (Prometheus 텍스트 형식)
+metrics = MetricsRegistry()
+metric_requests = metrics.counter(
+    "memoria_requests_total", "접수된 생성 요청 수 (queued: 새 생성, coalesced: 진행 중 작업에 합쳐짐, cache_hit: 캐시 적중)",
+    ["outcome"])
+metric_jobs_finished = metrics.counter(
+    "memoria_jobs_finished_total", "끝난 작업 수 (실패는 error_class 별)", ["status", "error_class"])
+metric_queue_wait = metrics.histogram(
+    "memoria_queue_wait_seconds", "요청 접수부터 처리 시작까지 대기 시간", buckets=DURATION_BUCKETS)
+metric_job_duration = metrics.histogram(
+    "memoria_job_duration_seconds", "요청 접수부터 완료/실패/취소까지 걸린 시간", ["status"],
+    buckets=DURATION_BUCKETS)
+metric_stage_duration = metrics.histogram(
+    "memoria_stage_seconds", "추론 단계별 소요 시간", ["stage"], buckets=DURATION_BUCKETS)
+metric_worker_spawn = metrics.histogram(
+    "memoria_worker_spawn_seconds", "추론 워커 프로세스 시작부터 모델 로드 완료까지 걸린 시간",
+    buckets=DURATION_BUCKETS)
+metric_download_duration = metrics.histogram(
+    "memoria_download_duration_seconds", "음악 파일 응답 전송 시간", ["endpoint", "status"])
+metric_download_bytes = metrics.counter(
+    "memoria_download_bytes_total", "전송한 음악 데이터 바이트 수", ["endpoint"])
+metric_queue_depth = metrics.gauge(
+    "memoria_queue_depth", "대기 중인 작업 수", ["priority"])
+metric_jobs = metrics.gauge(
+    "memoria_jobs", "메모리에 있는 작업 수", ["status"])
+metric_workers = metrics.gauge(
+    "memoria_workers", "추론 워커 수", ["state"])
+metric_worker_recycles = metrics.counter(
+    "memoria_worker_recycles_total", "시간 초과/멈춤/취소로 강제 재시작한 횟수", ["worker"])
+metric_estimated_job_seconds = metrics.gauge(
+    "memoria_estimated_job_seconds", "예상 대기 시간 계산에 쓰는 테이크당 평균 처리 시간")
+metric_admission = metrics.counter(
+    "memoria_admission_total", "수용 제어 결과 (accepted 는 새로 큐에 들어간 작업 수)", ["result"])
+metric_cache_lookups = metrics.counter(
+    "memoria_result_cache_lookups_total", "결과 캐시 조회 수", ["result"])
+metric_cache_evictions = metrics.counter(
+    "memoria_result_cache_evictions_total", "용량 예산 때문에 캐시에서 뺀 항목 수")
+metric_cache_hit_ratio = metrics.gauge(
+    "memoria_result_cache_hit_ratio", "결과 캐시 적중률 (서버 시작 이후)")
+metric_cache_bytes = metrics.gauge(
+    "memoria_result_cache_bytes", "결과 캐시가 사용 중인 디스크 용량")
+metric_stage1_cache_lookups = metrics.counter(
+    "memoria_stage1_cache_lookups_total", "Stage1 산출물 캐시 조회 수 (테이크 단위)", ["result"])
+metric_stage1_cache_seconds_saved = metrics.counter(
+    "memoria_stage1_cache_gpu_seconds_saved_total", "Stage1 캐시 적중으로 건너뛴 Stage1 실행 시간 합계")
+metric_stage1_cache_bytes = metrics.gauge(
+    "memoria_stage1_cache_bytes", "Stage1 캐시가 사용 중인 디스크 용량")
+metric_pipeline_queue_depth = metrics.gauge(
+    "memoria_pipeline_queue_depth", "단계별 대기 작업 수 (stage2 는 stage1 을 마치고 Stage2 워커를 기다리는 작업)",
+    ["stage"])
+metric_sse_subscribers = metrics.gauge(
+    "memoria_sse_subscribers", "연결된 SSE 구독자 수")
+metric_sse_events = metrics.counter(
+    "memoria_sse_events_published_total", "발행한 SSE 이벤트 수")
+metric_stream_listeners = metrics.gauge(
+    "memoria_stream_listeners", "점진적 오디오 스트림 청취자 수")
+# 작업 ID -> (진행 중인 단계, 테이크, 시작 시각 monotonic, 시작 시각 epoch).
+# 단계가 바뀔 때 이전 단계의 소요 시간을 메트릭과 작업 추적에 기록한다
+job_stage_timers: Dict[str, Tuple[str, Optional[int], float, float]] = {}
+trace_store = TraceStore(TRACE_HISTORY_SIZE, TRACE_SLOWEST_SIZE)
+
+
+async def process_music_generation_queue():
+    """
+    백그라운드 스케줄러.
+    큐에서 작업을 꺼내 유휴 워커에 배정하고, 작업 실행은 워커별 태스크로 넘깁니다.
+    split 파이프라인에서는 Stage1 워커에 배정하며, stage2 는 process_stage2_queue 가 배정합니다.
+    """
+    while True:
+        # 유휴 워커를 먼저 확보한 뒤 작업을 가져온다 (작업이 큐에서 대기 상태로 남도록)
+        logging.info("스케줄러: 유휴 워커를 기다리는 중...")
+        worker = await idle_workers.get()
+
+        logging.info(f"스케줄러: 워커 {worker.worker_id} 배정 대기, 다음 작업을 기다리는 중...")
+        job_id, genre_txt, lyrics_txt, cache_key = await job_queue.get()
+
+        async with job_lock:
+            if is_group_cancelled(job_id):
+                # 큐에서 꺼낸 직후에 취소된 작업
+                release_inflight_job(job_id, cache_key)
+                skipped = True
+            else:
+                # 마감 시각 안에 끝낼 수 없는 작업은 GPU 를 쓰기 전에 버린다
+                skipped = expire_if_past_deadline(job_id, cache_key)
+            if not skipped:
+                worker.current_job = job_id
+        if skipped:
+            idle_workers.put_nowait(worker)
+            continue
+
+        logging.info(f"스케줄러: 작업 {job_id} -> 워커 {worker.worker_id}")
+        asyncio.create_task(execute_music_generation_job(
+            worker, job_id, genre_txt, lyrics_txt, cache_key))
+
+
+async def process_stage2_queue():
+    """
+    split 파이프라인의 stage2 스케줄러.
+    stage1 을 마친 작업을 도착 순서대로 유휴 Stage2 워커에 배정합니다.
+    """
+    while True:
+        worker = await idle_stage2_workers.get()
+        job_id, handoff = await stage2_queue.get()
+        if handoff.done():
+            # 기다리는 동안 취소된 작업
+            idle_stage2_workers.put_nowait(worker)
+            continue
+        stage2_handoffs.pop(job_id, None)
+        worker.current_job = job_id
+        logging.info(f"스케줄러: 작업 {job_id} -> stage2 워커 {worker.worker_id}")
+        handoff.set_result(worker)
+
+
+def release_worker(worker: InferenceWorker):
+    """작업을 마친 워커를 역할에 맞는 유휴 워커 대기열로 돌려줍니다."""
+    if worker.role == "stage2":
+        idle_stage2_workers.put_nowait(worker)
+    else:
+        idle_workers.put_nowait(worker)
+
+
+async def return_worker(worker: InferenceWorker):
+    """작업 중간에 다음 단계로 넘어가며 워커를 돌려줍니다."""
+    async with job_lock:
+        worker.current_job = None
+        worker.jobs_processed += 1
+    release_worker(worker)
+
+
+async def hand_off_to_stage2(job_id: str, worker: InferenceWorker, trace) -> InferenceWorker:
+    """
+    stage1 을 마친 작업을 stage2 대기열에 넣고 Stage1 워커를 돌려준 뒤, 배정된 Stage2 워커를 반환합니다.
+    대기열이 가득 차 있으면 자리가 날 때까지 Stage1 워커를 붙잡아 stage1 이 너무 앞서가지 않게 합니다.
+    """
+    released = False
+    try:
+        async with job_lock:
+            if is_group_cancelled(job_id):
+                raise WorkerAbortedError(f"작업 {job_id}이(가) 취소되었습니다.", "cancelled")
+            handoff = asyncio.get_running_loop().create_future()
+            stage2_handoffs[job_id] = handoff
+            # 대기 중에는 stage2 대기 상태로 보이게 하고, 단계 소요 시간에서 대기 시간을 뺀다
+            finish_stage_timer(job_id)
+            progress = job_statuses[job_id].get("progress") or {}
+            update_job_status(job_id, progress={
+                **{key: progress[key] for key in ("take", "num_takes") if key in progress},
+                "stage": "stage2", "state": "queued", "updated_at": datetime.now().isoformat()})
+
+        with trace.span("stage2_queue_wait", depth=len(stage2_handoffs)):
+            await stage2_queue.put((job_id, handoff))
+            await return_worker(worker)
+            released = True
             logging.info(
-                f"작업 {job_id}: infer.py 스크립트 실행 시작 - 명령어: {' '.join(cmd)}")
-            # 비동기로 외부 프로세스 실행
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=PARENT_DIR
-            )
+                f"작업 {job_id}: stage1 완료, stage2 워커를 기다리는 중 (워커 {worker.worker_id} 반환)")
+            stage2_worker = await handoff
+    finally:
+        stage2_handoffs.pop(job_id, None)
+        if not released:
+            await return_worker(worker)
 
-            # 프로세스 대기
-            stdout, stderr = await process.communicate()
+    async with job_lock:
+        update_job_status(job_id, worker_id=stage2_worker.worker_id)
+    return stage2_worker
 
-            if process.returncode != 0:
-                error_message = f"음악 생성 실패: {stderr.decode('utf-8')}"
-                logging.error(f"작업 {job_id}: 스크립트 실행 오류 - {error_message}")
-                raise Exception(error_message)
 
-            logging.info(f"작업 {job_id}: infer.py 스크립트 실행 성공")
-            # 생성된 MP3 파일 경로
-            output_file_path = os.path.join(
-                DEFAULT_OUTPUT_DIR, DEFAULT_OUTPUT_FILENAME)
+async def execute_music_generation_job(worker: InferenceWorker, job_id: str,
+                                       genre_txt: str, lyrics_txt: str,
+                                       cache_key: str):
+    """지정된 워커에서 하나의 음악 생성 작업을 실행하고 상태를 갱신합니다."""
+    logging.info(f"작업 시작: {job_id} (워커 {worker.worker_id})")
 
+    async with job_lock:
+        started_at = datetime.now()
+        num_takes = job_statuses[job_id].get("num_takes", 1)
+        created_at = datetime.fromisoformat(job_statuses[job_id]["created_at"])
+        metric_queue_wait.observe((started_at - created_at).total_seconds())
+        trace = trace_store.start(job_id, created_at.timestamp())
+        trace.add_span("queue_wait", created_at.timestamp(), started_at.timestamp(),
+                       priority=job_statuses[job_id].get("priority"),
+                       retries=job_statuses[job_id].get("retries", 0))
+        update_job_status(job_id, status="processing",
+                          worker_id=worker.worker_id,
+                          started_at=started_at.isoformat(),
+                          queue_position=None,
+                          estimated_wait_seconds=0,
+                          eta=estimate_eta(started_at, 0, num_takes))
+        logging.info(f"작업 상태 업데이트: {job_id} -> processing")
+        # 남은 대기 작업들의 순번이 하나씩 당겨졌다
+        refresh_queue_estimates()
+
+    success = False
+    result_files = []
+    take_seconds = []
+    error_message = None
+    error_class = "internal"
+    workspace = JobWorkspace(job_id)
+
+    try:
+        # 작업 전용 공간에 장르와 가사 저장
+        logging.info(f"작업 {job_id}: 작업 공간 생성 및 장르/가사 파일 저장")
+        with trace.span("prepare_workspace"):
+            await asyncio.to_thread(workspace.prepare, genre_txt, lyrics_txt)
+        logging.info(f"작업 {job_id}: 장르 및 가사 파일 저장 완료 - {workspace.path}")
+
+        # 세그먼트 오디오를 받을 스트림 준비 (청취자가 먼저 연결했으면 그대로 사용)
+        get_audio_stream(job_id)
+
+        # 같은 장르/가사/Stage1 설정으로 만든 Stage1 산출물이 있으면 작업 공간에 넣고 stage2 부터 실행한다
+        stage1_keys = stage1_cache_keys(genre_txt, lyrics_txt, num_takes)
+        job_stage1_outputs[job_id] = {}
+        with trace.span("stage1_cache") as span_args:
+            stage1_files = await asyncio.to_thread(restore_cached_stage1, workspace, stage1_keys)
+            span_args["hits"] = len(stage1_files)
+            span_args["misses"] = num_takes - len(stage1_files)
+        if stage1_files:
+            logging.info(
+                f"작업 {job_id}: Stage1 캐시 적중 - 테이크 {', '.join(stage1_files)}")
+
+        # split 파이프라인은 Stage1 워커(모든 테이크가 캐시 적중이면 건너뜀) -> stage2 대기열 -> Stage2 워커 순으로 실행
+        if PIPELINE_MODE != "split":
+            roles = ["full"]
+        elif len(stage1_files) < num_takes:
+            roles = ["stage1", "stage2"]
+        else:
+            roles = ["stage2"]
+
+        for role in roles:
+            if role == "stage2":
+                stage1_worker, worker = worker, None
+                worker = await hand_off_to_stage2(job_id, stage1_worker, trace)
+
+            # 워커가 재시작 중이면 모델 로드가 끝날 때까지 기다린다 (평소에는 바로 통과)
+            with trace.span("worker_ready", WORKER_TRACK, worker_id=worker.worker_id,
+                            state=worker.state) as span_args:
+                await worker.ensure_running()
+                span_args["load_seconds"] = worker.load_seconds
+
+            # 워커 준비를 기다리는 동안 취소되었으면 작업을 전달하지 않는다.
+            # 취소 시점에 작업을 받기 전이던 워커는 강제 종료하지 않으므로(cancel_job) 여기서 멈춰야 한다
+            async with job_lock:
+                if is_group_cancelled(job_id):
+                    raise WorkerAbortedError(f"작업 {job_id}이(가) 취소되었습니다.", "cancelled")
+
+            # 상주 추론 워커에 작업 전달 (모델은 워커 시작 시 이미 로드됨)
+            logging.info(f"작업 {job_id}: 추론 워커 {worker.worker_id}({role})에 작업 전달")
+            with trace.span("inference", WORKER_TRACK, worker_id=worker.worker_id,
+                            num_takes=num_takes, role=role):
+                result = await worker.run_job(job_id, {
+                    "genre_txt": workspace.genre_file_path,
+                    "lyrics_txt": workspace.lyrics_file_path,
+                    "output_dir": workspace.output_dir,
+                    "num_takes": num_takes,
+                    "stage1_files": stage1_files
+                })
+
+            if not result.get("ok"):
+                error_message = (result.get("error") or "음악 생성 실패")[
+                    :JOB_ERROR_MAX_LENGTH]
+                logging.error(f"작업 {job_id}: 추론 워커 오류 - {error_message}")
+                error_class = "inference"
+                raise Exception(error_message)
+            if role == "stage2" and result.get("elapsed"):
+                stage_durations["stage2"].append(result["elapsed"] / num_takes)
+
+            # 이번 단계에서 새로 만든 Stage1 산출물은 다음 단계(Stage2 워커)에 넘긴다
+            for take, (files, _) in job_stage1_outputs.get(job_id, {}).items():
+                stage1_files.setdefault(str(take), files)
+
+        logging.info(
+            f"작업 {job_id}: 추론 완료 ({result.get('elapsed')}초)")
+        # 생성된 MP3 파일 경로 (테이크 순서)
+        takes = result.get("takes") or [{
+            "file": result.get("output_file") or workspace.output_file_path,
+            "elapsed": result.get("elapsed")
+        }]
+
+        for take, take_result in enumerate(takes, start=1):
+            output_file_path = take_result["file"]
             # 파일이 존재하는지 확인
-            if not os.path.exists(output_file_path):
+            if not await asyncio.to_thread(os.path.exists, output_file_path):
                 error_message = "생성된 음악 파일을 찾을 수 없습니다."
                 logging.error(f"작업 {job_id}: 출력 파일 없음 - {output_file_path}")
+                error_class = "output_missing"
                 raise Exception(error_message)
 
             logging.info(f"작업 {job_id}: 출력 파일 발견 - {output_file_path}")
-            # 결과 파일 이름 생성 및 복사
-            final_file_name = f"{job_id}.mp3"
+            # 결과 파일을 복사하지 않고 FINAL_MUSIC_DIR 로 원자적으로 옮긴다 (첫 테이크는 기존과 같은 이름).
+            # 다운로드는 완성된 파일만 보게 되고, 파일 I/O 는 이벤트 루프 밖에서 처리한다.
+            final_file_name = f"{job_id}.mp3" if take == 1 else f"{job_id}_take{take}.mp3"
             final_file_path = os.path.join(FINAL_MUSIC_DIR, final_file_name)
-            shutil.copy2(output_file_path, final_file_path)
-            logging.info(f"작업 {job_id}: 출력 파일 복사 완료 - {final_file_path}")
+            with trace.span("publish_output", take=take) as span_args:
+                span_args["bytes"] = await asyncio.to_thread(os.path.getsize, output_file_path)
+                span_args["method"] = await asyncio.to_thread(
+                    publish_file, output_file_path, final_file_path)
+            logging.info(
+                f"작업 {job_id}: 출력 파일 이동 완료({span_args['method']}) - {final_file_path}")
+            # 구간 다운로드가 파일을 다시 훑지 않도록 완료 시점에 프레임 인덱스를 만들어 둔다
+            with trace.span("index_output", take=take) as span_args:
+                try:
+                    index = await asyncio.to_thread(mp3_index_cache.get, final_file_path)
+                    span_args["frames"] = index.frame_count
+                except ValueError as e:
+                    logging.warning(f"작업 {job_id}: MP3 프레임 인덱스 생성 실패 - {e}")
+            result_files.append(final_file_path)
+            take_seconds.append(take_result.get("elapsed"))
+
+        # 같은 요청이 다시 들어오면 재사용할 수 있도록 캐시에 등록
+        with trace.span("cache_put"):
+            await asyncio.to_thread(result_cache.put, cache_key, result_files)
+
+        success = True
+
+    except WorkerAbortedError as e:
+        error_message = str(e)
+        error_class = e.error_class
+        logging.error(f"작업 {job_id}: 워커 종료로 중단 - {error_message}")
+
+    except Exception as e:
+        error_message = str(e)
+        logging.error(f"작업 {job_id}: 처리 중 예외 발생 - {error_message}")
 
-            success = True
-            result_file = final_file_path
+    finally:
+        # 새로 만든 Stage1 산출물은 작업이 실패했어도 캐시에 남겨 재시도가 stage2 부터 시작하게 한다
+        stage1_outputs = job_stage1_outputs.pop(job_id, {})
+        if stage1_outputs:
+            with trace.span("stage1_cache_put", takes=len(stage1_outputs)):
+                await asyncio.to_thread(store_stage1_outputs, stage1_keys, stage1_outputs)
+
+        # 작업 공간 정리 (결과 파일은 이미 FINAL_MUSIC_DIR 로 옮겨짐)
+        finish_stage_timer(job_id)
+        with trace.span("cleanup_workspace"):
+            await asyncio.to_thread(workspace.cleanup)
+
+        # 작업 완료 상태 업데이트
+        finalize_started = time.time()
+        async with job_lock:
+            completed_at = datetime.now().isoformat()
+            if success:
+                update_job_status(job_id, status="completed",
+                                  file_path=result_files[0],
+                                  take_files=result_files,
+                                  take_seconds=take_seconds,
+                                  completed_at=completed_at,
+                                  eta=None)
+                job_durations.append(
+                    (datetime.fromisoformat(completed_at) - started_at).total_seconds() / len(result_files))
+                record_take_cost(take_seconds)
+                logging.info(f"작업 {job_id}: 상태 업데이트 -> completed")
+            else:
+                update_job_status(job_id, status="failed",
+                                  error=error_message,
+                                  error_class=error_class,
+                                  completed_at=completed_at,
+                                  eta=None)
+                logging.info(
+                    f"작업 {job_id}: 상태 업데이트 -> failed - {error_message}")
+
+            release_inflight_job(job_id, cache_key)
+
+            if worker is not None:
+                worker.current_job = None
+                worker.jobs_processed += 1
+                logging.info(f"작업 {job_id}: 처리 완료. 워커 {worker.worker_id} 반환.")
+
+            trace.add_span("finalize", finalize_started, time.time())
+            trace_store.finish(job_id, job_statuses[job_id]["status"])
+
+            # 처리 시간 평균과 워커 여유가 바뀌었으므로 예상 대기 시간을 다시 계산
+            refresh_queue_estimates()
+
+        # 워커 반환 (stage2 대기 중에 끝난 작업은 Stage1 워커를 이미 돌려줬다)
+        if worker is not None:
+            release_worker(worker)
+
+
+def record_take_cost(take_seconds: List[Optional[float]]):
+    """여러 테이크 작업의 첫 테이크 대비 추가 테이크 비용을 기록합니다."""
+    if len(take_seconds) < 2 or any(seconds is None for seconds in take_seconds):
+        return
+    take_costs.append((take_seconds[0], statistics.mean(take_seconds[1:])))
+
+
+def summarize_take_costs() -> Dict:
+    """추가 테이크 하나의 비용을 첫 테이크(단독 생성) 대비로 요약합니다."""
+    if not take_costs:
+        return {"jobs": 0}
+    first = statistics.mean(first for first, _ in take_costs)
+    extra = statistics.mean(extra for _, extra in take_costs)
+    return {
+        "jobs": len(take_costs),
+        "first_take_seconds": round(first, 3),
+        "extra_take_seconds": round(extra, 3),
+        "extra_take_cost_ratio": round(extra / first, 3) if first else None
+    }
+
+
+def job_result_files(job: Dict) -> List[str]:
+    """작업의 결과 파일 목록 (테이크 순서)"""
+    if job.get("take_files"):
+        return job["take_files"]
+    return [job["file_path"]] if job.get("file_path") else []
+
+
+def release_inflight_job(job_id: str, cache_key: str):
+    """
+    끝난(완료/실패/만료) 대표 작업을 진행 중 목록에서 정리합니다.
+    job_lock 을 잡은 상태에서 최종 상태를 기록한 뒤 호출해야 합니다.
+    """
+    # 스트림 종료 (청취 중인 연결은 받은 세그먼트까지 마저 보낸다)
+    finish_audio_stream(job_id)
+
+    # 진행 중 목록에서 제거 (이후 같은 요청은 캐시 또는 새 생성으로 처리)
+    if inflight_jobs.get(cache_key) == job_id:
+        del inflight_jobs[cache_key]
+    followers = job_followers.pop(job_id, [])
+    if followers:
+        logging.info(
+            f"작업 {job_id}: 합쳐진 요청 {len(followers)}건도 함께 완료 처리")
+
+
+def cancel_job(job_id: str) -> str:
+    """
+    작업을 취소하고 취소 전 상태를 반환합니다. job_lock 을 잡은 상태에서 호출해야 합니다.
+
+    합쳐진 요청이 있는 생성은 아직 결과를 기다리는 요청이 남아 있으면 계속 진행하고,
+    모두 취소되었을 때만 큐에서 빼거나(대기 중) 워커를 강제 종료합니다(처리 중).
+    """
+    job = job_statuses[job_id]
+    previous_status = job["status"]
+    leader_id = job.get("coalesced_with") or job_id
+
+    job.update(status="cancelled", completed_at=datetime.now().isoformat(),
+               queue_position=None, estimated_wait_seconds=None, eta=None)
+    observe_job_finished(job)
+    job_store.save(job_id, job)
+    for waiter in job_waiters.pop(job_id, []):
+        if not waiter.done():
+            waiter.set_result(None)
+    event_broker.mark_changed(job_id)
+
+    if leader_id != job_id and job_id in job_followers.get(leader_id, []):
+        job_followers[leader_id].remove(job_id)
+    if not is_group_cancelled(leader_id):
+        logging.info(f"작업 {job_id}: 취소 (대표 작업 {leader_id}의 생성은 다른 요청을 위해 계속)")
+        return previous_status
+
+    queued_item = job_queue.remove(leader_id)
+    if queued_item is not None:
+        # 큐 항목의 캐시 키로 정리한다. force_regenerate 로 같은 키에 새 대표 작업이 생겼으면
+        # release_inflight_job 은 그 작업의 진행 중 항목을 건드리지 않는다
+        _, _, _, cache_key = queued_item
+        release_inflight_job(leader_id, cache_key)
+        refresh_queue_estimates()
+        logging.info(f"작업 {job_id}: 대기 중 작업 취소")
+        return previous_status
+
+    # stage2 워커를 기다리는 중이면 대기를 끝낸다 (stage2 스케줄러는 끝난 대기를 건너뜀)
+    handoff = stage2_handoffs.pop(leader_id, None)
+    if handoff is not None and not handoff.done():
+        handoff.set_exception(WorkerAbortedError(f"작업 {leader_id}이(가) 취소되었습니다.", "cancelled"))
+        logging.info(f"작업 {job_id}: stage2 대기 중 작업 취소")
+
+    # 워커가 실행 중인 작업이면 워커를 강제 종료한다. 워커가 아직 시작/모델 로드 중이라
+    # 작업을 받기 전이면 죽이지 않는다: 실행 직전의 취소 확인(execute_music_generation_job)에서 멈추고,
+    # 필요 없는 모델 재로드도 피한다 (스케줄러가 막 꺼낸 작업이면 스케줄러가 건너뜀)
+    for worker in inference_workers:
+        if worker._pending_job_id == leader_id:
+            worker.kill(f"작업 {leader_id}이(가) 취소되었습니다.", "cancelled")
+            logging.info(f"작업 {job_id}: 처리 중 작업 취소 - 워커 {worker.worker_id} 강제 종료")
+        elif worker.current_job == leader_id:
+            logging.info(f"작업 {job_id}: 워커 {worker.worker_id} 준비 중 작업 취소 - 작업을 전달하지 않음")
+    return previous_status
+
+
+def is_group_cancelled(leader_id: str) -> bool:
+    """대표 작업과 합쳐진 요청이 모두 취소되었으면 True (더 이상 결과를 기다리는 요청이 없음)"""
+    return all(job_statuses[member_id]["status"] == "cancelled"
+               for member_id in [leader_id, *job_followers.get(leader_id, [])])
+
+
+def get_group_deadline(job_id: str) -> Optional[datetime]:
+    """
+    대표 작업과 합쳐진 요청 모두에 마감 시각이 있을 때 그중 가장 늦은 시각.
+    하나라도 마감 시각이 없으면 None (누군가는 결과를 기다리고 있으므로 버리지 않는다).
+    """
+    deadlines = [job_statuses[target_id].get("deadline")
+                 for target_id in [job_id, *job_followers.get(job_id, [])]
+                 if job_statuses[target_id]["status"] != "cancelled"]
+    if any(deadline is None for deadline in deadlines):
+        return None
+    return max(datetime.fromisoformat(deadline) for deadline in deadlines)
 
-        except Exception as e:
-            error_message = str(e)
-            logging.error(f"작업 {job_id}: 처리 중 예외 발생 - {error_message}")
 
+def expire_if_past_deadline(job_id: str, cache_key: str) -> bool:
+    """
+    지금 시작해도 평균 처리 시간 안에 마감 시각을 넘기는 작업이면 실패 처리하고 True 를 반환합니다.
+    job_lock 을 잡은 상태에서 호출해야 합니다.
+    """
+    deadline = get_group_deadline(job_id)
+    now = datetime.now()
+    num_takes = job_statuses[job_id].get("num_takes", 1)
+    if deadline is None or now + timedelta(seconds=estimate_job_seconds(num_takes)) <= deadline:
+        return False
+
+    update_job_status(job_id, status="failed",
+                      error="마감 시각 안에 완료할 수 없어 처리하지 않았습니다.",
+                      error_class="deadline",
+                      completed_at=now.isoformat(),
+                      queue_position=None, eta=None)
+    release_inflight_job(job_id, cache_key)
+    admission_stats["deadline_expired"] += 1
+    refresh_queue_estimates()
+    logging.info(f"작업 {job_id}: 마감 시각({deadline.isoformat()}) 초과로 건너뜀")
+    return True
+
+
+def update_job_status(job_id: str, **fields):
+    """
+    작업 상태를 갱신하고 SSE 알림을 보냅니다.
+    이 작업에 합쳐진 요청들도 같은 상태 전이를 받도록 함께 갱신합니다.
+    job_lock 을 잡은 상태에서 호출해야 합니다.
+    """
+    # 취소된 작업은 더 이상 갱신하지 않는다 (취소된 대표 작업의 생성은 합쳐진 요청을 위해 계속될 수 있음)
+    target_ids = [target_id for target_id in [job_id, *job_followers.get(job_id, [])]
+                  if job_statuses[target_id]["status"] != "cancelled"]
+    for target_id in target_ids:
+        finished = (fields.get("status") in TERMINAL_STATUSES
+                    and job_statuses[target_id]["status"] not in TERMINAL_STATUSES)
+        job_statuses[target_id].update(fields)
+        if finished:
+            observe_job_finished(job_statuses[target_id])
+        job_store.save(target_id, job_statuses[target_id])
+        if fields.get("status") in TERMINAL_STATUSES:
+            for waiter in job_waiters.pop(target_id, []):
+                if not waiter.done():
+                    waiter.set_result(None)
+    if target_ids:
+        event_broker.mark_changed(*target_ids)
+
+
+def observe_job_finished(job: Dict):
+    """끝난 작업(요청) 하나를 완료 카운터와 전체 소요 시간 히스토그램에 기록합니다."""
+    error_class = "none"
+    if job["status"] == "failed":
+        error_class = job.get("error_class") or "unknown"
+    metric_jobs_finished.inc(status=job["status"], error_class=error_class)
+    metric_job_duration.observe(
+        (datetime.fromisoformat(job["completed_at"])
+         - datetime.fromisoformat(job["created_at"])).total_seconds(),
+        status=job["status"])
+
+
+async def wait_for_job(job_id: str) -> Dict:
+    """작업이 완료 또는 실패할 때까지 기다린 뒤 최종 상태를 반환합니다 (스레드를 점유하지 않음)."""
+    if job_statuses[job_id]["status"] not in TERMINAL_STATUSES:
+        waiter = asyncio.get_running_loop().create_future()
+        job_waiters.setdefault(job_id, []).append(waiter)
+        try:
+            await waiter
         finally:
-            # 임시 파일 정리 로직 제거 (로컬 파일 사용)
+            # 클라이언트가 연결을 끊어 취소된 경우에도 목록에서 제거 (작업 자체는 계속 진행)
+            waiters = job_waiters.get(job_id)
+            if waiters is not None and waiter in waiters:
+                waiters.remove(waiter)
+                if not waiters:
+                    del job_waiters[job_id]
+    return job_statuses[job_id]
+
+
+def estimate_job_seconds(num_takes: int = 1) -> float:
+    """최근 테이크당 처리 시간의 이동 평균 x 테이크 수 (기록이 없으면 설정된 기본값 기준)"""
+    if not job_durations:
+        return JOB_DURATION_DEFAULT_SECONDS * num_takes
+    return statistics.mean(job_durations) * num_takes
+
+
+def estimate_eta(start: datetime, wait_seconds: float, num_takes: int = 1) -> str:
+    return (start + timedelta(seconds=wait_seconds + estimate_job_seconds(num_takes))).isoformat(
+        timespec="seconds")
+
+
+def queued_job_takes() -> List[int]:
+    """대기 중인 작업들의 테이크 수 (큐에서 꺼내질 순서대로)"""
+    return [job_statuses.get(job_id, {}).get("num_takes", 1)
+            for job_id in job_queue.ordered_job_ids()]
+
+
+def estimate_stage_seconds(stage: str, num_takes: int = 1) -> float:
+    """split 파이프라인 한 단계의 테이크당 평균 실행 시간 x 테이크 수 (기록이 없으면 전체 처리 시간의 절반)"""
+    durations = stage_durations[stage]
+    if not durations:
+        return estimate_job_seconds(num_takes) / 2
+    return statistics.mean(durations) * num_takes
+
+
+def estimate_pipeline_start_waits(job_takes: List[int]) -> List[float]:
+    """
+    split 파이프라인의 estimate_start_waits.
+    Stage1 워커는 stage1 시간 동안만 붙잡히고, stage2 는 Stage2 워커 슬롯으로 따로 계산합니다.
+    stage2 대기열이 가득 차면(MEMORIA_STAGE2_QUEUE_MAX_DEPTH) Stage1 워커는 앞 작업이 stage2 를
+    시작할 때까지 다음 작업을 받지 못하는 것도 반영합니다.
+    """
+    now = time.monotonic()
+
+    def remaining(worker: InferenceWorker, stage: str) -> float:
+        current = job_statuses.get(worker.current_job) if worker.current_job else None
+        if current is None or worker.job_started_at is None:
+            return 0.0
+        return max(0.0, estimate_stage_seconds(stage, current.get("num_takes", 1))
+                   - (now - worker.job_started_at))
+
+    stage1_slots = [remaining(worker, "stage1") for worker in inference_workers
+                    if worker.role == "stage1"]
+    stage2_slots = [remaining(worker, "stage2") for worker in inference_workers
+                    if worker.role == "stage2"]
+    heapq.heapify(stage1_slots)
+    heapq.heapify(stage2_slots)
+
+    # stage2 시작 예정 시각 (도착 순서). stage2 를 기다리는 작업이 먼저 Stage2 워커를 받는다
+    stage2_starts = []
+
+    def schedule_stage2(ready_at: float, num_takes: int) -> float:
+        start = max(ready_at, heapq.heappop(stage2_slots))
+        heapq.heappush(stage2_slots, start + estimate_stage_seconds("stage2", num_takes))
+        stage2_starts.append(start)
+        return start
+
+    for job_id in list(stage2_handoffs):
+        schedule_stage2(0.0, job_statuses.get(job_id, {}).get("num_takes", 1))
+
+    waits = []
+    for num_takes in job_takes:
+        start = heapq.heappop(stage1_slots)
+        stage1_end = start + estimate_stage_seconds("stage1", num_takes)
+        schedule_stage2(stage1_end, num_takes)
+        released = stage1_end
+        if STAGE2_QUEUE_MAX_DEPTH and len(stage2_starts) > STAGE2_QUEUE_MAX_DEPTH:
+            # 대기열에 자리가 나는 것은 STAGE2_QUEUE_MAX_DEPTH 개 앞의 작업이 stage2 를 시작할 때
+            released = max(released, stage2_starts[-1 - STAGE2_QUEUE_MAX_DEPTH])
+        heapq.heappush(stage1_slots, released)
+        waits.append(start)
+    return waits
+
+
+def estimate_start_waits(job_takes: List[int]) -> List[float]:
+    """
+    큐의 앞에서부터 각 작업(테이크 수 목록)이 처리를 시작하기까지의 예상 대기 시간(초) 목록.
+    각 워커가 다음 작업을 받을 수 있을 때까지 남은 시간(예상 처리 시간 - 현재 작업 경과 시간)에서
+    시작해, 순서대로 가장 먼저 비는 워커에 작업을 배정해 보는 방식으로 추정합니다.
+    """
+    if PIPELINE_MODE == "split":
+        return estimate_pipeline_start_waits(job_takes)
+    now = datetime.now()
+
+    available_after = []
+    for worker in inference_workers:
+        remaining = 0.0
+        current = job_statuses.get(worker.current_job) if worker.current_job else None
+        if current is not None and current.get("started_at"):
+            elapsed = (now - datetime.fromisoformat(current["started_at"])).total_seconds()
+            remaining = max(0.0, estimate_job_seconds(current.get("num_takes", 1)) - elapsed)
+        available_after.append(remaining)
+    heapq.heapify(available_after)
+
+    waits = []
+    for num_takes in job_takes:
+        wait_seconds = heapq.heappop(available_after)
+        heapq.heappush(available_after, wait_seconds + estimate_job_seconds(num_takes))
+        waits.append(wait_seconds)
+    return waits
+
+
+def refresh_queue_estimates():
+    """
+    대기 중인 작업들의 순번(queue_position)과 예상 대기 시간을 다시 계산하고
+    값이 바뀐 작업만 갱신해 SSE 로 알립니다. job_lock 을 잡은 상태에서 호출해야 합니다.
+    """
+    now = datetime.now()
+    ordered_job_ids = job_queue.ordered_job_ids()
+    start_waits = estimate_start_waits(queued_job_takes())
+
+    for position, (job_id, wait_seconds) in enumerate(
+            zip(ordered_job_ids, start_waits), start=1):
+        job = job_statuses.get(job_id)
+        if job is None:
+            continue
+        wait_seconds = round(wait_seconds)
+        if (job.get("queue_position"), job.get("estimated_wait_seconds")) != (position, wait_seconds):
+            update_job_status(job_id, queue_position=position,
+                              estimated_wait_seconds=wait_seconds,
+                              eta=estimate_eta(now, wait_seconds, job.get("num_takes", 1)))
+
+
+def parse_progress_marker(line: str, current: Optional[Dict]) -> Optional[Dict]:
+    """모델 출력 한 줄에서 진행 단계를 추출합니다. 변화가 없으면 None."""
+    # 여러 테이크 작업은 몇 번째 테이크인지를 단계가 바뀌어도 유지한다
+    take = {key: current[key] for key in ("take", "num_takes") if key in current} if current else {}
+
+    match = TAKE_PATTERN.search(line)
+    if match:
+        return {"stage": "take", "state": "started",
+                "take": int(match.group(1)), "num_takes": int(match.group(2))}
+
+    for pattern, progress in PROGRESS_MARKERS:
+        if pattern.search(line):
+            return {**progress, **take}
+
+    if current is not None and current.get("stage") == "stage2":
+        match = STAGE2_SEGMENT_PATTERN.search(line)
+        if match:
+            segment, total = [int(group) for group in match.groups() if group is not None]
+            if (current.get("segment"), current.get("total_segments")) != (segment, total):
+                return {"stage": "stage2", "state": "running",
+                        "segment": segment, "total_segments": total, **take}
+    return None
+
+
+def estimate_job_fraction(job: Dict) -> float:
+    """
+    작업 하나의 대략적인 진행률 (0~1). 배치 진행률 집계용으로,
+    stage1 을 앞 절반, stage2 세그먼트를 그다음 40%, 믹싱을 마지막으로 봅니다.
+    여러 테이크 작업은 끝난 테이크 수에 현재 테이크의 진행률을 더해 테이크 수로 나눕니다.
+    """
+    if job["status"] in TERMINAL_STATUSES:
+        return 1.0
+    progress = job.get("progress")
+    if job["status"] != "processing" or not progress:
+        return 0.0
+    if progress.get("num_takes"):
+        return (progress["take"] - 1 + estimate_take_fraction(progress)) / progress["num_takes"]
+    return estimate_take_fraction(progress)
+
+
+def estimate_take_fraction(progress: Dict) -> float:
+    stage = progress.get("stage")
+    if stage == "stage1":
+        return 0.5 if progress.get("state") in ("finished", "cached") else 0.1
+    if stage == "stage2":
+        if progress.get("state") == "finished":
+            return 0.9
+        if progress.get("total_segments"):
+            return 0.5 + 0.4 * progress["segment"] / progress["total_segments"]
+        return 0.5
+    if stage == "mixing":
+        return 0.95
+    return 0.0
+
+
+def observe_stage_progress(job_id: str, progress: Dict):
+    """진행 단계가 바뀌면 이전 단계의 소요 시간을 기록합니다 (테이크가 바뀌어도 새 단계로 본다)."""
+    stage = progress["stage"]
+    if stage == "take" or progress.get("state") == "cached":
+        # 캐시로 건너뛴 stage1 은 단계 소요 시간 통계에 넣지 않는다
+        finish_stage_timer(job_id)
+        return
+    current = job_stage_timers.get(job_id)
+    if current is not None and current[0] == stage:
+        return
+    finish_stage_timer(job_id)
+    job_stage_timers[job_id] = (stage, progress.get("take"), time.monotonic(), time.time())
+
+
+def finish_stage_timer(job_id: str):
+    current = job_stage_timers.pop(job_id, None)
+    if current is None:
+        return
+    stage, take, started_monotonic, started_at = current
+    metric_stage_duration.observe(time.monotonic() - started_monotonic, stage=stage)
+    trace = trace_store.active.get(job_id)
+    if trace is not None:
+        args = {"take": take} if take is not None else {}
+        trace.add_span(stage, started_at, time.time(), WORKER_TRACK, **args)
+
+
+async def handle_worker_output(worker: InferenceWorker, job_id: Optional[str], line: str):
+    """워커 출력 한 줄을 작업 로그 링 버퍼에 저장하고, 진행 단계가 바뀌면 상태에 반영합니다."""
+    line = line[:JOB_LOG_MAX_LINE_LENGTH]
+    if job_id is None:
+        # 모델 로드 중 등 작업과 무관한 출력 (로드 실패 시 오류 메시지에 최근 몇 줄을 붙인다)
+        worker.load_output.append(line)
+        logging.debug(f"[워커 {worker.worker_id}] {line}")
+        return
+
+    job_log = job_logs.get(job_id)
+    if job_log is None:
+        job_log = job_logs[job_id] = deque(maxlen=JOB_LOG_MAX_LINES)
+    job_log.append(line)
+
+    job_status = job_statuses.get(job_id)
+    if job_status is None:
+        return
+    progress = parse_progress_marker(line, job_status.get("progress"))
+    if progress is not None:
+        observe_stage_progress(job_id, progress)
+        progress["updated_at"] = datetime.now().isoformat()
+        async with job_lock:
+            update_job_status(job_id, progress=progress)
+        logging.info(f"작업 {job_id}: 진행 단계 - {progress}")
+
+
+def get_audio_stream(job_id: str) -> AudioStream:
+    stream = audio_streams.get(job_id)
+    if stream is None:
+        stream = audio_streams[job_id] = AudioStream(job_id)
+    return stream
+
+
+def finish_audio_stream(job_id: str):
+    """작업의 스트림을 끝내고, 청취자가 없으면 버퍼를 바로 버립니다."""
+    stream = audio_streams.get(job_id)
+    if stream is None:
+        return
+    stream.finish()
+    if stream.listeners == 0:
+        del audio_streams[job_id]
+
+
+def stage1_cache_keys(genre_txt: str, lyrics_txt: str, num_takes: int) -> Dict[int, str]:
+    """테이크별 Stage1 캐시 키. 테이크마다 시드가 다르므로 테이크 번호도 키에 들어간다."""
+    infer_args = WORKER_INFER_ARGS + WORKER_EXTRA_ARGS + (
+        ["--backend", WORKER_BACKEND] if WORKER_BACKEND != "yue" else [])
+    return {
+        take: compute_stage1_key(genre_txt, lyrics_txt, STAGE1_MODEL, infer_args, take)
+        for take in range(1, num_takes + 1)
+    }
+
+
+def restore_cached_stage1(workspace: JobWorkspace, keys: Dict[int, str]) -> Dict[str, List[str]]:
+    """캐시에 있는 테이크의 Stage1 산출물을 작업 공간에 넣고 워커에 넘길 {"테이크": [경로...]} 를 반환합니다."""
+    restored = {}
+    for take, key in keys.items():
+        cached = stage1_cache.get(key)
+        if cached is not None:
+            restored[str(take)] = workspace.restore_stage1(take, cached["files"])
+    return restored
+
+
+def store_stage1_outputs(keys: Dict[int, str], outputs: Dict[int, Tuple[List[str], float]]):
+    """워커가 새로 만든 테이크별 Stage1 산출물을 캐시로 옮깁니다 (작업 공간 정리 전에 호출)."""
+    for take, (files, seconds) in outputs.items():
+        key = keys.get(take)
+        if key is None:
+            continue
+        try:
+            stage1_cache.put(key, files, seconds)
+        except OSError as e:
+            logging.warning(f"Stage1 산출물을 캐시에 저장할 수 없습니다 (테이크 {take}): {e}")
+
+
+def handle_worker_stage1(worker: InferenceWorker, message: Dict):
+    """워커가 새로 만든 Stage1 산출물의 위치를 기록합니다 (작업이 끝날 때 캐시에 등록)."""
+    job_id = message.get("job_id")
+    outputs = job_stage1_outputs.get(job_id)
+    if job_id != worker._pending_job_id or outputs is None:
+        return
+    files = message.get("files") or []
+    if files:
+        seconds = float(message.get("seconds") or 0)
+        outputs[int(message.get("take", 1))] = (files, seconds)
+        stage_durations["stage1"].append(seconds)
+
+
+async def handle_worker_segment(worker: InferenceWorker, message: Dict):
+    """워커가 내보낸 세그먼트 오디오를 작업 스트림에 덧붙입니다."""
+    job_id = message.get("job_id")
+    if job_id != worker._pending_job_id or job_id not in job_statuses:
+        return
+
+    try:
+        data = await asyncio.to_thread(Path(message["file"]).read_bytes)
+    except (KeyError, OSError) as e:
+        logging.warning(f"작업 {job_id}: 세그먼트 오디오를 읽을 수 없습니다 - {e}")
+        return
+
+    stream = get_audio_stream(job_id)
+    stream.append(data, message.get("total"))
+    if len(stream.segments) > 1:
+        return
+
+    # 첫 세그먼트: 요청 접수부터 재생 가능한 오디오까지 걸린 시간(TTFA) 기록
+    now = datetime.now()
+    created_at = datetime.fromisoformat(job_statuses[job_id]["created_at"])
+    time_to_first_audio = round((now - created_at).total_seconds(), 3)
+    first_audio_latencies.append(time_to_first_audio)
+    async with job_lock:
+        update_job_status(job_id, first_audio_at=now.isoformat(),
+                          time_to_first_audio=time_to_first_audio)
+    logging.info(f"작업 {job_id}: 첫 오디오 세그먼트 준비 ({time_to_first_audio}초)")
+
+
+def describe_pipeline() -> Dict:
+    """단계별 워커 수, 처리 중인 작업 수, 대기 작업 수 (/status, /metrics)"""
+    stages = {}
+    for stage in ("stage1", "stage2") if PIPELINE_MODE == "split" else ("full",):
+        workers = [worker for worker in inference_workers if worker.role == stage]
+        stages[stage] = {
+            "workers": len(workers),
+            "busy": sum(1 for worker in workers if worker.current_job is not None)
+        }
+    # 첫 단계의 대기 작업은 작업 큐, stage2 는 stage1 을 마치고 Stage2 워커를 기다리는 작업
+    first_stage = "stage1" if PIPELINE_MODE == "split" else "full"
+    stages[first_stage]["queued"] = job_queue.qsize()
+    if PIPELINE_MODE == "split":
+        stages["stage2"]["queued"] = len(stage2_handoffs)
+        stages["stage2"]["max_queued"] = STAGE2_QUEUE_MAX_DEPTH
+        for stage in ("stage1", "stage2"):
+            stages[stage]["estimated_take_seconds"] = round(estimate_stage_seconds(stage), 1)
+    return {"mode": PIPELINE_MODE, "stages": stages}
+
+
+def get_active_jobs() -> List[Dict]:
+    """워커별로 현재 처리 중인 작업 목록을 반환합니다."""
+    return [
+        {"worker_id": worker.worker_id, "job_id": worker.current_job}
+        for worker in inference_workers
+        if worker.current_job is not None
+    ]
+
+
+def collect_expired_files(expired_files: List[str], max_bytes: int,
+                          last_used: Optional[Dict[str, float]] = None) -> Dict:
+    """
+    (스레드에서 실행) 만료된 작업의 MP3 를 지우고, 남은 MP3 전체 용량이 max_bytes 를 넘으면
+    가장 오래 사용되지 않은 파일부터 지웁니다. 사용 시각은 파일 수정 시각과 last_used(결과 캐시 적중 시각)
+    중 늦은 쪽이라, 자주 재사용되는 오래된 결과는 나중에 지워집니다.
+    삭제한 파일 목록과 회수한 용량을 반환합니다.
+    """
+    last_used = last_used or {}
+    deleted_files = []
+    bytes_reclaimed = 0
+
+    def remove(path: str, size: int):
+        nonlocal bytes_reclaimed
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        deleted_files.append(path)
+        bytes_reclaimed += size
+
+    for path in expired_files:
+        try:
+            remove(path, os.path.getsize(path))
+        except OSError:
             pass
 
-            # 작업 완료 상태 업데이트
-            async with job_lock:
-                if success:
-                    job_statuses[job_id]["status"] = "completed"
-                    job_statuses[job_id]["file_path"] = result_file
-                    logging.info(f"작업 {job_id}: 상태 업데이트 -> completed")
-                else:
-                    job_statuses[job_id]["status"] = "failed"
-                    job_statuses[job_id]["error"] = error_message
-                    logging.info(
-                        f"작업 {job_id}: 상태 업데이트 -> failed - {error_message}")
+    music_files = []
+    for entry in os.scandir(FINAL_MUSIC_DIR):
+        if entry.is_file() and entry.name.endswith(".mp3"):
+            stat = entry.stat()
+            used_at = max(stat.st_mtime, last_used.get(entry.path, 0.0))
+            music_files.append((used_at, entry.path, stat.st_size))
+    total_bytes = sum(size for _, _, size in music_files)
+
+    for _, path, size in sorted(music_files):
+        if total_bytes <= max_bytes:
+            break
+        remove(path, size)
+        total_bytes -= size
+
+    return {"deleted_files": deleted_files, "bytes_reclaimed": bytes_reclaimed}
+
+
+async def sweep_expired_jobs():
+    """
+    보존 기간이 지난 작업 기록과 MP3 를 정리합니다.
+    디스크 용량 한도를 넘은 경우 가장 오래된 MP3 부터 지우고, 그 파일을 가리키는 작업도 만료시킵니다.
+    """
+    cutoff = (datetime.now() - timedelta(seconds=JOB_RETENTION_SECONDS)).isoformat()
+
+    async with job_lock:
+        expired_ids = {
+            job_id for job_id, job in job_statuses.items()
+            if job["status"] in TERMINAL_STATUSES
+            and (job.get("completed_at") or job["created_at"]) < cutoff
+        }
+        # 아직 보존 중인 작업이 같은 파일을 쓰고 있으면(합쳐진 작업, 캐시 적중) 파일은 남긴다
+        kept_files = {
+            path for job_id, job in job_statuses.items()
+            if job_id not in expired_ids
+            for path in job_result_files(job)
+        }
+        expired_files = sorted({
+            path for job_id in expired_ids
+            for path in job_result_files(job_statuses[job_id])
+            if path not in kept_files
+        })
 
-                job_statuses[job_id]["completed_at"] = datetime.now(
-                ).isoformat()
-                active_job = None
-                logging.info(f"작업 {job_id}: 처리 완료. active_job 초기화.")
+    result = await asyncio.to_thread(lambda: collect_expired_files(
+        expired_files, MUSIC_DIR_MAX_BYTES, result_cache.last_used_by_file()))
+    deleted_files = set(result["deleted_files"])
+
+    async with job_lock:
+        # 용량 한도 때문에 지운 파일을 가리키던 작업도 함께 만료
+        for job_id, job in job_statuses.items():
+            if any(path in deleted_files for path in job_result_files(job)):
+                expired_ids.add(job_id)
+        for job_id in expired_ids:
+            job_statuses.pop(job_id, None)
+            job_logs.pop(job_id, None)
+        # 모든 작업이 만료된 배치는 목록에서 지운다
+        for batch_id in [batch_id for batch_id, job_ids in batches.items()
+                         if not any(job_id in job_statuses for job_id in job_ids)]:
+            del batches[batch_id]
+
+    for path in deleted_files:
+        await asyncio.to_thread(result_cache.forget_file, path)
+        mp3_index_cache.forget(path)
+    await asyncio.to_thread(job_store.delete, sorted(expired_ids))
+    # 캐시 적중으로 바뀐 사용 시각을 주기적으로 저장 (비정상 종료 시 잃는 LRU 순서를 줄인다)
+    await asyncio.to_thread(result_cache.flush)
+    await asyncio.to_thread(stage1_cache.flush)
+
+    retention_stats["sweeps"] += 1
+    retention_stats["last_sweep_at"] = datetime.now().isoformat()
+    retention_stats["jobs_expired"] += len(expired_ids)
+    retention_stats["files_deleted"] += len(deleted_files)
+    retention_stats["bytes_reclaimed"] += result["bytes_reclaimed"]
+    if expired_ids or deleted_files:
+        logging.info(
+            f"보존 정책 정리: 작업 {len(expired_ids)}건 만료, 파일 {len(deleted_files)}개 삭제, "
+            f"{result['bytes_reclaimed']} bytes 회수")
+
+
+async def run_retention_sweeper():
+    """보존 정책 정리를 주기적으로 실행하는 백그라운드 태스크"""
+    while True:
+        try:
+            await sweep_expired_jobs()
+        except Exception as e:
+            logging.error(f"보존 정책 정리 중 오류: {e}")
+        await asyncio.sleep(RETENTION_SWEEP_INTERVAL_SECONDS)
 
-                # 이벤트 발생시켜 SSE 알림
-                job_update_event.set()
 
-            # 작업 완료 표시
-            job_queue.task_done()
-            logging.info(f"작업 {job_id}: 큐 작업 완료 표시")
+def recover_jobs():
+    """
+    저장소의 작업을 메모리로 불러오고, 재시작 전에 끝나지 않은 작업을 다시 큐에 넣습니다.
+    대기 중이던 작업은 그대로, 처리 중이던 작업은 재시도 횟수를 늘려 다시 대기시킵니다.
+    """
+    requeue = []
+    recent_durations = []
+    # 취소된 대표 작업 -> 그 대신 되살린 첫 번째 합쳐진 요청 (나머지 요청은 이 작업에 다시 합친다)
+    promoted_leaders: Dict[str, str] = {}
+    for job_id, job, request in job_store.load_all():
+        job_statuses[job_id] = job
+        if job.get("batch_id"):
+            batches.setdefault(job["batch_id"], []).append(job_id)
+        if job["status"] == "completed" and job.get("started_at") and job.get("completed_at"):
+            recent_durations.append((job["completed_at"], (
+                datetime.fromisoformat(job["completed_at"])
+                - datetime.fromisoformat(job["started_at"])).total_seconds()
+                / job.get("num_takes", 1)))
+        leader_id = job.get("coalesced_with")
+        if leader_id is not None:
+            if job["status"] not in ("queued", "processing"):
+                continue
+            leader_id = promoted_leaders.get(leader_id, leader_id)
+            leader = job_statuses.get(leader_id)
+            if leader is not None and leader["status"] != "cancelled":
+                if job["coalesced_with"] != leader_id:
+                    job["coalesced_with"] = leader_id
+                    job_store.save(job_id, job)
+                job_followers.setdefault(leader_id, []).append(job_id)
+                continue
+            # 대표 작업이 취소되어 다시 실행되지 않으므로 이 요청을 새 대표 작업으로 되살리고,
+            # 같은 대표 작업에 합쳐져 있던 나머지 요청은 같은 생성을 반복하지 않도록 이 작업에 합친다
+            job["coalesced_with"] = None
+            job_store.save(job_id, job)
+            if request is not None:
+                promoted_leaders[leader_id] = job_id
+        if job["status"] in ("queued", "processing") and request is not None:
+            requeue.append((job_id, job, request))
+
+    for job_id, job, request in requeue:
+        if job["status"] == "processing":
+            retries = job.get("retries", 0) + 1
+            if retries > JOB_MAX_RETRIES:
+                update_job_status(job_id, status="failed",
+                                  error="서버 재시작으로 작업이 중단되었습니다. (재시도 횟수 초과)",
+                                  error_class="restart",
+                                  completed_at=datetime.now().isoformat())
+                logging.warning(f"작업 {job_id}: 재시도 횟수 초과로 실패 처리")
+                continue
+            update_job_status(job_id, status="queued", retries=retries,
+                              worker_id=None, progress=None, started_at=None)
+            logging.info(f"작업 {job_id}: 중단된 작업 재시도 예약 ({retries}회차)")
+
+        inflight_jobs[request["cache_key"]] = job_id
+        job_queue.put_nowait(
+            job_id,
+            (job_id, request["genre_txt"], request["lyrics_txt"], request["cache_key"]),
+            client_key=request.get("client_key", ""),
+            priority=request.get("priority", DEFAULT_PRIORITY))
+
+    # 재시작 전의 처리 시간 기록으로 예상 대기 시간 평균을 채워 둔다
+    for _, duration in sorted(recent_durations)[-JOB_DURATION_WINDOW:]:
+        job_durations.append(duration)
+    refresh_queue_estimates()
+
+    logging.info(
+        f"작업 저장소 복구: 전체 {len(job_statuses)}건, 다시 큐에 넣은 작업 {len(requeue)}건")
 
 
 @app.on_event("startup")
 async def startup_event():
-    """서버 시작 시 백그라운드 태스크 시작"""
+    """서버 시작 시 작업 복구, 추론 워커 풀과 스케줄러 태스크 시작"""
+    cleanup_stale_workspaces()
+    removed = remove_stale_temp_files(FINAL_MUSIC_DIR)
+    if removed:
+        logging.info(f"남아 있는 임시 파일 {removed}개 정리: {FINAL_MUSIC_DIR}")
+    job_store.start()
+    recover_jobs()
+    for worker in inference_workers:
+        await worker.start()
+        release_worker(worker)
     asyncio.create_task(process_music_generation_queue())
+    if PIPELINE_MODE == "split":
+        asyncio.create_task(process_stage2_queue())
+    asyncio.create_task(run_retention_sweeper())
 
 
-@app.post("/generate-music-async/", response_model=MusicGenerationResponse)
-async def generate_music_async(request: MusicGenerationRequest):
+@app.on_event("shutdown")
+async def shutdown_event():
+    """서버 종료 시 추론 워커 정리"""
+    await asyncio.gather(*(worker.stop() for worker in inference_workers))
+    job_store.close()
+    result_cache.flush()
+    stage1_cache.flush()
+
+
+def reject_request(status_code: int, reason: str, detail: str, retry_after: float):
+    admission_stats[f"rejected_{reason}"] += 1
+    retry_after = max(1, math.ceil(retry_after))
+    logging.warning(f"요청 거절({reason}): {detail} (Retry-After {retry_after}초)")
+    raise HTTPException(status_code=status_code, detail=detail,
+                        headers={"Retry-After": str(retry_after)})
+
+
+def normalize_deadline(deadline: Optional[datetime]) -> Optional[datetime]:
+    """시간대가 있는 마감 시각은 서버 로컬 시각(작업 기록과 같은 기준)으로 바꿉니다."""
+    if deadline is not None and deadline.tzinfo is not None:
+        deadline = deadline.astimezone().replace(tzinfo=None)
+    return deadline
+
+
+def admit_job(client_key: str, deadline: Optional[datetime], new_job_takes: List[int]):
     """
-    장르와 가사 텍스트를 기반으로 음악을 비동기적으로 생성합니다.
-    요청 ID를 즉시 반환하고 백그라운드에서 처리합니다.
+    새 작업들(각 작업의 테이크 수 목록)을 큐에 넣을 수 있는지 확인하고, 넘치면 Retry-After 와 함께 거절합니다.
+    전체 용량(대기 작업 수, 예상 대기 시간)을 넘으면 503, 한 클라이언트의 대기 작업이 너무 많으면 429 입니다.
+    대기 작업이 없는 클라이언트의 배치는 클라이언트당 상한보다 커도 받습니다 (배치 크기는 따로 제한).
+    job_lock 을 잡은 상태에서 호출해야 합니다.
     """
-    # 고유 작업 ID 생성
-    job_id = str(uuid.uuid4())
+    queue_size = job_queue.qsize()
+    count = len(new_job_takes)
+    start_waits = estimate_start_waits(queued_job_takes() + new_job_takes)
+    new_job_wait = start_waits[-1]
+
+    if MAX_QUEUE_DEPTH and queue_size + count > MAX_QUEUE_DEPTH:
+        # 앞의 작업들이 빠져 자리가 생길 때까지
+        reject_request(503, "queue_full",
+                       f"대기 중인 작업이 너무 많습니다. (최대 {MAX_QUEUE_DEPTH}개)",
+                       start_waits[min(queue_size, queue_size + count - MAX_QUEUE_DEPTH - 1)])
+
+    if MAX_ESTIMATED_WAIT_SECONDS and new_job_wait > MAX_ESTIMATED_WAIT_SECONDS:
+        # 예상 대기 시간이 상한 아래로 내려갈 때까지
+        reject_request(503, "wait",
+                       f"예상 대기 시간({round(new_job_wait)}초)이 "
+                       f"최대 대기 시간({MAX_ESTIMATED_WAIT_SECONDS}초)을 넘습니다.",
+                       new_job_wait - MAX_ESTIMATED_WAIT_SECONDS)
+
+    if MAX_QUEUED_PER_CLIENT:
+        client_waits = [
+            wait_seconds for job_id, wait_seconds in zip(job_queue.ordered_job_ids(), start_waits)
+            if job_statuses.get(job_id, {}).get("client_key") == client_key
+        ]
+        client_limit = max(MAX_QUEUED_PER_CLIENT, count)
+        if len(client_waits) + count > client_limit:
+            # 이 클라이언트의 작업이 상한 아래로 줄어들 때까지
+            reject_request(429, "client_limit",
+                           f"대기 중인 작업이 너무 많습니다. (클라이언트당 최대 {MAX_QUEUED_PER_CLIENT}개)",
+                           client_waits[len(client_waits) + count - client_limit - 1])
+
+    if deadline is not None:
+        finish_at = datetime.now() + timedelta(
+            seconds=new_job_wait + estimate_job_seconds(new_job_takes[-1]))
+        if finish_at > deadline:
+            # 지금 대기열로는 마감 시각 안에 끝낼 수 없다
+            reject_request(503, "deadline",
+                           f"마감 시각 안에 완료할 수 없습니다. (예상 완료 {finish_at.isoformat(timespec='seconds')})",
+                           (finish_at - deadline).total_seconds())
+
+    admission_stats["accepted"] += count
+
+
+def get_client_key(request: MusicGenerationRequest, http_request: Request) -> str:
+    """공정 큐에서 작업을 묶는 클라이언트 키"""
+    client_key = (request.client_id
+                  or http_request.headers.get("x-client-id")
+                  or (http_request.client.host if http_request.client else ""))
+    return client_key[:CLIENT_KEY_MAX_LENGTH]
+
+
+async def submit_music_jobs(requests: List[MusicGenerationRequest], http_request: Request,
+                            batch_id: Optional[str] = None) -> List[MusicGenerationResponse]:
+    """
+    생성 요청들을 작업으로 등록합니다 (비동기/동기/배치 엔드포인트 공통).
+    캐시 적중이면 바로 완료, 같은 요청이 진행 중이면 그 작업에 합치고,
+    아니면 공정 큐에 넣습니다. 새로 큐에 들어갈 작업 전체를 한 번에 수용 제어하므로
+    배치는 모두 수용되거나 모두 거절됩니다.
+    """
+    client_key = get_client_key(requests[0], http_request)
+    deadline = normalize_deadline(requests[0].deadline)
+    if deadline is not None and deadline <= datetime.now():
+        raise HTTPException(status_code=400, detail="마감 시각이 이미 지났습니다.")
+    deadline_text = deadline.isoformat() if deadline else None
+
+    prepared = []
+    for request in requests:
+        # 테이크 수가 다르면 결과물 구성이 다르므로 캐시 키에 포함한다 (1 이면 기존 키와 같음).
+        # simulate 백엔드의 결과물이 실제 모델 결과로 재사용되지 않도록 백엔드도 구분하고,
+        # MEMORIA_WORKER_EXTRA_ARGS(--run_n_segments, --sim-* 등)를 바꾸면 다른 결과로 본다.
+        infer_args = WORKER_INFER_ARGS + WORKER_EXTRA_ARGS + (
+            ["--num_takes", str(request.num_takes)] if request.num_takes > 1 else []) + (
+            ["--backend", WORKER_BACKEND] if WORKER_BACKEND != "yue" else [])
+        cache_key = compute_cache_key(
+            request.genre_txt, request.lyrics_txt,
+            [STAGE1_MODEL, STAGE2_MODEL], infer_args)
+        # 재시작 후 다시 큐에 넣을 수 있도록 원본 요청을 함께 저장한다
+        stored_request = {
+            "genre_txt": request.genre_txt,
+            "lyrics_txt": request.lyrics_txt,
+            "cache_key": cache_key,
+            "client_key": client_key,
+            "priority": request.priority,
+            "num_takes": request.num_takes
+        }
+        prepared.append((str(uuid.uuid4()), request, cache_key, stored_request))
 
-    # 작업 상태 추가
+    # 캐시 확인: 같은 요청의 결과가 있으면 바로 완료 처리 (파일 확인은 스레드에서 한 번에)
+    cached = await asyncio.to_thread(lambda: [
+        None if request.force_regenerate else result_cache.get(cache_key)
+        for _, request, cache_key, _ in prepared
+    ])
+    prepared = [entry + (cached_files,) for entry, cached_files in zip(prepared, cached)]
+
+    responses = []
     async with job_lock:
-        job_statuses[job_id] = {
-            "status": "queued",
-            "created_at": datetime.now().isoformat(),
-            "completed_at": None,
-            "file_path": None,
-            "error": None
-        }
+        # 새로 생성해야 하는 작업 수 (캐시 적중, 진행 중인 작업 또는 같은 배치의 앞 항목과 합쳐지는 요청 제외)
+        new_keys = set()
+        new_job_takes = []
+        for _, request, cache_key, _, cached_files in prepared:
+            if cached_files is not None:
+                continue
+            if not request.force_regenerate and (cache_key in inflight_jobs or cache_key in new_keys):
+                continue
+            new_keys.add(cache_key)
+            new_job_takes.append(request.num_takes)
+
+        # 용량을 넘으면 여기서 거절 (합쳐진 요청과 캐시 적중은 GPU 를 쓰지 않으므로 항상 수용)
+        if new_job_takes:
+            admit_job(client_key, deadline, new_job_takes)
+
+        for job_id, request, cache_key, stored_request, cached_files in prepared:
+            now = datetime.now().isoformat()
+            if cached_files is not None:
+                job_statuses[job_id] = {
+                    "status": "completed",
+                    "created_at": now,
+                    "completed_at": now,
+                    "file_path": cached_files[0],
+                    "take_files": cached_files,
+                    "num_takes": request.num_takes,
+                    "error": None,
+                    "worker_id": None,
+                    "cache_hit": True,
+                    "coalesced_with": None,
+                    "progress": None,
+                    "batch_id": batch_id
+                }
+                job_store.save(job_id, job_statuses[job_id], stored_request)
+                event_broker.mark_changed(job_id)
+                metric_requests.inc(outcome="cache_hit")
+                logging.info(f"작업 {job_id}: 캐시 적중 - {cached_files[0]}")
+                responses.append(MusicGenerationResponse(job_id=job_id, status="completed"))
+                continue
+
+            # 같은 요청이 이미 대기/처리 중이면 새로 큐에 넣지 않고 그 작업에 합친다
+            leader_id = None if request.force_regenerate else inflight_jobs.get(cache_key)
+            if leader_id is not None:
+                leader = job_statuses[leader_id]
+                job_statuses[job_id] = {
+                    **leader,
+                    "created_at": now,
+                    "coalesced_with": leader_id,
+                    "priority": request.priority,
+                    "client_key": client_key,
+                    "deadline": deadline_text,
+                    "batch_id": batch_id
+                }
+                job_followers.setdefault(leader_id, []).append(job_id)
+                job_store.save(job_id, job_statuses[job_id], stored_request)
+                event_broker.mark_changed(job_id)
+                metric_requests.inc(outcome="coalesced")
+                logging.info(f"작업 {job_id}: 진행 중인 작업 {leader_id}에 합쳐짐")
+                responses.append(MusicGenerationResponse(job_id=job_id, status=leader["status"]))
+                continue
+
+            # 작업 상태 추가
+            job_statuses[job_id] = {
+                "status": "queued",
+                "created_at": now,
+                "completed_at": None,
+                "file_path": None,
+                "error": None,
+                "worker_id": None,
+                "cache_hit": False,
+                "coalesced_with": None,
+                "progress": None,
+                "retries": 0,
+                "num_takes": request.num_takes,
+                "priority": request.priority,
+                "client_key": client_key,
+                "deadline": deadline_text,
+                "batch_id": batch_id,
+                "queue_position": None,
+                "estimated_wait_seconds": None,
+                "eta": None
+            }
+            inflight_jobs[cache_key] = job_id
+            job_store.save(job_id, job_statuses[job_id], stored_request)
+            event_broker.mark_changed(job_id)
+
+            metric_requests.inc(outcome="queued")
+            # 작업 큐에 추가
+            job_queue.put_nowait(
+                job_id,
+                (job_id, request.genre_txt, request.lyrics_txt, cache_key),
+                client_key=client_key,
+                priority=request.priority)
+            responses.append(MusicGenerationResponse(job_id=job_id, status="queued"))
+
+        if new_job_takes:
+            # 순번/예상 대기 시간 계산
+            refresh_queue_estimates()
+        if batch_id is not None:
+            batches[batch_id] = [response.job_id for response in responses]
+
+    return responses
+
+
+async def submit_music_job(request: MusicGenerationRequest,
+                           http_request: Request) -> MusicGenerationResponse:
+    """생성 요청 하나를 작업으로 등록합니다."""
+    return (await submit_music_jobs([request], http_request))[0]
 
-    # 작업 큐에 추가
-    await job_queue.put((job_id, request.genre_txt, request.lyrics_txt))
 
-    # 작업 ID 반환
-    return MusicGenerationResponse(job_id=job_id, status="queued")
+@app.post("/generate-music-async/", response_model=MusicGenerationResponse)
+async def generate_music_async(request: MusicGenerationRequest, http_request: Request):
+    """
+    장르와 가사 텍스트를 기반으로 음악을 비동기적으로 생성합니다.
+    요청 ID를 즉시 반환하고 백그라운드에서 처리합니다.
+    """
+    return await submit_music_job(request, http_request)
 
 
 @app.post("/generate-music-sync/")
-def generate_music_sync(request: MusicGenerationRequest):
+async def generate_music_sync(request: MusicGenerationRequest, http_request: Request):
     """
     장르와 가사 텍스트를 기반으로 음악을 동기적으로 생성하고 MP3 파일을 반환합니다.
-    이미 음악 생성 중이라면 429 오류를 반환합니다.
+    비동기 요청과 같은 큐/워커에서 처리되며, 완료될 때까지 응답을 기다립니다.
+    용량을 넘으면 비동기 요청과 같은 기준으로 429/503 오류를 반환합니다.
     """
-    global is_generating_music
-
-    # 현재 음악 생성 중인지 확인
-    if not generation_lock.acquire(blocking=False):
+    submitted = await submit_music_job(request, http_request)
+    job_id = submitted.job_id
+    logging.info(f"작업 {job_id}: 동기 요청 - 완료 대기")
+
+    job_status = await wait_for_job(job_id)
+    if job_status["status"] == "cancelled":
+        raise HTTPException(status_code=409, detail="작업이 취소되었습니다.",
+                            headers={"X-Job-Id": job_id})
+    if job_status["status"] == "failed":
         raise HTTPException(
-            status_code=429,
-            detail="현재 다른 음악 생성 요청이 처리 중입니다. 잠시 후 다시 시도해주세요."
+            status_code=500,
+            detail=f"음악 생성 중 오류 발생: {job_status['error']}",
+            headers={"X-Job-Id": job_id}
         )
 
-    try:
-        is_generating_music = True
+    file_path = job_status["file_path"]
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=500, detail="생성된 음악 파일을 찾을 수 없습니다.",
+                            headers={"X-Job-Id": job_id})
 
-        # 임시 파일 생성
-        genre_file = None
-        lyrics_file = None
+    # 파일 응답 반환
+    return observe_file_response(
+        MusicFileResponse(file_path, filename=f"{job_id}.mp3", headers={"X-Job-Id": job_id}), "sync")
 
-        try:
-            # 장르와 가사를 로컬 파일로 저장
-            with open(GENRE_FILE_PATH, "w", encoding="utf-8") as f:
-                f.write(request.genre_txt)
-            with open(LYRICS_FILE_PATH, "w", encoding="utf-8") as f:
-                f.write(request.lyrics_txt)
-
-            # infer.py 스크립트 실행 명령어 구성
-            cmd = [
-                "python",
-                YUE_INFER_SCRIPT,
-                "--stage1_use_exl2",
-                "--stage2_use_exl2",
-                "--stage2_cache_size", "32768",
-                "--genre_txt", GENRE_FILE_PATH,  # 로컬 파일 경로 사용
-                "--lyrics_txt", LYRICS_FILE_PATH,  # 로컬 파일 경로 사용
-                "--stage1_model", STAGE1_MODEL,
-                "--stage2_model", STAGE2_MODEL
-            ]
-
-            # 스크립트 실행
-            result = subprocess.run(
-                cmd,
-                stdout=None,
-                stderr=None,
-                text=True,
-                check=False,
-                cwd=PARENT_DIR  # main.py 기준 상위 디렉토리를 작업 디렉토리로 설정
-            )
 
-            # 실행 결과 확인
-            if result.returncode != 0:
-                error_msg = "음악 생성 실패: 콘솔 출력을 확인해주세요."
-                raise HTTPException(status_code=500, detail=error_msg)
+@app.post("/generate-music-batch/", response_model=MusicBatchResponse)
+async def generate_music_batch(request: MusicBatchRequest, http_request: Request):
+    """
+    여러 장르/가사 쌍을 한 번에 등록합니다. 배치 ID 와 항목 순서대로의 작업 ID 를 즉시 반환합니다.
+    항목들은 모델이 이미 올라가 있는 워커 풀에서 나뉘어 처리되며,
+    수용 제어는 배치 전체 단위로 적용됩니다 (모두 수용되거나 모두 거절).
+    """
+    batch_id = str(uuid.uuid4())
+    responses = await submit_music_jobs([
+        MusicGenerationRequest(
+            genre_txt=item.genre_txt,
+            lyrics_txt=item.lyrics_txt,
+            force_regenerate=request.force_regenerate,
+            priority=request.priority,
+            client_id=request.client_id,
+            deadline=request.deadline,
+            num_takes=request.num_takes)
+        for item in request.items
+    ], http_request, batch_id=batch_id)
+    logging.info(f"배치 {batch_id}: {len(responses)}곡 등록")
+    return MusicBatchResponse(
+        batch_id=batch_id,
+        job_ids=[response.job_id for response in responses],
+        statuses=[response.status for response in responses])
+
+
+@app.get("/batches/{batch_id}")
+async def get_batch_status(batch_id: str):
+    """배치에 속한 작업들의 상태별 개수, 전체 진행률, 예상 완료 시각을 반환합니다."""
+    job_ids = [job_id for job_id in batches.get(batch_id, []) if job_id in job_statuses]
+    if not job_ids:
+        raise HTTPException(status_code=404, detail="해당 배치를 찾을 수 없습니다.")
+
+    counts: Dict[str, int] = {}
+    etas = []
+    jobs = []
+    for job_id in job_ids:
+        job = job_statuses[job_id]
+        counts[job["status"]] = counts.get(job["status"], 0) + 1
+        if job["status"] == "queued" and job.get("eta"):
+            etas.append(job["eta"])
+        elif job["status"] == "processing" and job.get("started_at"):
+            etas.append(estimate_eta(datetime.fromisoformat(job["started_at"]), 0,
+                                     job.get("num_takes", 1)))
+        jobs.append({
+            "job_id": job_id,
+            "status": job["status"],
+            "progress": job.get("progress"),
+            "queue_position": job.get("queue_position"),
+            "eta": job.get("eta"),
+            "error": job.get("error")
+        })
+
+    done = sum(counts.get(status, 0) for status in TERMINAL_STATUSES)
+    return {
+        "batch_id": batch_id,
+        "total": len(job_ids),
+        "done": done,
+        "counts": counts,
+        "progress": round(sum(estimate_job_fraction(job_statuses[job_id])
+                              for job_id in job_ids) / len(job_ids), 4),
+        # 남은 작업 중 가장 늦게 끝날 것으로 예상되는 시각 (모두 끝났으면 null)
+        "eta": max(etas) if etas else None,
+        "jobs": jobs
+    }
 
-            # 생성된 MP3 파일 경로
-            output_file_path = os.path.join(
-                DEFAULT_OUTPUT_DIR, DEFAULT_OUTPUT_FILENAME)
 
-            # 파일이 존재하는지 확인
-            if not os.path.exists(output_file_path):
-                raise HTTPException(
-                    status_code=500, detail="생성된 음악 파일을 찾을 수 없습니다.")
+@app.get("/job-status/{job_id}")
+async def get_job_status(job_id: str):
+    """특정 작업 ID의 상태를 반환합니다."""
+    if job_id not in job_statuses:
+        raise HTTPException(status_code=404, detail="해당 작업을 찾을 수 없습니다.")
 
-            # 고유 ID 생성
-            unique_id = str(uuid.uuid4())
-            final_file_name = f"{unique_id}.mp3"
-            final_file_path = os.path.join(FINAL_MUSIC_DIR, final_file_name)
+    return job_statuses[job_id]
 
-            # 파일 이동
-            shutil.copy2(output_file_path, final_file_path)
 
-            # 파일 응답 반환
-            return FileResponse(
-                path=final_file_path,
-                filename=final_file_name,
-                media_type="audio/mpeg"
+@app.delete("/jobs/{job_id}")
+async def delete_job(job_id: str):
+    """
+    대기 중이거나 처리 중인 작업을 취소합니다.
+    처리 중인 작업은 워커 프로세스 그룹을 강제 종료해 GPU 를 바로 다음 작업에 넘깁니다.
+    """
+    async with job_lock:
+        if job_id not in job_statuses:
+            raise HTTPException(status_code=404, detail="해당 작업을 찾을 수 없습니다.")
+        status = job_statuses[job_id]["status"]
+        if status in TERMINAL_STATUSES:
+            raise HTTPException(
+                status_code=409,
+                detail=f"이미 끝난 작업은 취소할 수 없습니다. 현재 상태: {status}"
             )
+        previous_status = cancel_job(job_id)
 
-        except Exception as e:
-            # 예외 처리
-            raise HTTPException(
-                status_code=500, detail=f"음악 생성 중 오류 발생: {str(e)}")
+    return {"job_id": job_id, "status": "cancelled", "previous_status": previous_status}
 
-        finally:
-            # 임시 파일 정리 로직 제거 (로컬 파일 사용)
-            pass
 
-    finally:
-        # 처리 완료 후 상태 업데이트 및 락 해제
-        is_generating_music = False
-        generation_lock.release()
+@app.get("/jobs/{job_id}/logs")
+async def get_job_logs(job_id: str, tail: int = 100):
+    """작업의 최근 모델 출력(최대 JOB_LOG_MAX_LINES 줄)을 반환합니다."""
+    if job_id not in job_statuses:
+        raise HTTPException(status_code=404, detail="해당 작업을 찾을 수 없습니다.")
 
+    # 합쳐진 작업은 실제로 실행된 대표 작업의 로그를 보여준다
+    source_job_id = job_statuses[job_id].get("coalesced_with") or job_id
+    lines = list(job_logs.get(source_job_id, ()))
+    tail = max(0, min(tail, JOB_LOG_MAX_LINES))
+    return {
+        "job_id": job_id,
+        "source_job_id": source_job_id,
+        "status": job_statuses[job_id]["status"],
+        "progress": job_statuses[job_id].get("progress"),
+        "lines": lines[-tail:] if tail else []
+    }
 
-@app.get("/job-status/{job_id}")
-async def get_job_status(job_id: str):
-    """특정 작업 ID의 상태를 반환합니다."""
+
+@app.get("/jobs/{job_id}/trace")
+async def get_job_trace(job_id: str):
+    """
+    작업의 단계별 실행 구간을 Chrome trace / Perfetto 형식 JSON 으로 반환합니다.
+    합쳐진 작업은 실제로 실행된 대표 작업의 추적을 보여줍니다.
+    """
     if job_id not in job_statuses:
         raise HTTPException(status_code=404, detail="해당 작업을 찾을 수 없습니다.")
 
-    return job_statuses[job_id]
+    source_job_id = job_statuses[job_id].get("coalesced_with") or job_id
+    trace = trace_store.get(source_job_id)
+    if trace is None:
+        # 캐시 적중, 아직 시작 전, 또는 보관 개수를 넘었거나 서버 재시작 전의 작업
+        raise HTTPException(status_code=404, detail="이 작업의 추적 정보가 없습니다.")
+    return trace.to_chrome_trace()
 
 
-@app.get("/events")
-async def sse_events():
-    """SSE를 통해 음악 생성 작업 상태 업데이트를 스트리밍합니다."""
-    async def event_generator():
+@app.get("/traces/slowest")
+async def get_slowest_traces(limit: int = Query(TRACE_SLOWEST_SIZE, ge=1)):
+    """최근 끝난 작업 중 전체 소요 시간이 가장 길었던 작업들의 단계별 시간 요약"""
+    return {
+        **trace_store.stats(),
+        "jobs": trace_store.slowest(limit)
+    }
+
+
+async def stream_job_events(request: Request, job_id: Optional[str] = None):
+    """
+    구독자 하나의 SSE 이벤트 스트림.
+    각 이벤트는 바뀐 작업만 담고 단조 증가하는 id 를 가지므로,
+    재접속 시 Last-Event-ID 헤더로 놓친 이벤트부터 이어 받을 수 있습니다.
+    """
+    last_event_id = parse_last_event_id(request.headers.get("last-event-id"))
+    subscriber = event_broker.subscribe(job_id, last_event_id)
+    try:
         while True:
-            # 이벤트 대기 또는 주기적인 신호 전송
             try:
-                # 20초 타임아웃 설정
-                await asyncio.wait_for(job_update_event.wait(), timeout=20.0)
+                event = await asyncio.wait_for(
+                    subscriber.queue.get(), timeout=SSE_KEEP_ALIVE_SECONDS)
             except asyncio.TimeoutError:
                 # 타임아웃 발생 시 keep-alive 신호 전송
                 yield {
                     "event": "keep_alive",
                     "data": "ping"
                 }
-                continue  # 다음 루프 실행
+                continue
+
+            if event is None:
+                # 클라이언트가 이벤트를 따라오지 못함: 연결을 끊고 Last-Event-ID 로 재접속하게 한다
+                logging.warning("SSE 구독자 큐가 가득 차 연결을 종료합니다.")
+                break
+
+            yield {
+                "id": str(event.id),
+                "event": event.kind,
+                "data": event.data_for(job_id)
+            }
+    finally:
+        event_broker.unsubscribe(subscriber)
 
-            # 현재 상태 정보
-            async with job_lock:
-                # 이벤트 초기화
-                job_update_event.clear()
 
-                # 모든 작업 상태 전송
-                yield {
-                    "event": "job_update",
-                    "data": json.dumps({
-                        "active_job": active_job,
-                        "jobs": job_statuses
-                    })
-                }
+@app.get("/events")
+async def sse_events(request: Request):
+    """SSE를 통해 음악 생성 작업 상태 업데이트(변경된 작업만)를 스트리밍합니다."""
+    return EventSourceResponse(stream_job_events(request))
+
+
+@app.get("/events/{job_id}")
+async def sse_job_events(job_id: str, request: Request):
+    """SSE를 통해 특정 작업의 상태 업데이트만 스트리밍합니다."""
+    if job_id not in job_statuses:
+        raise HTTPException(status_code=404, detail="해당 작업을 찾을 수 없습니다.")
+
+    return EventSourceResponse(stream_job_events(request, job_id))
+
 
-            # 짧은 대기 시간 추가
-            await asyncio.sleep(0.1)
+def observe_file_response(response: MusicFileResponse, endpoint: str) -> MusicFileResponse:
+    """파일 응답을 다 보낸 뒤 전송 시간과 바이트 수를 메트릭에 기록하도록 합니다."""
+    started = time.perf_counter()
 
-    return EventSourceResponse(event_generator())
+    def record():
+        metric_download_duration.observe(
+            time.perf_counter() - started, endpoint=endpoint, status=str(response.status_code))
+        metric_download_bytes.inc(response.bytes_sent, endpoint=endpoint)
 
+    response.background = BackgroundTask(record)
+    return response
 
-@app.get("/music/download/{job_id}")
-async def download_music(job_id: str):
-    """생성된 음악 파일을 다운로드합니다."""
+
+@app.api_route("/music/download/{job_id}", methods=["GET", "HEAD"])
+async def download_music(job_id: str, take: int = Query(1, ge=1, description="여러 테이크 작업의 테이크 번호"),
+                         start: Optional[float] = Query(None, ge=0, description="구간 시작 위치(초)"),
+                         duration: Optional[float] = Query(None, gt=0, description="구간 길이(초)")):
+    """
+    생성된 음악 파일을 다운로드합니다.
+    Range 요청(206), If-None-Match 조건부 요청(304), HEAD 를 지원합니다.
+    start/duration 을 주면 MP3 프레임 경계에서 잘라낸 구간(미리듣기 등)만 반환합니다.
+    """
     if job_id not in job_statuses:
         raise HTTPException(status_code=404, detail="해당 작업을 찾을 수 없습니다.")
 
@@ -384,15 +2334,103 @@ async def download_music(job_id: str):
             detail=f"다운로드할 수 없습니다. 현재 상태: {job_status['status']}"
         )
 
-    file_path = job_status["file_path"]
+    take_files = job_result_files(job_status)
+    if take > len(take_files):
+        raise HTTPException(status_code=404, detail="해당 테이크를 찾을 수 없습니다.")
+    file_path = take_files[take - 1]
 
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="음악 파일을 찾을 수 없습니다.")
 
-    return FileResponse(
-        path=file_path,
-        filename=f"{job_id}.mp3",
-        media_type="audio/mpeg"
+    filename = f"{job_id}.mp3" if take == 1 else f"{job_id}_take{take}.mp3"
+    if start is None and duration is None:
+        return observe_file_response(MusicFileResponse(file_path, filename=filename), "download")
+
+    # 구간 다운로드: 프레임 인덱스(완료 시 생성, 재시작 후에는 첫 요청 때 생성)로 바이트 범위만 찾는다
+    try:
+        index = await asyncio.to_thread(mp3_index_cache.get, file_path)
+        offset, length, clip_start, clip_duration = index.clip(start or 0.0, duration)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    clip_name = f"{filename[:-len('.mp3')]}_{clip_start:g}-{clip_start + clip_duration:g}s.mp3"
+    return observe_file_response(MusicFileResponse(
+        file_path, filename=clip_name, window=(offset, length),
+        headers={"X-Clip-Start": f"{clip_start:g}", "X-Clip-Duration": f"{clip_duration:g}"}), "clip")
+
+
+async def iterate_audio_stream(request: Request, stream: AudioStream, job_id: str):
+    """
+    세그먼트가 도착하는 대로 이어서 보내고, 작업이 끝나면 응답을 마칩니다.
+    세그먼트를 하나도 보내지 않은 채 작업이 완료되면(세그먼트를 내보내지 않는 백엔드) 최종 파일을 보냅니다.
+    """
+    connected_at = time.monotonic()
+    sent_segments = 0
+    stream.listeners += 1
+    try:
+        while True:
+            while sent_segments < len(stream.segments):
+                if sent_segments == 0:
+                    logging.info(
+                        f"작업 {job_id}: 스트림 첫 오디오 전송 "
+                        f"(연결 후 {time.monotonic() - connected_at:.3f}초)")
+                metric_download_bytes.inc(len(stream.segments[sent_segments]), endpoint="stream")
+                yield stream.segments[sent_segments]
+                sent_segments += 1
+
+            if stream.finished:
+                break
+            await stream.wait_for_more(sent_segments, STREAM_POLL_SECONDS)
+            if await request.is_disconnected():
+                return
+
+        job_status = job_statuses.get(job_id)
+        if sent_segments == 0 and job_status is not None and job_status["status"] == "completed":
+            with open(job_status["file_path"], "rb") as f:
+                while True:
+                    chunk = await asyncio.to_thread(f.read, 256 * 1024)
+                    if not chunk:
+                        break
+                    metric_download_bytes.inc(len(chunk), endpoint="stream")
+                    yield chunk
+    finally:
+        stream.listeners -= 1
+        if stream.finished and stream.listeners == 0:
+            audio_streams.pop(stream.job_id, None)
+
+
+@app.get("/music/stream/{job_id}")
+async def stream_music(job_id: str, request: Request):
+    """
+    생성 중인 음악을 stage2 세그먼트 단위로 스트리밍합니다.
+    대기 중인 작업이면 처리가 시작되어 첫 세그먼트가 나올 때까지 기다리고,
+    이미 완료된 작업이면 최종 파일을 그대로 보냅니다.
+    세그먼트 오디오를 내보내지 않는 백엔드(yue)는 완료 시 최종 파일만 보내므로 점진적이지 않습니다.
+    """
+    if job_id not in job_statuses:
+        raise HTTPException(status_code=404, detail="해당 작업을 찾을 수 없습니다.")
+
+    job_status = job_statuses[job_id]
+    if job_status["status"] in ("failed", "cancelled"):
+        raise HTTPException(
+            status_code=400,
+            detail=f"스트리밍할 수 없습니다. 현재 상태: {job_status['status']}"
+        )
+
+    # 합쳐진 요청은 대표 작업의 스트림을 함께 듣는다
+    source_job_id = job_status.get("coalesced_with") or job_id
+    stream = audio_streams.get(source_job_id)
+    if stream is None and job_status["status"] == "completed":
+        file_path = job_status["file_path"]
+        if not os.path.exists(file_path):
+            raise HTTPException(status_code=404, detail="음악 파일을 찾을 수 없습니다.")
+        return MusicFileResponse(file_path, filename=f"{job_id}.mp3")
+    if stream is None:
+        stream = get_audio_stream(source_job_id)
+
+    return StreamingResponse(
+        iterate_audio_stream(request, stream, job_id),
+        media_type="audio/mpeg",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"}
     )
 
 
@@ -400,16 +2438,147 @@ async def download_music(job_id: str):
 def get_status():
     """현재 API 서버의 상태를 반환합니다."""
     return {
-        "active_job": active_job,
+        "active_jobs": get_active_jobs(),
         "queue_size": job_queue.qsize() if hasattr(job_queue, 'qsize') else "unknown",
-        "job_count": len(job_statuses)
+        "queue": {
+            **job_queue.stats(),
+            "estimated_job_seconds": round(estimate_job_seconds(), 1)
+        },
+        "admission": {
+            "max_queue_depth": MAX_QUEUE_DEPTH,
+            "max_estimated_wait_seconds": MAX_ESTIMATED_WAIT_SECONDS,
+            "max_queued_per_client": MAX_QUEUED_PER_CLIENT,
+            **admission_stats
+        },
+        "job_count": len(job_statuses),
+        "workers": [worker.describe() for worker in inference_workers],
+        "pipeline": describe_pipeline(),
+        "result_cache": result_cache.stats(),
+        "stage1_cache": stage1_cache.stats(),
+        "mp3_index": mp3_index_cache.stats(),
+        "sse": event_broker.stats(),
+        "streaming": {
+            # 세그먼트 오디오를 내보내는(stage2 를 실행하는) 워커가 있어야 완료 전에 오디오가 나온다
+            "progressive": any(worker.segment_audio for worker in inference_workers
+                               if worker.role != "stage1"),
+            "active_streams": len(audio_streams),
+            "listeners": sum(stream.listeners for stream in audio_streams.values()),
+            "time_to_first_audio": summarize_seconds(list(first_audio_latencies))
+        },
+        "takes": {
+            "max_takes": MAX_TAKES,
+            **summarize_take_costs()
+        },
+        "job_store": job_store.stats(),
+        "retention": {
+            "retention_seconds": JOB_RETENTION_SECONDS,
+            "music_dir_max_bytes": MUSIC_DIR_MAX_BYTES,
+            **retention_stats
+        }
     }
 
 
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus 텍스트 형식 메트릭. 현재 상태 값(게이지)은 scrape 시점에 채웁니다."""
+    for priority, count in job_queue.stats()["by_priority"].items():
+        metric_queue_depth.set(count, priority=priority)
+
+    metric_jobs.clear()
+    job_counts: Dict[str, int] = {}
+    for job in list(job_statuses.values()):
+        job_counts[job["status"]] = job_counts.get(job["status"], 0) + 1
+    for status, count in job_counts.items():
+        metric_jobs.set(count, status=status)
+
+    metric_workers.clear()
+    worker_states: Dict[str, int] = {}
+    for worker in inference_workers:
+        worker_states[worker.state] = worker_states.get(worker.state, 0) + 1
+        metric_worker_recycles.set(worker.recycles, worker=str(worker.worker_id))
+    for state, count in worker_states.items():
+        metric_workers.set(count, state=state)
+    metric_estimated_job_seconds.set(estimate_job_seconds())
+
+    for stage, stage_stats in describe_pipeline()["stages"].items():
+        metric_pipeline_queue_depth.set(stage_stats["queued"], stage=stage)
+
+    for result, count in admission_stats.items():
+        metric_admission.set(count, result=result)
+
+    cache_stats = result_cache.stats()
+    metric_cache_lookups.set(cache_stats["hits"], result="hit")
+    metric_cache_lookups.set(cache_stats["misses"], result="miss")
+    metric_cache_evictions.set(cache_stats["evictions"])
+    metric_cache_hit_ratio.set(cache_stats["hit_rate"] or 0)
+    metric_cache_bytes.set(cache_stats["total_bytes"])
+
+    stage1_stats = stage1_cache.stats()
+    metric_stage1_cache_lookups.set(stage1_stats["hits"], result="hit")
+    metric_stage1_cache_lookups.set(stage1_stats["misses"], result="miss")
+    metric_stage1_cache_seconds_saved.set(stage1_cache.seconds_saved)
+    metric_stage1_cache_bytes.set(stage1_stats["total_bytes"])
+
+    sse_stats = event_broker.stats()
+    metric_sse_subscribers.set(sse_stats["subscribers"])
+    metric_sse_events.set(sse_stats["events_published"])
+    metric_stream_listeners.set(sum(stream.listeners for stream in audio_streams.values()))
+
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+def encode_jobs_cursor(created_at: str, job_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{created_at}|{job_id}".encode("utf-8")).decode("ascii")
+
+
+def decode_jobs_cursor(cursor: str):
+    try:
+        created_at, job_id = base64.urlsafe_b64decode(
+            cursor.encode("ascii")).decode("utf-8").split("|", 1)
+        return created_at, job_id
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="잘못된 cursor 값입니다.")
+
+
+def validate_iso_datetime(value: Optional[str], name: str) -> Optional[str]:
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail=f"{name} 는 ISO 8601 형식이어야 합니다.")
+
+
 @app.get("/jobs")
-async def list_jobs():
-    """모든 작업 목록을 반환합니다."""
-    return job_statuses
+async def list_jobs(
+    status: Optional[str] = Query(None, description="쉼표로 구분한 상태 목록 (예: queued,processing)"),
+    created_after: Optional[str] = Query(None, description="이 시각 이후 생성된 작업 (ISO 8601)"),
+    created_before: Optional[str] = Query(None, description="이 시각 이전 생성된 작업 (ISO 8601)"),
+    cursor: Optional[str] = Query(None, description="이전 응답의 next_cursor"),
+    limit: int = Query(JOBS_PAGE_DEFAULT_LIMIT, ge=1, le=JOBS_PAGE_MAX_LIMIT)
+):
+    """작업 목록을 최신순으로 페이지 단위로 반환합니다."""
+    statuses = [item.strip() for item in status.split(",") if item.strip()] if status else None
+    rows = await asyncio.to_thread(
+        job_store.query,
+        statuses=statuses,
+        created_after=validate_iso_datetime(created_after, "created_after"),
+        created_before=validate_iso_datetime(created_before, "created_before"),
+        cursor=decode_jobs_cursor(cursor) if cursor else None,
+        limit=limit
+    )
+
+    next_cursor = None
+    if len(rows) == limit:
+        last_job_id, last_job = rows[-1]
+        next_cursor = encode_jobs_cursor(last_job["created_at"], last_job_id)
+
+    return {
+        "jobs": [{"job_id": job_id, **job} for job_id, job in rows],
+        "count": len(rows),
+        "next_cursor": next_cursor
+    }
 
 
 if __name__ == "__main__":
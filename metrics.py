@@ -0,0 +1,183 @@
+"""
+Prometheus 텍스트 형식 메트릭
+
+외부 의존성 없이 카운터/게이지/히스토그램을 모아 /metrics 에서
+Prometheus 텍스트 노출 형식(text/plain; version=0.0.4)으로 내보냅니다.
+
+    registry = MetricsRegistry()
+    jobs = registry.counter("memoria_jobs_finished_total", "끝난 작업 수", ["status"])
+    jobs.inc(status="completed")
+    print(registry.render())
+
+다른 모듈이 이미 누적하고 있는 값(캐시 적중 수 등)은 scrape 시점에 set() 으로 옮겨 담습니다.
+"""
+import math
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 초 단위 히스토그램 기본 구간 (짧은 HTTP 응답부터 수 시간 대기까지)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DURATION_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200, 14400)
+
+LabelValues = Tuple[str, ...]
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{escape_label_value(str(value))}"'
+                     for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Metric:
+    """레이블 조합별 값을 보관하는 메트릭의 공통 부분"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: 레이블이 맞지 않습니다. {sorted(labels)} != {list(self.labelnames)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """단조 증가 카운터"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError(f"{self.name}: 카운터는 줄어들 수 없습니다.")
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, value: float, **labels):
+        """다른 곳에서 누적 중인 카운터 값을 그대로 옮겨 담습니다."""
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{format_labels(self.labelnames, key)} {format_value(value)}"
+                for key, value in values]
+
+
+class Gauge(Counter):
+    """현재 값 게이지 (scrape 시점에 set 으로 갱신)"""
+
+    type_name = "gauge"
+
+    def clear(self):
+        """레이블 조합이 사라질 수 있는 게이지(상태별 개수 등)를 다시 채우기 전에 비웁니다."""
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(Metric):
+    """누적 구간 히스토그램 (_bucket / _sum / _count)"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # 레이블 조합 -> (구간별 개수, 합계, 전체 개수)
+        self._values: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for index, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    counts[index] += 1
+                    break
+            self._values[key] = (counts, total + value, count + 1)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total, count))
+                            for key, (counts, total, count) in self._values.items())
+        lines = []
+        bucket_labelnames = self.labelnames + ("le",)
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for upper_bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = format_labels(bucket_labelnames, key + (format_value(upper_bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """메트릭 등록과 텍스트 형식 출력"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"이미 등록된 메트릭입니다: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Optional[Sequence[float]] = None) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames,
+                                        buckets or LATENCY_BUCKETS))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,248 @@
+"""
+MP3 프레임 인덱스
+
+완성된 MP3 를 한 번 훑어 각 오디오 프레임의 바이트 위치를 기록해 두면, 시간(초)으로 지정한
+구간을 디코딩/재인코딩 없이 프레임 경계에서 잘라낸 바이트 범위로 바로 찾을 수 있습니다.
+MPEG 오디오 프레임은 각자 헤더를 가진 독립적인 단위라 연속된 프레임만 잘라 보내도 재생 가능한
+MP3 가 되며, 구간 계산은 곡 길이와 상관없이 인덱스 조회 한 번이면 끝납니다.
+
+- 앞쪽 ID3v2 태그와 뒤쪽 ID3v1 태그는 건너뜁니다.
+- 첫 프레임이 Xing/Info/VBRI 헤더(전체 곡 길이 정보)면 오디오 프레임에서 제외합니다.
+  잘라낸 구간에 들어가면 플레이어가 곡 전체 길이로 오인하기 때문입니다.
+- Layer III 의 비트 저장소 때문에 구간 첫 프레임 하나는 디코더가 건너뛸 수 있습니다(약 26ms).
+
+인덱스는 프레임당 4바이트(array "I")라 5분 곡이 약 46KB 입니다.
+"""
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# 버전 비트 -> 이름 (01 은 예약)
+MPEG_VERSIONS = {0b00: "2.5", 0b10: "2", 0b11: "1"}
+# 레이어 비트 -> 레이어 번호 (00 은 예약)
+MPEG_LAYERS = {0b11: 1, 0b10: 2, 0b01: 3}
+
+# (MPEG1 여부, 레이어) -> 비트레이트 색인별 kbps (0 = free format, 15 = 잘못된 값)
+BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+SAMPLE_RATES = {
+    "1": (44100, 48000, 32000),
+    "2": (22050, 24000, 16000),
+    "2.5": (11025, 12000, 8000),
+}
+
+
+class FrameHeader:
+    """MPEG 오디오 프레임 헤더 4바이트를 해석한 결과"""
+
+    __slots__ = ("version", "layer", "sample_rate", "samples", "length", "crc", "mono")
+
+    def __init__(self, version: str, layer: int, sample_rate: int, samples: int,
+                 length: int, crc: bool, mono: bool):
+        self.version = version
+        self.layer = layer
+        self.sample_rate = sample_rate
+        self.samples = samples
+        self.length = length
+        self.crc = crc
+        self.mono = mono
+
+
+def parse_frame_header(data: bytes, offset: int) -> Optional[FrameHeader]:
+    """offset 위치의 프레임 헤더를 해석합니다. 프레임 헤더가 아니면 None."""
+    if offset + 4 > len(data) or data[offset] != 0xFF or data[offset + 1] & 0xE0 != 0xE0:
+        return None
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    version = MPEG_VERSIONS.get((b1 >> 3) & 0b11)
+    layer = MPEG_LAYERS.get((b1 >> 1) & 0b11)
+    bitrate_index = b2 >> 4
+    sample_rate_index = (b2 >> 2) & 0b11
+    # free format 은 프레임 길이를 헤더만으로 알 수 없으므로 지원하지 않는다
+    if version is None or layer is None or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    mpeg1 = version == "1"
+    bitrate = BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version][sample_rate_index]
+    padding = (b2 >> 1) & 1
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if mpeg1 or layer == 2 else 576
+        length = samples // 8 * bitrate // sample_rate + padding
+    return FrameHeader(version, layer, sample_rate, samples, length,
+                       crc=not (b1 & 1), mono=(b3 >> 6) == 0b11)
+
+
+def is_vbr_info_frame(data: bytes, offset: int, header: FrameHeader) -> bool:
+    """Xing/Info(LAME) 또는 VBRI(Fraunhofer) 정보 프레임인지 확인합니다."""
+    if header.layer != 3:
+        return False
+    if header.version == "1":
+        side_info = 17 if header.mono else 32
+    else:
+        side_info = 9 if header.mono else 17
+    xing_offset = offset + 4 + (2 if header.crc else 0) + side_info
+    if data[xing_offset:xing_offset + 4] in (b"Xing", b"Info"):
+        return True
+    return data[offset + 36:offset + 40] == b"VBRI"
+
+
+def id3v2_size(data: bytes) -> int:
+    """파일 앞 ID3v2 태그의 전체 크기 (없으면 0)"""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = 0
+    for byte in data[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+class Mp3Index:
+    """오디오 프레임 시작 위치 목록과 스트림 정보"""
+
+    def __init__(self, offsets: array, audio_end: int, sample_rate: int, samples_per_frame: int):
+        self.offsets = offsets
+        self.audio_end = audio_end
+        self.sample_rate = sample_rate
+        self.samples_per_frame = samples_per_frame
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.offsets)
+
+    @property
+    def frame_seconds(self) -> float:
+        return self.samples_per_frame / self.sample_rate
+
+    @property
+    def duration(self) -> float:
+        return self.frame_count * self.frame_seconds
+
+    def frame_end(self, frame: int) -> int:
+        """frame 번째 프레임이 끝나는(다음 프레임이 시작하는) 바이트 위치"""
+        return self.offsets[frame + 1] if frame + 1 < self.frame_count else self.audio_end
+
+    def clip(self, start: float, duration: Optional[float] = None) -> Tuple[int, int, float, float]:
+        """
+        [start, start + duration) 초 구간을 덮는 프레임들의 바이트 범위를 구합니다.
+        (바이트 오프셋, 바이트 길이, 프레임 경계에 맞춘 실제 시작 초, 실제 길이 초) 를 반환하며,
+        시작 위치가 곡 길이를 넘으면 ValueError.
+        """
+        first = int(start / self.frame_seconds)
+        if start < 0 or first >= self.frame_count:
+            raise ValueError(f"시작 위치가 곡 길이({self.duration:.2f}초)를 벗어납니다.")
+        if duration is None:
+            last = self.frame_count
+        else:
+            # 요청한 구간이 잘리지 않도록 끝은 올림 (부동소수 오차는 무시)
+            end_frame = (start + duration) / self.frame_seconds
+            last = min(self.frame_count, max(first + 1, int(end_frame + 1 - 1e-9)))
+        offset = self.offsets[first]
+        length = self.frame_end(last - 1) - offset
+        return (offset, length, round(first * self.frame_seconds, 3),
+                round((last - first) * self.frame_seconds, 3))
+
+
+def build_index(path: str) -> Mp3Index:
+    """MP3 파일을 한 번 훑어 프레임 인덱스를 만듭니다. 오디오 프레임이 없으면 ValueError."""
+    with open(path, "rb") as f:
+        data = f.read()
+
+    data_end = len(data)
+    if data_end >= 128 and data[-128:-125] == b"TAG":
+        data_end -= 128
+    offset = id3v2_size(data)
+    offsets = array("I")
+    first: Optional[FrameHeader] = None
+    audio_end = offset
+
+    while offset + 4 <= data_end:
+        header = parse_frame_header(data, offset)
+        if header is not None and first is not None and (
+                header.version != first.version or header.layer != first.layer
+                or header.sample_rate != first.sample_rate):
+            # 스트림 중간에 형식이 바뀌면 잘못 맞춘 동기 신호로 본다
+            header = None
+        if header is None or offset + header.length > data_end:
+            # 다음 동기 신호(0xFF)까지 건너뛴다
+            offset = data.find(b"\xFF", offset + 1, data_end)
+            if offset < 0:
+                break
+            continue
+        if first is None:
+            first = header
+            if is_vbr_info_frame(data, offset, header):
+                offset += header.length
+                continue
+        offsets.append(offset)
+        offset += header.length
+        audio_end = offset
+
+    if first is None or not offsets:
+        raise ValueError(f"MP3 오디오 프레임을 찾을 수 없습니다: {path}")
+    return Mp3Index(offsets, audio_end, first.sample_rate, first.samples)
+
+
+class Mp3IndexCache:
+    """
+    파일별 프레임 인덱스의 LRU 캐시.
+    파일의 inode/크기/수정 시각이 바뀌면 다시 만듭니다. 블로킹 I/O 이므로 스레드에서 호출합니다.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Tuple[Tuple[int, int, int], Mp3Index]]" = OrderedDict()
+        self.hits = 0
+        self.builds = 0
+        self.build_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> Mp3Index:
+        stat_result = os.stat(path)
+        version = (stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns)
+        with self._lock:
+            cached = self.entries.get(path)
+            if cached is not None and cached[0] == version:
+                self.entries.move_to_end(path)
+                self.hits += 1
+                return cached[1]
+
+        started = time.monotonic()
+        index = build_index(path)
+        with self._lock:
+            self.builds += 1
+            self.build_seconds += time.monotonic() - started
+            self.entries[path] = (version, index)
+            self.entries.move_to_end(path)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return index
+
+    def forget(self, path: str):
+        with self._lock:
+            self.entries.pop(path, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "builds": self.builds,
+                "index_bytes": sum(index.offsets.itemsize * len(index.offsets)
+                                   for _, index in self.entries.values()),
+                "mean_build_ms": round(self.build_seconds / self.builds * 1000, 2)
+                if self.builds else None
+            }
@@ -0,0 +1,200 @@
+"""
+생성된 음악 파일 응답
+
+완성된 결과 파일은 내용이 바뀌지 않으므로 강한 ETag 와 장기 캐시 헤더를 붙이고,
+웹 플레이어의 탐색(seek)을 위해 단일 바이트 범위(Range) 요청에 206 으로 응답합니다.
+
+window 를 주면 파일의 해당 바이트 구간(예: MP3 프레임 경계로 잘라낸 미리듣기 구간)만
+독립된 파일처럼 응답합니다. Range 요청과 ETag 도 그 구간을 기준으로 계산됩니다.
+
+본문 전송은 서버가 지원하면 ASGI zerocopysend 확장(커널 sendfile)을 사용하고,
+지원하지 않으면 스레드풀에서 청크 단위로 읽어 이벤트 루프를 막지 않습니다.
+"""
+import os
+import stat
+from email.utils import formatdate
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+# 완성된 결과는 바뀌지 않으므로 1년 동안 캐시해도 안전하다
+MUSIC_CACHE_CONTROL = "public, max-age=31536000, immutable"
+CHUNK_SIZE = 256 * 1024
+
+
+def make_strong_etag(stat_result: os.stat_result,
+                     window: Optional[Tuple[int, int]] = None) -> str:
+    """
+    inode/크기/수정 시각(+ 구간) 기반 강한 ETag.
+    결과 파일은 한 번 기록된 뒤 수정되지 않으므로 같은 메타데이터는 같은 바이트를 뜻합니다.
+    """
+    tag = f"{stat_result.st_ino:x}-{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"
+    if window is not None:
+        tag += f"-{window[0]:x}-{window[1]:x}"
+    return f'"{tag}"'
+
+
+def parse_range_header(range_header: str, file_size: int) -> Optional[Tuple[int, int]]:
+    """
+    "bytes=a-b" 형식의 단일 범위를 (start, end) (end 포함) 로 변환합니다.
+    여러 범위나 해석할 수 없는 값은 None(전체 응답), 만족할 수 없는 범위는 ValueError.
+    """
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+
+    start_text, _, end_text = ranges.strip().partition("-")
+    try:
+        start = int(start_text) if start_text else None
+        end = int(end_text) if end_text else None
+    except ValueError:
+        # 해석할 수 없는 Range 헤더는 무시하고 전체를 보낸다
+        return None
+
+    if start is None:
+        # "bytes=-N": 마지막 N 바이트
+        if end is None or end <= 0:
+            raise ValueError("만족할 수 없는 범위")
+        return max(0, file_size - end), file_size - 1
+
+    end = file_size - 1 if end is None else min(end, file_size - 1)
+    if start >= file_size or start > end:
+        raise ValueError("만족할 수 없는 범위")
+    return start, end
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    # If-None-Match 는 약한 비교를 사용한다
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+class MusicFileResponse(Response):
+    """Range / 조건부 GET 을 지원하는 MP3 파일 응답"""
+
+    def __init__(self, path: str, filename: str, media_type: str = "audio/mpeg",
+                 headers: Optional[Dict[str, str]] = None,
+                 window: Optional[Tuple[int, int]] = None):
+        self.path = path
+        # (시작 바이트, 길이): 파일의 이 구간만 응답 본문으로 사용
+        self.window = window
+        self.filename = filename
+        self.media_type = media_type
+        self.extra_headers = [
+            (key.lower().encode("latin-1"), value.encode("latin-1"))
+            for key, value in (headers or {}).items()
+        ]
+        self.background = None
+        # 응답을 보낸 뒤 기록되는 전송 통계 (벤치마크/메트릭용)
+        self.status_code: Optional[int] = None
+        self.bytes_sent = 0
+
+    def _base_headers(self, stat_result: os.stat_result, etag: str) -> list:
+        quoted = quote(self.filename)
+        if quoted != self.filename:
+            disposition = f"attachment; filename*=utf-8''{quoted}"
+        else:
+            disposition = f'attachment; filename="{self.filename}"'
+        return [
+            (b"etag", etag.encode("latin-1")),
+            (b"last-modified", formatdate(stat_result.st_mtime, usegmt=True).encode("latin-1")),
+            (b"cache-control", MUSIC_CACHE_CONTROL.encode("latin-1")),
+            (b"accept-ranges", b"bytes"),
+            (b"content-disposition", disposition.encode("latin-1")),
+            *self.extra_headers
+        ]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await self._respond(scope, send)
+        # 304/416 을 포함한 모든 응답 뒤에 실행한다 (전송 통계 기록 등)
+        if self.background is not None:
+            await self.background()
+
+    async def _respond(self, scope: Scope, send: Send):
+        stat_result = await anyio.to_thread.run_sync(os.stat, self.path)
+        if not stat.S_ISREG(stat_result.st_mode):
+            raise RuntimeError(f"File at path {self.path} is not a file.")
+
+        base_offset, file_size = self.window or (0, stat_result.st_size)
+        etag = make_strong_etag(stat_result, self.window)
+        headers = Headers(scope=scope)
+        response_headers = self._base_headers(stat_result, etag)
+        send_body = scope["method"].upper() != "HEAD"
+
+        # 조건부 GET: 클라이언트가 가진 버전과 같으면 본문 없이 304
+        if_none_match = headers.get("if-none-match")
+        if if_none_match is not None and etag_matches(if_none_match, etag):
+            await self._send_head(send, 304, response_headers)
+            return
+
+        start, end = 0, file_size - 1
+        status_code = 200
+        range_header = headers.get("range")
+        if_range = headers.get("if-range")
+        if range_header is not None and (if_range is None or if_range.strip() == etag):
+            try:
+                byte_range = parse_range_header(range_header, file_size)
+            except ValueError:
+                response_headers.append(
+                    (b"content-range", f"bytes */{file_size}".encode("latin-1")))
+                await self._send_head(send, 416, response_headers)
+                return
+            if byte_range is not None:
+                start, end = byte_range
+                status_code = 206
+                response_headers.append(
+                    (b"content-range", f"bytes {start}-{end}/{file_size}".encode("latin-1")))
+
+        length = end - start + 1 if file_size else 0
+        response_headers.append((b"content-type", self.media_type.encode("latin-1")))
+        response_headers.append((b"content-length", str(length).encode("latin-1")))
+        await self._send_head(send, status_code, response_headers, more_body=send_body and length > 0)
+
+        if send_body and length > 0:
+            await self._send_file(scope, send, base_offset + start, length)
+
+    async def _send_head(self, send: Send, status_code: int, headers: list,
+                         more_body: bool = False):
+        self.status_code = status_code
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+        if not more_body:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _send_file(self, scope: Scope, send: Send, offset: int, length: int):
+        extensions = scope.get("extensions") or {}
+
+        with open(self.path, "rb") as f:
+            if "http.response.zerocopysend" in extensions:
+                # 커널 sendfile: 사용자 공간 복사 없이 파일 -> 소켓
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f.fileno(),
+                    "offset": offset,
+                    "count": length,
+                    "more_body": False
+                })
+                self.bytes_sent = length
+                return
+
+            await anyio.to_thread.run_sync(f.seek, offset)
+            remaining = length
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(f.read, min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                self.bytes_sent += len(chunk)
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0
+                })
+            if remaining > 0:
+                # 파일이 중간에 줄어든 경우에도 응답은 끝맺는다
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
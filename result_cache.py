@@ -0,0 +1,181 @@
+"""
+생성 결과 캐시
+
+같은 장르/가사 + 모델 + 추론 파라미터 조합으로 다시 요청이 들어오면
+이미 생성된 MP3 파일을 그대로 돌려주기 위한 콘텐츠 주소 기반 캐시입니다.
+여러 테이크를 생성한 결과는 테이크 파일들을 한 항목으로 묶어 저장합니다.
+용량 예산을 넘으면 가장 오래 사용되지 않은 결과부터 캐시에서 뺍니다(LRU).
+파일은 완료된 작업이 계속 가리키고 있으므로 지우지 않고 보존 정책 정리에 맡깁니다.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from file_ops import atomic_write_text
+
+
+def normalize_prompt_text(text: str) -> str:
+    """
+    캐시 키 계산용으로 프롬프트 텍스트를 정규화합니다.
+    유니코드 NFC, 줄바꿈 통일, 줄 끝 공백 및 앞뒤 공백 제거만 수행하므로
+    생성 결과에 영향을 주는 내용은 바꾸지 않습니다.
+    """
+    text = unicodedata.normalize("NFC", text)
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    lines = [line.rstrip() for line in text.split("\n")]
+    return "\n".join(lines).strip()
+
+
+def compute_cache_key(genre_txt: str, lyrics_txt: str, models: List[str],
+                      infer_args: List[str]) -> str:
+    """정규화된 요청과 모델/추론 파라미터로 캐시 키(sha256)를 계산합니다."""
+    payload = json.dumps({
+        "genre": normalize_prompt_text(genre_txt),
+        "lyrics": normalize_prompt_text(lyrics_txt),
+        "models": models,
+        "infer_args": infer_args
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def entry_files(entry: Dict) -> List[str]:
+    """캐시 항목의 결과 파일 목록 (테이크 순서, 이전 형식 항목은 파일 하나)"""
+    return entry.get("take_files") or [entry["file_path"]]
+
+
+class ResultCache:
+    """
+    캐시 키 -> 생성된 MP3 경로(테이크별) 인덱스.
+    인덱스는 JSON 파일로 저장해 서버 재시작 후에도 유지되며,
+    조회 때 갱신되는 사용 시각은 메모리에만 반영해 두었다가 등록/제거 시나 flush() 에서 함께 저장합니다.
+    파일 확인과 인덱스 저장이 블로킹 I/O 이므로 서버는 스레드(asyncio.to_thread)에서 호출하며,
+    내부 락으로 보호합니다.
+    """
+
+    def __init__(self, index_path: str, max_bytes: int):
+        self.index_path = index_path
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"결과 캐시 인덱스를 읽을 수 없습니다: {e}")
+            return
+
+        # 마지막 사용 시각 순으로 복원하고, 디스크에서 사라진 파일은 버린다
+        for key, entry in sorted(saved.items(), key=lambda item: item[1]["last_used"]):
+            if all(os.path.exists(path) for path in entry_files(entry)):
+                self.entries[key] = entry
+                self.total_bytes += entry["size"]
+        logging.info(
+            f"결과 캐시 인덱스 로드: {len(self.entries)}개, {self.total_bytes} bytes")
+
+    def _save(self):
+        atomic_write_text(self.index_path, json.dumps(self.entries))
+        self._dirty = False
+
+    def flush(self):
+        """조회로 바뀐 사용 시각 등 아직 저장하지 않은 인덱스 변경을 저장합니다."""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """캐시된 MP3 경로 목록(테이크 순서)을 반환합니다. 없거나 파일이 사라졌으면 None."""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or not all(os.path.exists(path) for path in entry_files(entry)):
+                if entry is not None:
+                    self._drop(key)
+                    self._dirty = True
+                self.misses += 1
+                return None
+
+            # 적중마다 인덱스 전체를 다시 쓰지 않도록 사용 시각은 메모리에만 반영한다
+            entry["last_used"] = time.time()
+            self.entries.move_to_end(key)
+            self.hits += 1
+            self._dirty = True
+            return entry_files(entry)
+
+    def put(self, key: str, file_paths: List[str]):
+        """새로 생성된 결과(테이크 순서의 파일 목록)를 캐시에 등록하고 용량 예산을 넘으면 오래된 결과를 캐시에서 뺍니다."""
+        size = sum(os.path.getsize(path) for path in file_paths)
+        with self._lock:
+            if key in self.entries:
+                # 새로 생성한 결과로 교체 (이전 파일은 해당 작업의 결과이므로 지우지 않는다)
+                self._drop(key)
+            self.entries[key] = {
+                "file_path": file_paths[0],
+                "size": size,
+                "last_used": time.time()
+            }
+            if len(file_paths) > 1:
+                self.entries[key]["take_files"] = list(file_paths)
+            self.total_bytes += size
+            self._evict()
+            self._save()
+
+    def forget_file(self, file_path: str):
+        """외부에서 삭제된 파일을 가리키는 캐시 항목을 제거합니다."""
+        with self._lock:
+            keys = [key for key, entry in self.entries.items()
+                    if file_path in entry_files(entry)]
+            for key in keys:
+                self._drop(key)
+            if keys:
+                self._save()
+
+    def last_used_by_file(self) -> Dict[str, float]:
+        """캐시된 결과 파일별 마지막 사용 시각 (보존 정책의 용량 정리가 LRU 순서로 지우도록)"""
+        with self._lock:
+            return {path: entry["last_used"]
+                    for entry in self.entries.values() for path in entry_files(entry)}
+
+    def _drop(self, key: str) -> Dict:
+        entry = self.entries.pop(key)
+        self.total_bytes -= entry["size"]
+        return entry
+
+    def _evict(self):
+        # 가장 최근 항목 하나는 예산보다 크더라도 남겨 둔다.
+        # 인덱스 항목만 빼고 파일은 그대로 둔다: 완료된 작업이 같은 파일을 결과로 가리키고 있어
+        # 여기서 지우면 다운로드가 404 가 되고, 파일 삭제는 보존 정책 정리(kept_files 확인)가 맡는다
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            key = next(iter(self.entries))
+            entry = self._drop(key)
+            self.evictions += 1
+            logging.info(
+                f"결과 캐시 제거(LRU): {key[:12]} - {entry['file_path']}")
+
+    def stats(self) -> Dict:
+        """캐시 적중/미스 카운터와 사용량을 반환합니다."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "total_bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,206 @@
+"""
+Stage1 산출물 캐시
+
+Stage1(7B 모델)이 만든 토큰 산출물을 장르/가사 + Stage1 모델 + Stage1 파라미터 + 테이크(시드)
+조합을 키로 보관합니다. 같은 조합으로 다시 실행되는 작업(stage2/믹싱 실패 뒤 재요청, 재생성,
+stage2 설정만 다른 요청)은 Stage1 을 건너뛰고 stage2 부터 이어서 실행합니다.
+
+결과 캐시(result_cache.py)와 별도의 디스크 용량 예산을 가지며, 넘으면 가장 오래 사용되지 않은
+항목부터 삭제합니다(LRU). 적중할 때마다 그 산출물을 처음 만들 때 걸린 Stage1 시간을
+아낀 GPU 시간으로 누적합니다.
+
+    <root>/index.json        키 -> 파일 목록, 크기, Stage1 소요 시간, 마지막 사용 시각
+    <root>/<키>/<파일>        Stage1 산출물 (작업 공간에는 하드링크로 넣는다)
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from file_ops import atomic_write_text, fsync_directory, publish_file
+from result_cache import normalize_prompt_text
+
+INDEX_FILENAME = "index.json"
+
+
+def stage1_infer_args(infer_args: List[str]) -> List[str]:
+    """추론 인자에서 Stage1 결과에 영향을 주지 않는 stage2 옵션(--stage2_*)과 그 값을 뺍니다."""
+    filtered = []
+    skip_value = False
+    for arg in infer_args:
+        if skip_value:
+            skip_value = False
+            if not arg.startswith("--"):
+                continue
+        if arg.startswith("--stage2"):
+            skip_value = "=" not in arg
+            continue
+        filtered.append(arg)
+    return filtered
+
+
+def compute_stage1_key(genre_txt: str, lyrics_txt: str, stage1_model: str,
+                       infer_args: List[str], take: int) -> str:
+    """정규화된 프롬프트와 Stage1 모델/파라미터, 테이크 번호(시드)로 캐시 키(sha256)를 계산합니다."""
+    payload = json.dumps({
+        "genre": normalize_prompt_text(genre_txt),
+        "lyrics": normalize_prompt_text(lyrics_txt),
+        "stage1_model": stage1_model,
+        "infer_args": stage1_infer_args(infer_args),
+        "take": take
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Stage1Cache:
+    """
+    캐시 키 -> Stage1 산출물 디렉토리 인덱스.
+    파일 이동/삭제가 블로킹 I/O 이므로 서버는 스레드(asyncio.to_thread)에서 호출하며,
+    내부 락으로 보호합니다. 조회 때 갱신되는 사용 시각은 메모리에만 반영해 두었다가
+    등록 시나 flush() 에서 함께 저장합니다.
+    """
+
+    def __init__(self, root_dir: str, max_bytes: int):
+        self.root_dir = root_dir
+        self.index_path = os.path.join(root_dir, INDEX_FILENAME)
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stores = 0
+        self.seconds_saved = 0.0
+        self._dirty = False
+        self._lock = threading.Lock()
+        os.makedirs(root_dir, exist_ok=True)
+        self._load()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.root_dir, key)
+
+    def _entry_files(self, key: str, entry: Dict) -> List[str]:
+        return [os.path.join(self._entry_dir(key), name) for name in entry["files"]]
+
+    def _load(self):
+        saved = {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, encoding="utf-8") as f:
+                    saved = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Stage1 캐시 인덱스를 읽을 수 없습니다: {e}")
+
+        # 마지막 사용 시각 순으로 복원하고, 파일이 사라진 항목은 버린다
+        for key, entry in sorted(saved.items(), key=lambda item: item[1]["last_used"]):
+            if all(os.path.exists(path) for path in self._entry_files(key, entry)):
+                self.entries[key] = entry
+                self.total_bytes += entry["size"]
+
+        # 인덱스에 없는 디렉토리(저장 도중 종료된 임시 디렉토리 등)는 정리한다
+        for entry in os.scandir(self.root_dir):
+            if entry.is_dir() and entry.name not in self.entries:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        logging.info(
+            f"Stage1 캐시 인덱스 로드: {len(self.entries)}개, {self.total_bytes} bytes")
+
+    def _save(self):
+        atomic_write_text(self.index_path, json.dumps(self.entries))
+        self._dirty = False
+
+    def flush(self):
+        """조회로 바뀐 사용 시각 등 아직 저장하지 않은 인덱스 변경을 저장합니다."""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        캐시된 Stage1 산출물 {"files": [경로...], "stage1_seconds": 초} 를 반환합니다.
+        없거나 파일이 사라졌으면 None.
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            files = self._entry_files(key, entry) if entry is not None else []
+            if entry is None or not all(os.path.exists(path) for path in files):
+                if entry is not None:
+                    # 파일이 사라진 항목은 재시작 시 _load 에서도 버려지므로 저장은 미룬다
+                    self._remove(key)
+                    self._dirty = True
+                self.misses += 1
+                return None
+
+            # 적중마다 인덱스 전체를 다시 쓰지 않도록 사용 시각은 메모리에만 반영한다
+            entry["last_used"] = time.time()
+            self.entries.move_to_end(key)
+            self.hits += 1
+            self.seconds_saved += entry["stage1_seconds"]
+            self._dirty = True
+            return {"files": files, "stage1_seconds": entry["stage1_seconds"]}
+
+    def put(self, key: str, file_paths: List[str], stage1_seconds: float):
+        """
+        작업 공간의 Stage1 산출물을 캐시로 옮겨 등록합니다 (원본 파일은 옮겨지므로 이후 쓰지 않아야 함).
+        용량 예산을 넘으면 오래된 항목부터 삭제합니다.
+        """
+        temp_dir = tempfile.mkdtemp(prefix=f".{key[:12]}.", suffix=".tmp", dir=self.root_dir)
+        try:
+            names = []
+            for path in file_paths:
+                name = os.path.basename(path)
+                publish_file(path, os.path.join(temp_dir, name))
+                names.append(name)
+            size = sum(os.path.getsize(os.path.join(temp_dir, name)) for name in names)
+
+            with self._lock:
+                if key in self.entries:
+                    self._remove(key)
+                os.replace(temp_dir, self._entry_dir(key))
+                fsync_directory(self.root_dir)
+                self.entries[key] = {
+                    "files": names,
+                    "size": size,
+                    "stage1_seconds": round(stage1_seconds, 3),
+                    "last_used": time.time()
+                }
+                self.total_bytes += size
+                self.stores += 1
+                self._evict()
+                self._save()
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _remove(self, key: str):
+        entry = self.entries.pop(key)
+        self.total_bytes -= entry["size"]
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def _evict(self):
+        # 가장 최근 항목 하나는 예산보다 크더라도 남겨 둔다
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            key = next(iter(self.entries))
+            self._remove(key)
+            self.evictions += 1
+            logging.info(f"Stage1 캐시 제거(LRU): {key[:12]}")
+
+    def stats(self) -> Dict:
+        """적중/미스 카운터, 사용량, 아낀 GPU 시간(분)을 반환합니다."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "total_bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "gpu_minutes_saved": round(self.seconds_saved / 60, 2)
+            }
@@ -3,7 +3,7 @@
 
 echo "Yue 음악 생성 API 스텁 서버 시작..."
 echo "포트: 8080"
-echo "테스트용 서버 - 20초 후 빈 MP3 파일 생성"
+echo "테스트용 서버 - ${MEMORIA_STUB_ASYNC_SECONDS:-600}초 후 빈 MP3 파일 생성 (MEMORIA_STUB_ASYNC_SECONDS / MEMORIA_STUB_SYNC_SECONDS 로 조정)"
 echo ""
 
 python3 stub_server.py
@@ -24,6 +24,12 @@ logging.basicConfig(level=logging.INFO,
 WORKING_DIR = os.path.dirname(os.path.abspath(__file__))
 FINAL_MUSIC_DIR = os.path.join(WORKING_DIR, "stub_generated_music")
 
+# 모의 처리 시간(초)과 생성 파일 크기 (벤치마크에서 환경 변수로 줄여서 사용)
+STUB_ASYNC_SECONDS = float(os.environ.get("MEMORIA_STUB_ASYNC_SECONDS", "600"))
+STUB_SYNC_SECONDS = float(os.environ.get("MEMORIA_STUB_SYNC_SECONDS", "60"))
+# MP3 헤더 뒤에 붙는 무음 데이터 크기 (바이트)
+STUB_FILE_BYTES = int(os.environ.get("MEMORIA_STUB_FILE_BYTES", "1000"))
+
 # 디렉토리 생성
 os.makedirs(FINAL_MUSIC_DIR, exist_ok=True)
 
@@ -42,7 +48,8 @@ async def lifespan(app: FastAPI):
     global job_queue, job_lock, job_update_event, background_task
 
     # 시작 시 초기화
-    logging.info("[스텁] 스텁 서버 시작 - 실제 음악 생성 없이 20초 후 완료 처리")
+    logging.info(f"[스텁] 스텁 서버 시작 - 실제 음악 생성 없이 {STUB_ASYNC_SECONDS:g}초 후 완료 처리 "
+                 f"(동기 {STUB_SYNC_SECONDS:g}초, 파일 {STUB_FILE_BYTES}바이트)")
     job_queue = asyncio.Queue()
     job_lock = asyncio.Lock()
     job_update_event = asyncio.Event()
@@ -63,7 +70,7 @@ async def lifespan(app: FastAPI):
 
 app = FastAPI(
     title="Yue 음악 생성 API (스텁 서버)",
-    description="테스트용 스텁 서버 - 실제 음악 생성 없이 20초 후 완료 처리",
+    description=f"테스트용 스텁 서버 - 실제 음악 생성 없이 {STUB_ASYNC_SECONDS:g}초 후 완료 처리",
     version="1.0.0-stub",
     lifespan=lifespan
 )
@@ -90,7 +97,7 @@ class MusicGenerationResponse(BaseModel):
 
 def create_empty_mp3_file(file_path: str):
     """빈 MP3 파일을 생성합니다 (최소한의 유효한 MP3 헤더 포함)"""
-    # 최소한의 MP3 파일 헤더 (약 1초 길이의 무음)
+    # 최소한의 MP3 파일 헤더
     mp3_header = bytes([
         # MP3 헤더 시작
         0xFF, 0xFB, 0x90, 0x00,  # MP3 sync word와 헤더
@@ -99,10 +106,10 @@ def create_empty_mp3_file(file_path: str):
     ])
 
     with open(file_path, 'wb') as f:
-        # 간단한 무음 MP3 데이터 생성 (약 1KB 크기)
+        # 간단한 무음 MP3 데이터 생성 (기본 약 1KB 크기)
         f.write(mp3_header)
         # 무음 데이터 추가
-        f.write(b'\x00' * 1000)
+        f.write(b'\x00' * STUB_FILE_BYTES)
 
 
 async def process_music_generation_queue():
@@ -123,9 +130,9 @@ async def process_music_generation_queue():
                 logging.info(f"[스텁] 작업 상태 업데이트: {job_id} -> processing")
 
             try:
-                # 스텁: 20초 대기
-                logging.info(f"[스텁] 작업 {job_id}: 20초 대기 시작")
-                await asyncio.sleep(600)
+                # 스텁: 설정된 시간만큼 대기
+                logging.info(f"[스텁] 작업 {job_id}: {STUB_ASYNC_SECONDS:g}초 대기 시작")
+                await asyncio.sleep(STUB_ASYNC_SECONDS)
 
                 # 빈 MP3 파일 생성
                 final_file_name = f"{job_id}.mp3"
@@ -174,11 +181,18 @@ async def process_music_generation_queue():
             await asyncio.sleep(1)  # 오류 시 잠시 대기
 
 
+def get_active_jobs() -> List[Dict]:
+    """메인 서버와 같은 형식의 처리 중 작업 목록 (스텁은 워커 하나)"""
+    if active_job is None:
+        return []
+    return [{"worker_id": 0, "job_id": active_job}]
+
+
 @app.post("/generate-music-async/", response_model=MusicGenerationResponse)
 async def generate_music_async(request: MusicGenerationRequest):
     """
     장르와 가사 텍스트를 기반으로 음악을 비동기적으로 생성합니다. (스텁 버전)
-    요청 ID를 즉시 반환하고 20초 후 완료 처리합니다.
+    요청 ID를 즉시 반환하고 MEMORIA_STUB_ASYNC_SECONDS 초 후 완료 처리합니다.
     """
     # 고유 작업 ID 생성
     job_id = str(uuid.uuid4())
@@ -208,16 +222,16 @@ async def generate_music_async(request: MusicGenerationRequest):
 async def generate_music_sync(request: MusicGenerationRequest):
     """
     장르와 가사 텍스트를 기반으로 음악을 동기적으로 생성합니다. (스텁 버전)
-    20초 대기 후 빈 MP3 파일을 반환합니다.
+    MEMORIA_STUB_SYNC_SECONDS 초 대기 후 빈 MP3 파일을 반환합니다.
     """
     logging.info("[스텁] 동기 음악 생성 요청")
     logging.info(f"[스텁] 장르: {request.genre_txt[:50]}...")
     logging.info(f"[스텁] 가사: {request.lyrics_txt[:50]}...")
 
     try:
-        # 스텁: 60초 대기
-        logging.info("[스텁] 60초 대기 시작")
-        await asyncio.sleep(60)
+        # 스텁: 설정된 시간만큼 대기
+        logging.info(f"[스텁] {STUB_SYNC_SECONDS:g}초 대기 시작")
+        await asyncio.sleep(STUB_SYNC_SECONDS)
 
         # 빈 MP3 파일 생성
         unique_id = str(uuid.uuid4())
@@ -275,7 +289,7 @@ async def sse_events():
                 yield {
                     "event": "job_update",
                     "data": json.dumps({
-                        "active_job": active_job,
+                        "active_jobs": get_active_jobs(),
                         "jobs": job_statuses
                     })
                 }
@@ -320,7 +334,7 @@ def get_status():
     """현재 API 서버의 상태를 반환합니다."""
     return {
         "server_type": "stub",
-        "active_job": active_job,
+        "active_jobs": get_active_jobs(),
         "queue_size": job_queue.qsize() if job_queue and hasattr(job_queue, 'qsize') else "unknown",
         "job_count": len(job_statuses)
     }
@@ -338,7 +352,7 @@ async def root():
     return {
         "message": "Yue 음악 생성 API 스텁 서버",
         "version": "1.0.0-stub",
-        "description": "테스트용 서버 - 20초 후 빈 MP3 파일 생성"
+        "description": f"테스트용 서버 - {STUB_ASYNC_SECONDS:g}초 후 빈 MP3 파일 생성"
     }
 
 
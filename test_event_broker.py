@@ -0,0 +1,49 @@
+"""
+SSE 이벤트 브로커 테스트 (서버 없이 실행)
+"""
+import asyncio
+
+from event_broker import EventBroker
+
+
+def make_broker(jobs, **options) -> EventBroker:
+    return EventBroker(jobs.get, lambda: jobs, dict, **options)
+
+
+def publish(broker: EventBroker, count: int):
+    for _ in range(count):
+        broker.mark_changed("job")
+        broker.flush()
+
+
+def drain(subscriber):
+    events = []
+    while not subscriber.queue.empty():
+        events.append(subscriber.queue.get_nowait())
+    return events
+
+
+def test_resume_replays_missed_events():
+    async def scenario():
+        broker = make_broker({"job": {"status": "queued"}}, subscriber_queue_size=8)
+        publish(broker, 6)
+        return drain(broker.subscribe(last_event_id=3))
+
+    events = asyncio.run(scenario())
+    assert [(event.kind, event.id) for event in events] == [
+        ("job_update", 4), ("job_update", 5), ("job_update", 6)]
+
+
+def test_resume_with_too_many_missed_events_gets_snapshot():
+    """놓친 이벤트가 구독자 큐에 다 들어가지 않으면 연결을 끊는 대신 스냅샷 하나를 받는다."""
+    async def scenario():
+        broker = make_broker({"job": {"status": "queued"}}, subscriber_queue_size=8)
+        publish(broker, 20)
+        subscriber = broker.subscribe(last_event_id=1)
+        publish(broker, 2)
+        return subscriber, drain(subscriber)
+
+    subscriber, events = asyncio.run(scenario())
+    assert not subscriber.closed
+    assert [(event.kind, event.id) for event in events] == [
+        ("snapshot", 20), ("job_update", 21), ("job_update", 22)]
@@ -0,0 +1,137 @@
+"""
+작업 취소 테스트 (서버 없이 실행)
+
+추론 워커와 스케줄러를 띄우지 않고(startup 이벤트 없이) 앱을 불러오므로
+제출된 작업은 큐에 대기 중인 상태로 남습니다.
+"""
+import asyncio
+import os
+import tempfile
+
+_TEST_DIR = tempfile.mkdtemp(prefix="memoria-test-")
+os.environ.setdefault("MEMORIA_JOB_DB_PATH", os.path.join(_TEST_DIR, "jobs.db"))
+os.environ.setdefault("MEMORIA_STAGE1_CACHE_DIR", os.path.join(_TEST_DIR, "stage1_cache"))
+os.environ.setdefault("MEMORIA_WORKER_BACKEND", "simulate")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+
+client = TestClient(main.app)
+
+
+def submit(lyrics_txt: str, **extra) -> str:
+    response = client.post("/generate-music-async/", json={
+        "genre_txt": "test", "lyrics_txt": lyrics_txt, **extra})
+    assert response.status_code == 200, response.text
+    return response.json()["job_id"]
+
+
+def test_cancel_queued_leader_after_force_regenerate():
+    """force_regenerate 로 같은 캐시 키의 대표 작업이 바뀐 뒤에도 원래 대기 작업을 취소할 수 있다."""
+    lyrics_txt = f"[verse]\ncancel {_TEST_DIR}"
+    original_id = submit(lyrics_txt)
+    follower_id = submit(lyrics_txt)
+    regenerated_id = submit(lyrics_txt, force_regenerate=True)
+    cache_key = next(key for key, job_id in main.inflight_jobs.items() if job_id == regenerated_id)
+
+    for job_id in (follower_id, original_id):
+        response = client.delete(f"/jobs/{job_id}")
+        assert response.status_code == 200, response.text
+
+    assert client.get(f"/job-status/{original_id}").json()["status"] == "cancelled"
+    assert client.get(f"/job-status/{follower_id}").json()["status"] == "cancelled"
+    assert original_id not in main.job_followers
+    # 새로 생성 중인 대표 작업은 그대로 진행 중 목록과 큐에 남는다
+    assert main.inflight_jobs[cache_key] == regenerated_id
+    assert regenerated_id in main.job_queue.ordered_job_ids()
+    assert client.get(f"/job-status/{regenerated_id}").json()["status"] == "queued"
+
+
+class LoadingWorker:
+    """모델 로드가 끝나지 않은 워커 (loaded 가 설정될 때까지 ensure_running 이 기다린다)"""
+
+    def __init__(self, job_id: str):
+        self.worker_id = 99
+        self.role = "full"
+        self.state = "starting"
+        self.load_seconds = None
+        self.current_job = job_id
+        self.jobs_processed = 0
+        self._pending_job_id = None
+        self.loaded = asyncio.Event()
+        self.ran_jobs = []
+        self.kills = []
+
+    async def ensure_running(self):
+        await self.loaded.wait()
+        self.state = "ready"
+
+    async def run_job(self, job_id: str, payload):
+        self.ran_jobs.append(job_id)
+        return {"type": "result", "job_id": job_id, "ok": False, "error": "실행되면 안 됨"}
+
+    def kill(self, reason: str, error_class: str):
+        self.kills.append(error_class)
+
+
+def test_cancel_while_worker_loading_skips_job():
+    """워커가 모델을 로드하는 동안 취소된 작업은 워커를 죽이지 않고, 로드가 끝나도 워커에 전달되지 않는다."""
+    job_id = submit(f"[verse]\nloading {_TEST_DIR}")
+    _, genre_txt, lyrics_txt, cache_key = main.job_queue.remove(job_id)
+    worker = LoadingWorker(job_id)
+    main.inference_workers.append(worker)
+
+    async def scenario():
+        task = asyncio.create_task(main.execute_music_generation_job(
+            worker, job_id, genre_txt, lyrics_txt, cache_key))
+        while main.job_statuses[job_id]["status"] != "processing":
+            await asyncio.sleep(0.01)
+        async with main.job_lock:
+            main.cancel_job(job_id)
+        worker.loaded.set()
+        await task
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        main.inference_workers.remove(worker)
+        main.idle_workers.get_nowait()
+
+    assert worker.kills == []
+    assert worker.ran_jobs == []
+    assert main.job_statuses[job_id]["status"] == "cancelled"
+    assert cache_key not in main.inflight_jobs
+
+
+def test_recover_promotes_first_follower_of_cancelled_leader(monkeypatch):
+    """재시작 시 취소된 대표 작업의 합쳐진 요청들은 첫 요청을 새 대표로 한 번만 생성한다."""
+    cache_key = f"recover-{_TEST_DIR}"
+
+    def stored(job_id: str, status: str, second: int, leader_id=None):
+        job = {"status": status, "created_at": f"2026-01-01T00:00:0{second}",
+               "coalesced_with": leader_id, "num_takes": 1}
+        request = {"genre_txt": "test", "lyrics_txt": "recover", "cache_key": cache_key}
+        return job_id, job, request
+
+    monkeypatch.setattr(main.job_store, "load_all", lambda: [
+        stored("recover-leader", "cancelled", 0),
+        stored("recover-a", "processing", 1, "recover-leader"),
+        stored("recover-b", "processing", 2, "recover-leader"),
+        stored("recover-c", "processing", 3, "recover-leader"),
+    ])
+    main.recover_jobs()
+    try:
+        queued_ids = main.job_queue.ordered_job_ids()
+        assert main.job_statuses["recover-a"]["coalesced_with"] is None
+        assert main.job_followers["recover-a"] == ["recover-b", "recover-c"]
+        assert main.job_statuses["recover-c"]["coalesced_with"] == "recover-a"
+        assert main.inflight_jobs[cache_key] == "recover-a"
+        # 처리 중이던 생성은 새 대표 작업 하나로 다시 대기하고, 합쳐진 요청도 같은 상태를 받는다
+        assert [main.job_statuses[job_id]["status"] for job_id in ("recover-a", "recover-b", "recover-c")] \
+            == ["queued", "queued", "queued"]
+        assert "recover-a" in queued_ids
+        assert "recover-b" not in queued_ids and "recover-c" not in queued_ids
+    finally:
+        for job_id in ("recover-a", "recover-b", "recover-c"):
+            main.job_queue.remove(job_id)
@@ -0,0 +1,45 @@
+"""
+결과 캐시 테스트 (서버 없이 실행)
+"""
+import os
+
+from result_cache import ResultCache
+
+
+def write_mp3(directory, name: str, size: int) -> str:
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    return path
+
+
+def test_evict_keeps_result_files(tmp_path):
+    """용량 예산을 넘어 캐시에서 빠진 결과의 MP3 는 작업이 계속 내려받을 수 있도록 남아 있다."""
+    cache = ResultCache(str(tmp_path / "result_cache.json"), max_bytes=150)
+    old_path = write_mp3(tmp_path, "old.mp3", 100)
+    new_path = write_mp3(tmp_path, "new.mp3", 100)
+
+    cache.put("old", [old_path])
+    cache.put("new", [new_path])
+
+    assert cache.get("old") is None
+    assert cache.get("new") == [new_path]
+    assert cache.stats()["evictions"] == 1
+    assert os.path.exists(old_path)
+
+
+def test_hit_recency_persisted_on_flush(tmp_path):
+    """적중은 인덱스 파일을 다시 쓰지 않고, flush() 뒤에는 재시작해도 사용 순서가 유지된다."""
+    index_path = str(tmp_path / "result_cache.json")
+    cache = ResultCache(index_path, max_bytes=1000)
+    first_path = write_mp3(tmp_path, "first.mp3", 10)
+    second_path = write_mp3(tmp_path, "second.mp3", 10)
+    cache.put("first", [first_path])
+    cache.put("second", [second_path])
+    saved_mtime = os.stat(index_path).st_mtime_ns
+
+    assert cache.get("first") == [first_path]
+    assert os.stat(index_path).st_mtime_ns == saved_mtime
+
+    cache.flush()
+    assert list(ResultCache(index_path, max_bytes=1000).entries) == ["second", "first"]
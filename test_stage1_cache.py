@@ -0,0 +1,29 @@
+"""
+Stage1 캐시 테스트 (서버 없이 실행)
+"""
+import os
+
+from stage1_cache import INDEX_FILENAME, Stage1Cache
+
+
+def store(cache: Stage1Cache, directory, key: str):
+    path = os.path.join(directory, f"{key}.npy")
+    with open(path, "wb") as f:
+        f.write(b"\0" * 10)
+    cache.put(key, [path], stage1_seconds=1.0)
+
+
+def test_hit_recency_persisted_on_flush(tmp_path):
+    """적중은 인덱스 파일을 다시 쓰지 않고, flush() 뒤에는 재시작해도 사용 순서가 유지된다."""
+    root_dir = str(tmp_path / "stage1_cache")
+    index_path = os.path.join(root_dir, INDEX_FILENAME)
+    cache = Stage1Cache(root_dir, max_bytes=1000)
+    store(cache, tmp_path, "first")
+    store(cache, tmp_path, "second")
+    saved_mtime = os.stat(index_path).st_mtime_ns
+
+    assert cache.get("first")["stage1_seconds"] == 1.0
+    assert os.stat(index_path).st_mtime_ns == saved_mtime
+
+    cache.flush()
+    assert list(Stage1Cache(root_dir, max_bytes=1000).entries) == ["second", "first"]
@@ -0,0 +1,154 @@
+"""
+작업별 실행 구간(span) 추적
+
+작업 하나가 대기열, 작업 공간 준비, 워커 준비(모델 로드), stage1/stage2/믹싱, 결과 복사 등
+어느 단계에서 시간을 썼는지 기록하고, Chrome trace / Perfetto 에서 바로 열 수 있는
+JSON(Trace Event Format)으로 내보냅니다.
+
+끝난 작업의 추적은 최근 N개와, 그와 별도로 전체 소요 시간이 가장 긴 K개를 보관합니다.
+"""
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Chrome trace 의 트랙(tid): 서버 쪽 처리와 추론 워커 쪽 처리를 나눠 보여준다
+SERVER_TRACK = 1
+WORKER_TRACK = 2
+TRACK_NAMES = {SERVER_TRACK: "server", WORKER_TRACK: "inference worker"}
+
+
+class JobTrace:
+    """작업 하나의 구간 목록 (시각은 epoch 초)"""
+
+    def __init__(self, job_id: str, created_at: float):
+        self.job_id = job_id
+        self.created_at = created_at
+        self.finished_at: Optional[float] = None
+        self.status: Optional[str] = None
+        self.spans: List[Dict] = []
+
+    def add_span(self, name: str, start: float, end: float,
+                 track: int = SERVER_TRACK, **args):
+        self.spans.append({
+            "name": name,
+            "start": start,
+            "end": end,
+            "track": track,
+            "args": args
+        })
+
+    @contextmanager
+    def span(self, name: str, track: int = SERVER_TRACK, **args):
+        """with 블록의 실행 시간을 구간으로 기록합니다 (예외가 나도 기록)."""
+        start = time.time()
+        try:
+            yield args
+        finally:
+            self.add_span(name, start, time.time(), track, **args)
+
+    def finish(self, status: str):
+        self.status = status
+        self.finished_at = time.time()
+
+    @property
+    def total_seconds(self) -> float:
+        return (self.finished_at or time.time()) - self.created_at
+
+    def summary(self) -> Dict:
+        """구간 이름별 합계 (느린 작업 목록용)"""
+        phases: Dict[str, float] = {}
+        for span in self.spans:
+            phases[span["name"]] = phases.get(span["name"], 0.0) + span["end"] - span["start"]
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "total_seconds": round(self.total_seconds, 3),
+            "phases": {name: round(seconds, 3) for name, seconds in phases.items()}
+        }
+
+    def to_chrome_trace(self) -> Dict:
+        """Trace Event Format (ph "X" 완료 이벤트, 마이크로초 단위)"""
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": track,
+             "args": {"name": track_name}}
+            for track, track_name in TRACK_NAMES.items()
+        ]
+        events.append({"name": "process_name", "ph": "M", "pid": 1, "tid": SERVER_TRACK,
+                       "args": {"name": f"job {self.job_id}"}})
+        for span in sorted(self.spans, key=lambda span: (span["start"], -span["end"])):
+            events.append({
+                "name": span["name"],
+                "cat": "job",
+                "ph": "X",
+                "ts": round(span["start"] * 1_000_000),
+                "dur": round((span["end"] - span["start"]) * 1_000_000),
+                "pid": 1,
+                "tid": span["track"],
+                "args": span["args"]
+            })
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "job_id": self.job_id,
+                "status": self.status,
+                "total_seconds": round(self.total_seconds, 3)
+            }
+        }
+
+
+class TraceStore:
+    """진행 중인 작업의 추적과, 끝난 작업의 최근/가장 느린 추적 보관소"""
+
+    def __init__(self, history_size: int, slowest_size: int):
+        self.history_size = history_size
+        self.slowest_size = slowest_size
+        self.active: Dict[str, JobTrace] = {}
+        self.recent: "OrderedDict[str, JobTrace]" = OrderedDict()
+        # (전체 소요 시간, job_id, 추적) 최소 힙: 가장 빠른 항목부터 밀려난다
+        self._slowest: List = []
+        self._lock = threading.Lock()
+
+    def start(self, job_id: str, created_at: float) -> JobTrace:
+        trace = JobTrace(job_id, created_at)
+        with self._lock:
+            self.active[job_id] = trace
+        return trace
+
+    def finish(self, job_id: str, status: str):
+        with self._lock:
+            trace = self.active.pop(job_id, None)
+            if trace is None:
+                return
+            trace.finish(status)
+            self.recent[job_id] = trace
+            while len(self.recent) > self.history_size:
+                self.recent.popitem(last=False)
+            entry = (trace.total_seconds, job_id, trace)
+            if len(self._slowest) < self.slowest_size:
+                heapq.heappush(self._slowest, entry)
+            elif entry[0] > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def get(self, job_id: str) -> Optional[JobTrace]:
+        with self._lock:
+            trace = self.active.get(job_id) or self.recent.get(job_id)
+            if trace is None:
+                trace = next((trace for _, slow_id, trace in self._slowest if slow_id == job_id), None)
+            return trace
+
+    def slowest(self, limit: int) -> List[Dict]:
+        with self._lock:
+            entries = sorted(self._slowest, key=lambda entry: entry[0], reverse=True)[:limit]
+        return [trace.summary() for _, _, trace in entries]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "active": len(self.active),
+                "recent": len(self.recent),
+                "slowest_kept": len(self._slowest)
+            }